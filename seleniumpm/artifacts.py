@@ -0,0 +1,187 @@
+"""
+A content-addressed store for the artifacts of a run (screenshots, HTML dumps, etc.).
+
+Every artifact is stored once as a blob named after the sha256 of its content, so identical screenshots
+are deduplicated and parallel workers never overwrite each other. Every put() is also recorded in an
+append-only index (one JSON line per artifact) with the run id, page, step and timestamp:
+
+    <artifact_dir>/
+        index.jsonl
+        blobs/9f/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08.png
+
+With seleniumconfig.artifact_store = True, Webpage.take_screenshot(), Element.take_screenshot() and
+Webpage.save_html() store their artifacts in the ArtifactStore of get_artifact_store() and return the
+hash of the artifact:
+
+    seleniumconfig.artifact_store = True
+    digest = page.take_screenshot()
+    png = artifacts.get_artifact_store().read(digest)
+
+Along with seleniumconfig.screenshot_buffer_size > 0, take_screenshot() still returns the hash, but the
+screenshot is only put in the store when the screenshot buffer is flushed (see seleniumpm.screenshots).
+"""
+import errno
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+import uuid
+
+import seleniumpm.config as seleniumconfig
+
+
+def get_run_id():
+    """
+    :return: seleniumconfig.artifact_run_id, or an id unique to this process (e.g. for parallel workers)
+    """
+    if seleniumconfig.artifact_run_id is not None:
+        return seleniumconfig.artifact_run_id
+    return "{}-{}-{}".format(time.strftime('%Y_%m_%d-%H_%M_%S'), os.getpid(), uuid.uuid4().hex[:8])
+
+
+def ensure_dir(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        # Another thread or process created it in the meantime
+        if e.errno != errno.EEXIST:
+            raise
+
+
+class ArtifactStore(object):
+    """
+    Stores blobs by the sha256 of their content, and indexes every artifact put in it
+    """
+
+    def __init__(self, artifact_dir=None, run_id=None):
+        """
+        :param artifact_dir: (Default: seleniumconfig.artifact_dir) The root directory of the store
+        :param run_id: (Default: get_run_id()) The run id recorded in the index
+        """
+        self.artifact_dir = artifact_dir if artifact_dir is not None else seleniumconfig.artifact_dir
+        self.run_id = run_id if run_id is not None else get_run_id()
+        self.index_filename = os.path.join(self.artifact_dir, "index.jsonl")
+        self.lock = threading.Lock()
+
+    def get_path(self, digest, ext=None):
+        """
+        :param digest: The sha256 (hex) of a blob
+        :param ext: (Default: None) The file extension of the blob (e.g. 'png')
+        :return: The path of the blob
+        """
+        name = "{}.{}".format(digest, ext) if ext else digest
+        return os.path.join(self.artifact_dir, "blobs", digest[:2], name)
+
+    def find_path(self, digest):
+        """
+        :return: The path of a stored blob (whatever its extension)
+        :raises IOError: if there is no such blob
+        """
+        blob_dir = os.path.dirname(self.get_path(digest))
+        if os.path.isdir(blob_dir):
+            for name in os.listdir(blob_dir):
+                if name == digest or name.startswith(digest + "."):
+                    return os.path.join(blob_dir, name)
+        raise IOError(errno.ENOENT, "No artifact {} in {}".format(digest, self.artifact_dir))
+
+    def put(self, data, kind, page=None, step=None, ext=None, timestamp=None):
+        """
+        Stores a blob (unless an identical blob is already stored) and appends it to the index
+
+        :param data: The content (bytes)
+        :param kind: The kind of artifact (e.g. 'screenshot' or 'html')
+        :param page: (Default: None) The Webpage class name the artifact was taken on
+        :param step: (Default: None) The step the artifact was taken at (e.g. the screenshot name)
+        :param ext: (Default: None) The file extension of the blob (e.g. 'png')
+        :param timestamp: (Default: now) When the artifact was taken (e.g. for a buffered screenshot, see
+                          seleniumpm.screenshots.ScreenshotBuffer)
+        :return: The sha256 (hex) of the content
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.get_path(digest, ext)
+        if not os.path.exists(path):
+            self.write_blob(path, data)
+        timestamp = timestamp if timestamp is not None else time.time()
+        self.append_index({'run_id': self.run_id, 'kind': kind, 'page': page, 'step': step,
+                           'timestamp': timestamp, 'hash': digest, 'size': len(data), 'ext': ext})
+        return digest
+
+    def write_blob(self, path, data):
+        ensure_dir(os.path.dirname(path))
+        # Written to a temporary file first so that a concurrent reader (or writer of the same blob) never
+        # sees a partial blob
+        tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.current_thread().ident)
+        with open(tmp_path, "wb") as blob_file:
+            blob_file.write(data)
+        os.rename(tmp_path, path)
+
+    def append_index(self, entry):
+        # A single write() of the whole line, so that concurrent appends are not interleaved
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        ensure_dir(self.artifact_dir)
+        with self.lock:
+            with open(self.index_filename, "ab") as index_file:
+                index_file.write(line.encode("utf-8"))
+
+    def read(self, digest):
+        """
+        Reads a whole blob in memory (see map() for large blobs)
+
+        :param digest: The sha256 (hex) of the blob
+        :return: The content (bytes)
+        """
+        with open(self.find_path(digest), "rb") as blob_file:
+            return blob_file.read()
+
+    def map(self, digest):
+        """
+        Memory-maps a blob (read-only), e.g. to hash, compare or stream a large blob without reading it all in
+        memory. The caller must close() the returned mmap:
+
+            blob = store.map(digest)
+            try:
+                header = blob[:8]
+            finally:
+                blob.close()
+
+        :param digest: The sha256 (hex) of the blob
+        :return: An mmap.mmap
+        :raises ValueError: if the blob is empty (an empty file cannot be mapped)
+        """
+        with open(self.find_path(digest), "rb") as blob_file:
+            return mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iter_index(self, run_id=None):
+        """
+        :param run_id: (Default: None) Only the artifacts of that run
+        :return: A generator of the index entries, in the order they were added
+        """
+        if not os.path.exists(self.index_filename):
+            return
+        with open(self.index_filename, "rb") as index_file:
+            for line in index_file:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line.decode("utf-8"))
+                if run_id is None or entry['run_id'] == run_id:
+                    yield entry
+
+
+# The ArtifactStore used when seleniumconfig.artifact_store is on (created on first use)
+artifact_store = None
+artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """
+    :return: The ArtifactStore of seleniumconfig.artifact_dir. A new store (and run id) is created if
+             seleniumconfig.artifact_dir changed.
+    """
+    global artifact_store
+    with artifact_store_lock:
+        if artifact_store is None or artifact_store.artifact_dir != seleniumconfig.artifact_dir:
+            artifact_store = ArtifactStore()
+        return artifact_store
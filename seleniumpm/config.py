@@ -15,7 +15,83 @@ def reset_timeouts():
 screenshot_dir = "./screenshots"
 screenshot_enabled = True
 test_screenshot_enabled = True
+# Write screenshots on background threads (see seleniumpm.screenshots.ScreenshotWriter). At most
+# screenshot_queue_size screenshots can be pending before take_screenshot() blocks.
+async_screenshots = False
+screenshot_queue_size = 16
+screenshot_writer_workers = 1
+# Keep the last screenshot_buffer_size screenshots (at most screenshot_buffer_max_bytes) in memory
+# instead of writing them, until a validation times out (see seleniumpm.screenshots.flush_on_error).
+# 0 disables the buffer.
+screenshot_buffer_size = 0
+screenshot_buffer_max_bytes = 64 * 1024 * 1024
+
+# Store screenshots and HTML dumps by content hash in artifact_dir (see seleniumpm.artifacts). The run id
+# of the index defaults to one unique to the process.
+artifact_store = False
+artifact_dir = "./artifacts"
+artifact_run_id = None
+
+# Visual checks (see seleniumpm.visual): the baselines are stored in visual_baseline_dir, and a screenshot
+# looks like its baseline if the Hamming distance of their (visual_hash_size * visual_hash_size bits)
+# perceptual hashes is at most visual_hash_threshold. visual_update_baselines replaces the baselines.
+visual_baseline_dir = "./baselines"
+visual_hash_size = 8
+visual_hash_threshold = 5
+visual_update_baselines = False
+
+# Polling used by every seleniumpm wait (see seleniumpm.poller.Poller). The interval starts at
+# polling_interval_in_sec and is multiplied by polling_backoff after each poll, up to
+# polling_max_interval_in_sec. polling_jitter randomizes each interval by +/- that fraction.
+polling_interval_in_sec = 0.5
+polling_backoff = 1.0
+polling_max_interval_in_sec = 2.0
+polling_jitter = 0.0
 
 # Selenium Checks
 disable_check_for_selenium_webdriver = False
 failfast_check_element = True
+# Check all the elements of a Webpage/Widget with a single execute_script() per poll in validate()
+batch_validation = False
+
+# Check the elements concurrently in validate() when failfast_check_element=False. The checks share
+# the WebDriver session, so the driver's command executor must not reuse a single keep-alive
+# connection across threads. That holds for webdriver.Remote(keep_alive=False) (the default of
+# webdriver.Remote), but not for webdriver.Chrome/Firefox, which use keep_alive=True: with those, the
+# elements are checked serially.
+concurrent_check_element = False
+concurrent_check_max_workers = 8
+
+# Reuse the WebElement found by Element.get_webelement() until the next Webpage.open()/refresh()
+# (a stale WebElement is found again transparently)
+cache_webelements = False
+
+# Read the texts of Element.get_texts()/get_numbers() with a single execute_script() call. The texts
+# are the browser's innerText, which can differ from WebElement.text (see Element.get_texts_in_browser())
+bulk_text_extraction = False
+
+# Read the browser's Navigation Timing (DNS, connect, TTFB, DOMContentLoaded, load) after
+# Webpage.wait_for_page_load() (see Webpage.get_navigation_timing())
+navigation_timing = False
+
+# Summarize the browser's Resource Timing after Webpage.wait_for_page_load() (see
+# Webpage.record_resource_timing()), keeping the resource_timing_top slowest resources. With
+# resource_timing_waterfall, every resource is also written as JSON in the screenshot_dir.
+resource_timing = False
+resource_timing_top = 10
+resource_timing_waterfall = False
+
+# Record the seleniumpm operations (open, validate, wait_for_*, click, etc.) as trace spans (see
+# seleniumpm.tracing), keeping at most tracing_max_spans of them in memory
+tracing = False
+tracing_max_spans = 100000
+
+# The backend used by Element.wait_for_present(), wait_for_visible() and wait_for_selected():
+#   "webdriver" - Polls with find_element() from Python (i.e. a WebDriverWait)
+#   "observer"  - Waits in the browser with a MutationObserver (one execute_async_script() per wait)
+wait_backend = "webdriver"
+
+# The script timeout of the session (see driver.set_script_timeout()). The "observer" wait_backend raises it
+# for the duration of a longer wait, and sets it back to this value afterwards, since WebDriver cannot read
+# the current script timeout back. Set it if the tests call driver.set_script_timeout() themselves.
+script_timeout_in_sec = 30
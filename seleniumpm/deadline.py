@@ -0,0 +1,45 @@
+import time
+
+# time.monotonic() is not available on Python 2, in which case fallback to time.time()
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+class Deadline(object):
+    """
+    A Deadline is a time budget that is computed once at the start of an operation and then shared
+    by every step of that operation. For example, Webpage.validate() creates a Deadline from its
+    timeout and passes it down to every Widget/IFrame and element check, so that the whole call
+    returns (or raises) within the timeout instead of spending the full timeout on each element.
+
+        deadline = Deadline(timeout=30)
+        element.wait_for_present(deadline.remaining())
+    """
+
+    def __init__(self, timeout):
+        """
+        :param timeout: The budget (in seconds) for the whole operation
+        """
+        self.timeout = timeout
+        self.start_time = monotonic()
+        self.end_time = self.start_time + timeout
+
+    def remaining(self):
+        """
+        :return: The number of seconds left before the deadline, or 0 if it has passed
+        """
+        return max(0, self.end_time - monotonic())
+
+    def expired(self):
+        """
+        :return: True if the deadline has passed; False otherwise
+        """
+        return monotonic() >= self.end_time
+
+    def elapsed(self):
+        """
+        :return: The number of seconds since the deadline was created
+        """
+        return monotonic() - self.start_time
+
+    def __repr__(self):
+        return "Deadline(timeout={}, remaining={})".format(self.timeout, self.remaining())
@@ -1,4 +1,5 @@
 from seleniumpm.locator import Locator
+from seleniumpm.tracing import traced
 from seleniumpm.webelements.element import Element
 from seleniumpm.webelements.panel import Panel
 
@@ -8,6 +9,13 @@ class IFrame(Panel):
         super(IFrame, self).__init__(driver=driver, locator=locator)
         self.iframe_load_duration_time = 0
 
+    def mark_scoped(self):
+        """
+        The elements of an iFrame are found in the document of the iFrame after switch_in(), and not
+        from the IFrame WebElement, so an IFrame cannot be scoped.
+        """
+        raise AttributeError("An IFrame cannot be scoped; its elements are found after switch_in()")
+
     def get_html(self, switch_in=True):
         """
         Retrieves the html of the entire page
@@ -42,7 +50,9 @@ class IFrame(Panel):
         timeout = timeout if timeout is not None else self.page_timeout
         return self.validate(timeout=timeout, force_check_visibility=force_check_visibility, check_myself=check_myself)
 
-    def validate(self, timeout=None, force_check_visibility=False, check_myself=True):
+    @traced()
+    def validate(self, timeout=None, force_check_visibility=False, check_myself=True,
+                 batch_validation=None, deadline=None):
         """
         An IFrame validate takes into account that you have to switch_in() to an iFrame to actually validate the
         inner-page.
@@ -55,6 +65,10 @@ class IFrame(Panel):
                              This is used for enabling/disabling adding a validation against itself. The scenario
                              where this could be used is in a situation where you want to validate the elements of this
                              container, but not the Locator of the container itself.
+        :param batch_validation: (Default: False) If set to True, then the elements of the iFrame
+                                 are checked with a single execute_script() call per poll
+        :param deadline: (Default: None) A seleniumpm.deadline.Deadline to use instead of timeout.
+                         This is how the time budget is shared with the parent Webpage/Widget.
         :raises TimeoutException: if an element doesn't appear within timeout
         :return: self
         """
@@ -64,11 +78,14 @@ class IFrame(Panel):
             self.switch_in() if check_myself else None
             return super(IFrame, self).validate(timeout=timeout,
                                                 force_check_visibility=force_check_visibility,
-                                                check_myself=check_myself)
+                                                check_myself=check_myself,
+                                                batch_validation=batch_validation,
+                                                deadline=deadline)
         finally:
             self.switch_out() if check_myself else None
             self.stop_timer(type="iframe_load")
 
+    @traced()
     def switch_in(self):
         """
         This is to support switching to an iFrame for smart validations of all Element's on a page
@@ -81,6 +98,7 @@ class IFrame(Panel):
             self.driver.switch_to.frame(self.driver.find_element(by=self.locator.by, value=self.locator.value))
         return self
 
+    @traced()
     def switch_out(self):
         """
         This is to support switching out of an iFrame for smart validations of all Element's on a page
@@ -0,0 +1,266 @@
+"""
+A registry of the counters and histograms collected by seleniumpm over a run.
+
+Every stop_timer() of a Webpage/Widget/Element records its duration as a 'timer' sample, and every
+wait of seleniumpm.poller records its time, polls and timeouts. Unlike the timer attributes set on
+the driver (e.g. driver.page_load_duration_time), which only keep the last value of each timer type,
+the registry keeps every sample so that they can be aggregated at the end of a run:
+
+    import seleniumpm.metrics as metrics
+
+    page.open(wait_for_page_load=True)
+    ...
+    histogram = metrics.metrics_registry.get_histogram('timer', page='MyPage', type='page_load')
+    print(histogram.percentile(95))
+
+Metrics are identified by a name plus the page class name, widget class name and type they were
+recorded for (any of which can be None).
+"""
+import threading
+import time
+
+from urlparse import urlparse
+
+# time.perf_counter() is not available on Python 2, in which case fallback to time.time()
+perf_counter = getattr(time, 'perf_counter', time.time)
+
+
+class Histogram(object):
+    """
+    Keeps every sample (e.g. a duration in seconds) and computes aggregates over them
+    """
+
+    def __init__(self):
+        self.samples = []
+
+    def add(self, value):
+        self.samples.append(value)
+
+    @property
+    def count(self):
+        return len(self.samples)
+
+    @property
+    def sum(self):
+        return sum(self.samples)
+
+    @property
+    def mean(self):
+        return self.sum / float(self.count) if self.count > 0 else None
+
+    @property
+    def min(self):
+        return min(self.samples) if self.count > 0 else None
+
+    @property
+    def max(self):
+        return max(self.samples) if self.count > 0 else None
+
+    def percentile(self, percent):
+        """
+        :param percent: A number between 0 and 100 (e.g. 95 for the p95)
+        :return: The percentile of the samples (linearly interpolated between the closest ranks), or None if
+                 there are no samples
+        """
+        if self.count == 0:
+            return None
+        samples = sorted(self.samples)
+        rank = (len(samples) - 1) * percent / 100.0
+        lower = int(rank)
+        upper = min(lower + 1, len(samples) - 1)
+        return samples[lower] + (samples[upper] - samples[lower]) * (rank - lower)
+
+    def summary(self):
+        """
+        :return: A dict of count, sum, mean, min, max, p50, p95 and p99
+        """
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99)
+        }
+
+
+class MetricsRegistry(object):
+    """
+    A thread-safe collection of counters and histograms, keyed by (name, page, widget, type)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, value=1, page=None, widget=None, type=None):
+        """
+        Adds value to a counter
+
+        :param name: The name of the counter (e.g. 'wait_timeouts')
+        :param value: (Default: 1) The amount to add
+        :param page: (Default: None) The Webpage class name
+        :param widget: (Default: None) The Widget/Panel/IFrame class name
+        :param type: (Default: None) The timer/wait type (e.g. 'page_load')
+        """
+        key = (name, page, widget, type)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, page=None, widget=None, type=None):
+        """
+        Adds a sample to a histogram (see increment() for the parameters)
+        """
+        key = (name, page, widget, type)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.add(value)
+
+    def get_counter(self, name, page=None, widget=None, type=None):
+        """
+        :return: The value of a counter, or 0 if it was never incremented
+        """
+        with self.lock:
+            return self.counters.get((name, page, widget, type), 0)
+
+    def get_histogram(self, name, page=None, widget=None, type=None):
+        """
+        :return: A copy of a Histogram, or None if no sample was recorded
+        """
+        with self.lock:
+            histogram = self.histograms.get((name, page, widget, type))
+            if histogram is None:
+                return None
+            copy = Histogram()
+            copy.samples = list(histogram.samples)
+            return copy
+
+    def summary(self):
+        """
+        :return: A list of dicts, one per counter and histogram, with their name, page, widget and type. A counter
+                 has a 'value', and a histogram has the aggregates of Histogram.summary().
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = dict((key, list(histogram.samples)) for key, histogram in self.histograms.items())
+        results = []
+        for (name, page, widget, type), value in sorted(counters.items()):
+            results.append({'name': name, 'page': page, 'widget': widget, 'type': type, 'value': value})
+        for (name, page, widget, type), samples in sorted(histograms.items()):
+            histogram = Histogram()
+            histogram.samples = samples
+            result = {'name': name, 'page': page, 'widget': widget, 'type': type}
+            result.update(histogram.summary())
+            results.append(result)
+        return results
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+# The registry that seleniumpm records into
+metrics_registry = MetricsRegistry()
+
+
+# Guards the timer starts of every driver (see start_timer())
+timer_lock = threading.Lock()
+
+
+def get_timer_starts(driver):
+    starts = getattr(driver, "seleniumpm_timer_starts", None)
+    if starts is None:
+        starts = driver.seleniumpm_timer_starts = {}
+    return starts
+
+
+def get_timer_key(type, owner):
+    return type, id(owner) if owner is not None else None, threading.current_thread().ident
+
+
+def start_timer(driver, type, owner=None):
+    """
+    Records the perf_counter() start of a timer on the driver (see Webpage.start_timer() and
+    Element.start_timer()). A start is kept per type, owner and thread, so that timers of the same type
+    started by different pages/widgets sharing the driver, or by different threads (e.g. with
+    seleniumconfig.concurrent_check_element), do not overwrite each other.
+
+    :param owner: (Default: None) The Webpage or Widget that times itself
+    """
+    with timer_lock:
+        get_timer_starts(driver)[get_timer_key(type, owner)] = perf_counter()
+
+
+def pop_timer_start(driver, type, owner=None):
+    """
+    :return: The start of the timer of the owner on the current thread. Otherwise, the only start of the
+             owner on another thread, or the only start of that type (e.g. a page load timer started by
+             one Webpage and stopped by the next one). None if the timer was not started, or if it cannot
+             tell which start to use.
+    """
+    with timer_lock:
+        starts = get_timer_starts(driver)
+        key = get_timer_key(type, owner)
+        if key in starts:
+            return starts.pop(key)
+        for size in (2, 1):
+            keys = [other for other in starts if other[:size] == key[:size]]
+            if keys:
+                return starts.pop(keys[0]) if len(keys) == 1 else None
+        return None
+
+
+def reset_timer(driver, type, owner=None):
+    pop_timer_start(driver, type, owner=owner)
+
+
+def stop_timer(driver, type, page=None, widget=None, owner=None):
+    """
+    Records the duration of a timer started with start_timer() as a 'timer' sample
+
+    :param page: (Default: None) The page label of the sample
+    :param widget: (Default: None) The widget label of the sample
+    :param owner: (Default: None) The owner the timer was started with
+    :return: The duration in seconds, or None if the timer was not started
+    """
+    start_time = pop_timer_start(driver, type, owner=owner)
+    if start_time is None:
+        return None
+    duration = perf_counter() - start_time
+    metrics_registry.observe('timer', duration, page=page, widget=widget, type=type)
+    return duration
+
+
+def summarize_resource_timing(resources, top=10):
+    """
+    Aggregates the Resource Timing of a page (see Webpage.get_resource_timing()) into a compact summary
+
+    :param resources: A list of {name, initiator_type, start, duration, transfer_size} dicts
+    :param top: (Default: 10) The number of slowest resources to keep
+    :return: A dict of:
+             - 'count': The number of resources
+             - 'end': When the last resource finished, relative to the start of the navigation
+             - 'by_initiator_type' and 'by_domain': {key: {'count', 'duration', 'max_duration',
+               'transfer_size'}}, where 'duration' is the sum of the durations
+             - 'slowest': The 'top' resources with the longest duration, slowest first
+    """
+    summary = {'count': len(resources), 'end': 0, 'by_initiator_type': {}, 'by_domain': {}}
+    for resource in resources:
+        summary['end'] = max(summary['end'], resource['start'] + resource['duration'])
+        for group, key in (('by_initiator_type', resource['initiator_type'] or 'other'),
+                           ('by_domain', urlparse(resource['name']).netloc or resource['name'])):
+            stats = summary[group].setdefault(key, {'count': 0, 'duration': 0, 'max_duration': 0,
+                                                    'transfer_size': 0})
+            stats['count'] += 1
+            stats['duration'] += resource['duration']
+            stats['max_duration'] = max(stats['max_duration'], resource['duration'])
+            stats['transfer_size'] += resource['transfer_size'] or 0
+    slowest = sorted(resources, key=lambda resource: resource['duration'], reverse=True)[:top]
+    summary['slowest'] = [dict(resource) for resource in slowest]
+    return summary
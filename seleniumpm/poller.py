@@ -0,0 +1,163 @@
+"""
+The polling engine behind every seleniumpm wait (Element.wait_for_*(), Webpage.wait_for_title(),
+batch validation, etc.).
+"""
+import logging
+import random
+import threading
+import time
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+import seleniumpm.config as seleniumconfig
+from seleniumpm.metrics import metrics_registry
+from seleniumpm.deadline import Deadline
+
+log = logging.getLogger(__name__)
+
+# Aggregated statistics for every wait, keyed by the name of the wait
+wait_stats = {}
+wait_stats_lock = threading.Lock()
+
+
+def record_wait(name, polls, elapsed, satisfied, page=None, widget=None):
+    """
+    Records the outcome of a wait in wait_stats, and in seleniumpm.metrics as a 'wait' sample and
+    'wait_polls'/'wait_timeouts' counters of type=name
+
+    :param name: The name of the wait (e.g. 'wait_for_present')
+    :param polls: The number of times the condition was checked
+    :param elapsed: The number of seconds spent waiting
+    :param satisfied: Whether or not the condition was met
+    :param page: (Default: None) The Webpage class name the wait was done for
+    :param widget: (Default: None) The Widget class name the wait was done for
+    """
+    metrics_registry.observe('wait', elapsed, page=page, widget=widget, type=name)
+    metrics_registry.increment('wait_polls', polls, page=page, widget=widget, type=name)
+    if not satisfied:
+        metrics_registry.increment('wait_timeouts', page=page, widget=widget, type=name)
+    with wait_stats_lock:
+        stats = wait_stats.setdefault(name, {'waits': 0, 'polls': 0, 'time': 0.0, 'timeouts': 0})
+        stats['waits'] += 1
+        stats['polls'] += polls
+        stats['time'] += elapsed
+        if not satisfied:
+            stats['timeouts'] += 1
+
+
+def get_wait_stats():
+    """
+    :return: A copy of wait_stats, i.e. {name: {'waits', 'polls', 'time', 'timeouts'}}
+    """
+    with wait_stats_lock:
+        return dict((name, dict(stats)) for name, stats in wait_stats.items())
+
+
+def reset_wait_stats():
+    with wait_stats_lock:
+        wait_stats.clear()
+
+
+class Poller(object):
+    """
+    Calls a condition until it is met or a deadline passes. The interval between polls starts at
+    'polling' and is multiplied by 'backoff' after every poll (up to 'max_polling'), with an optional
+    random +/- 'jitter' (as a fraction of the interval). A poll never sleeps past the deadline.
+
+        text = Poller(timeout=10).poll(element.get_text, until=lambda text: text == "Done")
+        webelement = Poller(timeout=10).until(find_my_element, message="Element never appeared")
+
+    Every wait is recorded in seleniumpm.poller.wait_stats under 'name', and the Poller itself keeps
+    the number of polls and the time spent on the last wait.
+    """
+
+    def __init__(self, timeout=None, polling=None, backoff=None, max_polling=None, jitter=None,
+                 name="wait", ignored_exceptions=(NoSuchElementException,), deadline=None, page=None,
+                 widget=None):
+        """
+        :param timeout: (Default: 10s) The number of seconds to wait
+        :param polling: (Default: 0.5s) The initial interval between polls
+        :param backoff: (Default: 1.0) The multiplier applied to the interval after every poll
+        :param max_polling: (Default: 2s) The maximum interval between polls
+        :param jitter: (Default: 0) The fraction of the interval that is randomized (e.g. 0.1 for
+                       +/- 10%)
+        :param name: (Default: 'wait') The name under which the wait is recorded in wait_stats
+        :param ignored_exceptions: (Default: NoSuchElementException) Exceptions raised by the
+                                   condition that count as the condition not being met
+        :param deadline: (Default: None) A seleniumpm.deadline.Deadline to use instead of timeout
+        :param page: (Default: None) The Webpage class name the wait is recorded under in seleniumpm.metrics
+        :param widget: (Default: None) The Widget class name the wait is recorded under in seleniumpm.metrics
+        """
+        self.timeout = timeout if timeout is not None else seleniumconfig.element_timeout_in_sec
+        self.polling = polling if polling is not None else seleniumconfig.polling_interval_in_sec
+        self.backoff = backoff if backoff is not None else seleniumconfig.polling_backoff
+        self.max_polling = max_polling if max_polling is not None \
+            else seleniumconfig.polling_max_interval_in_sec
+        self.jitter = jitter if jitter is not None else seleniumconfig.polling_jitter
+        self.name = name
+        self.ignored_exceptions = tuple(ignored_exceptions)
+        self.deadline = deadline
+        self.page = page
+        self.widget = widget
+        self.polls = 0
+        self.elapsed = 0
+        self.satisfied = False
+
+    def get_interval(self, poll):
+        """
+        :param poll: The number of polls done so far (starting at 1)
+        :return: The number of seconds to sleep before the next poll
+        """
+        interval = min(self.polling * (self.backoff ** (poll - 1)), max(self.polling, self.max_polling))
+        if self.jitter:
+            interval += interval * random.uniform(-self.jitter, self.jitter)
+        return max(0, interval)
+
+    def poll(self, condition, until=bool):
+        """
+        Calls condition() until until(value) is True or the deadline passes
+
+        :param condition: A callable taking no arguments
+        :param until: (Default: bool) A callable that decides if the value returned by condition()
+                      meets the condition
+        :return: The last value returned by condition() (None if it never returned). Check
+                 self.satisfied to know if the condition was met.
+        """
+        deadline = self.deadline if self.deadline is not None else Deadline(self.timeout)
+        start_time = deadline.elapsed()
+        self.polls = 0
+        self.satisfied = False
+        value = None
+        try:
+            while True:
+                self.polls += 1
+                try:
+                    value = condition()
+                    if until(value):
+                        self.satisfied = True
+                        return value
+                except self.ignored_exceptions:
+                    pass
+                remaining = deadline.remaining()
+                if remaining <= 0:
+                    return value
+                time.sleep(min(self.get_interval(self.polls), remaining))
+        finally:
+            self.elapsed = deadline.elapsed() - start_time
+            record_wait(self.name, self.polls, self.elapsed, self.satisfied, self.page, self.widget)
+            log.debug("{} {} after {} polls in {}sec".format(
+                self.name, "succeeded" if self.satisfied else "timed out", self.polls, self.elapsed))
+
+    def until(self, condition, message=""):
+        """
+        Like a WebDriverWait.until(), this calls condition() until it returns a truthy value
+
+        :param condition: A callable taking no arguments
+        :param message: (Default: '') The message of the TimeoutException
+        :return: The value returned by condition()
+        :raises TimeoutException: if the condition is not met before the deadline
+        """
+        value = self.poll(condition)
+        if not self.satisfied:
+            raise TimeoutException(message)
+        return value
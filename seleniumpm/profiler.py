@@ -0,0 +1,300 @@
+"""
+A profiler of the WebDriver commands (i.e. round trips to the Selenium server) issued by seleniumpm.
+
+The profiler wraps the command executor of a driver, and attributes every command (its name, latency
+and payload sizes) to the seleniumpm operation in progress, i.e. the innermost span of
+seleniumpm.tracing (e.g. 'MyPage.validate' or 'Button.wait_for_present'):
+
+    import seleniumpm.profiler as profiler
+
+    command_profiler = profiler.profile_commands(driver)
+    page.open(wait_for_page_load=True)
+    print(command_profiler.format_report())
+    profiler.unprofile_commands(driver)
+
+Commands issued outside of any seleniumpm operation are attributed to NO_OPERATION.
+"""
+from functools import wraps
+import json
+import threading
+
+from seleniumpm.metrics import perf_counter
+from seleniumpm.tracing import tracer
+
+# The operation of the commands that are not issued by a seleniumpm operation
+NO_OPERATION = "(none)"
+
+
+class CommandRecord(object):
+    """
+    A WebDriver command issued through a profiled driver
+    """
+
+    def __init__(self, command, operation, path, latency, bytes_sent, bytes_received):
+        """
+        :param command: The WebDriver command (see selenium.webdriver.remote.command.Command)
+        :param operation: The name of the innermost seleniumpm span in progress, or NO_OPERATION
+        :param path: The 'path' argument of that span (e.g. the attribute path of the element), or None
+        :param latency: The number of seconds the command took (i.e. the wire time)
+        :param bytes_sent: The size of the JSON parameters of the command
+        :param bytes_received: The size of the JSON response of the command
+        """
+        self.command = command
+        self.operation = operation
+        self.path = path
+        self.latency = latency
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+
+    def __repr__(self):
+        return "CommandRecord({}, {}, {}, {:.6f}s, {}B, {}B)".format(
+            self.command, self.operation, self.path, self.latency, self.bytes_sent, self.bytes_received)
+
+
+class CommandProfiler(object):
+    """
+    Collects the CommandRecords of the profiled drivers, and notifies its listeners of every command
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """
+        :param listener: A callable taking a CommandRecord, called (on the thread that issued the command)
+                         after every command
+        """
+        with self.lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def record(self, record):
+        with self.lock:
+            self.records.append(record)
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(record)
+
+    def get_records(self):
+        with self.lock:
+            return list(self.records)
+
+    def reset(self):
+        with self.lock:
+            del self.records[:]
+
+    def get_report(self):
+        """
+        :return: {operation: {'commands', 'time', 'bytes_sent', 'bytes_received', 'by_command'}}, where
+                 'time' is the total wire time in seconds and 'by_command' is {command: count}
+        """
+        return summarize_commands(self.get_records(), key=lambda record: record.operation)
+
+    def format_report(self):
+        """
+        :return: The report as a table of one line per operation, the most commands first
+        """
+        report = self.get_report()
+        lines = ["{:<50} {:>8} {:>10} {:>10} {:>10}".format("operation", "commands", "time", "sent",
+                                                            "received")]
+        for operation, stats in sorted(report.items(), key=lambda item: item[1]['commands'], reverse=True):
+            lines.append("{:<50} {:>8} {:>9.3f}s {:>9}B {:>9}B".format(
+                operation, stats['commands'], stats['time'], stats['bytes_sent'], stats['bytes_received']))
+        return "\n".join(lines)
+
+
+def summarize_commands(records, key):
+    """
+    Aggregates CommandRecords
+
+    :param records: A list of CommandRecords
+    :param key: A callable returning the key a CommandRecord is aggregated under
+    :return: {key: {'commands', 'time', 'bytes_sent', 'bytes_received', 'by_command'}}
+    """
+    report = {}
+    for record in records:
+        stats = report.setdefault(key(record), {'commands': 0, 'time': 0.0, 'bytes_sent': 0,
+                                                'bytes_received': 0, 'by_command': {}})
+        stats['commands'] += 1
+        stats['time'] += record.latency
+        stats['bytes_sent'] += record.bytes_sent
+        stats['bytes_received'] += record.bytes_received
+        stats['by_command'][record.command] = stats['by_command'].get(record.command, 0) + 1
+    return report
+
+
+def get_payload_size(payload):
+    if payload is None:
+        return 0
+    return len(json.dumps(payload, default=str))
+
+
+class ProfilingCommandExecutor(object):
+    """
+    Wraps the command executor of a driver (i.e. a RemoteConnection), and records every command that
+    goes through it in a CommandProfiler. Every other attribute is the one of the wrapped executor.
+    """
+
+    def __init__(self, executor, profiler):
+        self.executor = executor
+        self.profiler = profiler
+
+    def execute(self, command, params):
+        stack = tracer.get_stack()
+        start_time = perf_counter()
+        response = None
+        try:
+            response = self.executor.execute(command, params)
+            return response
+        finally:
+            latency = perf_counter() - start_time
+            for span in stack:
+                span.commands += 1
+            current = stack[-1] if stack else None
+            self.profiler.record(CommandRecord(
+                command,
+                current.name if current is not None else NO_OPERATION,
+                current.args.get('path') if current is not None else None,
+                latency,
+                get_payload_size(params),
+                get_payload_size(response)))
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
+
+
+def get_command_profiler(driver):
+    """
+    :return: The CommandProfiler of a profiled driver (see profile_commands()), or None
+    """
+    executor = driver.command_executor
+    return executor.profiler if isinstance(executor, ProfilingCommandExecutor) else None
+
+
+def profile_commands(driver, profiler=None):
+    """
+    Starts profiling the WebDriver commands of a driver. If the driver is already profiled, its current
+    CommandProfiler is kept.
+
+    :param driver: The WebDriver
+    :param profiler: (Default: a new CommandProfiler) The CommandProfiler to record into
+    :return: The CommandProfiler of the driver
+    """
+    current = get_command_profiler(driver)
+    if current is not None:
+        return current
+    profiler = profiler if profiler is not None else CommandProfiler()
+    driver.command_executor = ProfilingCommandExecutor(driver.command_executor, profiler)
+    tracer.track()
+    return profiler
+
+
+def unprofile_commands(driver):
+    """
+    Stops profiling the WebDriver commands of a driver (see profile_commands())
+
+    :return: The CommandProfiler the driver was recording into, or None if it was not profiled
+    """
+    profiler = get_command_profiler(driver)
+    if profiler is not None:
+        driver.command_executor = driver.command_executor.executor
+        tracer.untrack()
+    return profiler
+
+
+class CommandBudgetExceeded(AssertionError):
+    """
+    Raised by command_budget when a block issues more WebDriver commands than its budget
+    """
+
+    def __init__(self, message, records):
+        super(CommandBudgetExceeded, self).__init__(message)
+        self.records = records
+
+
+class command_budget(object):
+    """
+    Asserts that a block issues at most max_commands WebDriver commands (i.e. round trips), so that the
+    round-trip cost of page-model operations can be tested. It can be used as a context manager:
+
+        with command_budget(max_commands=5, driver=driver):
+            page.validate()
+
+    or as a decorator of a Webpage/Element method (or of a function taking one as first argument), in
+    which case the driver defaults to the one of that object:
+
+        @command_budget(max_commands=20)
+        def test_login(self):
+            ...
+
+    Every command issued with the driver (from any thread) during the block counts. If the driver is not
+    already profiled (see profile_commands()), it is profiled for the duration of the block.
+    """
+
+    def __init__(self, max_commands, driver=None):
+        """
+        :param max_commands: The maximum number of WebDriver commands
+        :param driver: (Default: the driver of the decorated method's object) The WebDriver
+        :raises CommandBudgetExceeded: when leaving the block, if it issued more than max_commands. The
+                                       message has the breakdown of the commands per operation.
+        """
+        if max_commands is None or max_commands < 0:
+            raise AttributeError("max_commands must be a number >= 0!")
+        self.max_commands = max_commands
+        self.driver = driver
+        self.records = []
+        self.profiler = None
+        self.profiled = False
+
+    def __enter__(self):
+        if self.driver is None:
+            raise AttributeError("driver was not specified!")
+        self.profiled = get_command_profiler(self.driver) is None
+        self.profiler = profile_commands(self.driver)
+        self.records = []
+        self.profiler.add_listener(self.records.append)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.remove_listener(self.records.append)
+        if self.profiled:
+            unprofile_commands(self.driver)
+        if exc_type is None and len(self.records) > self.max_commands:
+            raise CommandBudgetExceeded(self.get_message(), list(self.records))
+        return False
+
+    @property
+    def count(self):
+        """
+        The number of WebDriver commands issued so far in the block
+        """
+        return len(self.records)
+
+    def get_message(self):
+        """
+        :return: The message of CommandBudgetExceeded, with the commands per operation, e.g.
+                 'MyPage.validate: 7 (findElement=6, executeScript=1)'
+        """
+        lines = ["{} WebDriver commands were issued, but the budget is {}:".format(
+            len(self.records), self.max_commands)]
+        report = summarize_commands(self.records, key=lambda record: record.operation)
+        for operation, stats in sorted(report.items(), key=lambda item: item[1]['commands'], reverse=True):
+            lines.append("    {}: {} ({})".format(operation, stats['commands'], ", ".join(
+                "{}={}".format(command, count) for command, count in
+                sorted(stats['by_command'].items(), key=lambda item: item[1], reverse=True))))
+        return "\n".join(lines)
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            driver = self.driver if self.driver is not None else getattr(args[0], "driver", None) \
+                if args else None
+            with command_budget(self.max_commands, driver=driver):
+                return func(*args, **kwargs)
+        return wrapper
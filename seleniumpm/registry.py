@@ -0,0 +1,137 @@
+"""
+Bookkeeping of the Element-valued attributes defined on a Webpage or Widget.
+
+Webpage and Widget record the name of every attribute holding an Element at the moment it is
+assigned (see their __setattr__), so that traversals like get_element_attr() only need to visit
+the registered names instead of walking dir() and evaluating every attribute (including
+user-defined @property getters) on every call.
+
+The same bookkeeping is used to memoize the flattened name->Element index that backs
+Webpage.__getattr__ and Widget.__getattr__.
+"""
+import threading
+
+from seleniumpm.webelements.element import Element
+
+# Cache of Element-valued class attributes, computed once per class
+_class_element_attrs = {}
+
+# Guards the generations of the Webpages and Widgets (see _invalidate())
+_generation_lock = threading.Lock()
+
+
+def _get_generation(obj):
+    return obj.__dict__.get('_element_generation', 0)
+
+
+def _invalidate(obj):
+    """
+    Increments the generation of obj and of every Widget/Webpage it belongs to (following the
+    _container/_page back-references), so that only the cached element indexes of that tree are
+    rebuilt
+    """
+    with _generation_lock:
+        node = obj
+        while node is not None:
+            node.__dict__['_element_generation'] = _get_generation(node) + 1
+            node = node.__dict__.get('_container') or node.__dict__.get('_page')
+
+
+def get_class_element_attrs(cls):
+    """
+    Returns the names of the Element-valued attributes defined at the class level of cls (and its
+    base classes). This is computed once per class and then cached.
+
+    :param cls: A Webpage or Widget class
+    :return: A frozenset of attribute names
+    """
+    names = _class_element_attrs.get(cls)
+    if names is None:
+        found = set()
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, Element):
+                    found.add(name)
+                else:
+                    found.discard(name)
+        names = _class_element_attrs[cls] = frozenset(found)
+    return names
+
+
+def register_element_attr(obj, name, value):
+    """
+    Adds or removes an attribute name from the instance registry of obj depending on whether the
+    value being assigned is an Element. This should be called from __setattr__.
+
+    :param obj: The Webpage or Widget the attribute is being set on
+    :param name: The attribute name
+    :param value: The value being assigned
+    """
+    registry = obj.__dict__.get('_element_attrs')
+    if registry is None:
+        registry = obj.__dict__['_element_attrs'] = set()
+    if isinstance(value, Element):
+        registry.add(name)
+        _invalidate(obj)
+    elif name in registry:
+        registry.remove(name)
+        _invalidate(obj)
+
+
+def unregister_element_attr(obj, name):
+    """
+    Removes an attribute name from the instance registry of obj. This should be called from
+    __delattr__.
+
+    :param obj: The Webpage or Widget the attribute is being deleted from
+    :param name: The attribute name
+    """
+    registry = obj.__dict__.get('_element_attrs', ())
+    if name in registry:
+        registry.remove(name)
+        _invalidate(obj)
+
+
+def get_local_element_attrs(obj):
+    """
+    Returns the names of the Element-valued attributes that were assigned on the instance itself
+
+    :param obj: A Webpage or Widget instance
+    :return: A sorted list of attribute names
+    """
+    return sorted(obj.__dict__.get('_element_attrs', ()))
+
+
+def get_element_attrs(obj):
+    """
+    Returns the names of all the Element-valued attributes of obj, both instance and class level.
+    The names are sorted to preserve the ordering that dir() used to provide.
+
+    :param obj: A Webpage or Widget instance
+    :return: A sorted list of attribute names
+    """
+    local_attrs = obj.__dict__.get('_element_attrs', ())
+    names = set(local_attrs)
+    for name in get_class_element_attrs(type(obj)):
+        # An instance attribute that is not an Element shadows the class-level Element
+        if name not in obj.__dict__ or name in local_attrs:
+            names.add(name)
+    return sorted(names)
+
+
+def get_element_index(obj, build):
+    """
+    Returns the memoized name->Element index of obj. The index is (re)built by calling build()
+    the first time, and again whenever an Element attribute was added or removed anywhere in the
+    Widget/Panel/IFrame tree of obj since it was last built. Changes to other Webpages and
+    Widgets do not invalidate it.
+
+    :param obj: A Webpage or Widget instance
+    :param build: A callable returning a dict of all the elements reachable from obj
+    :return: A dict of attribute names to Elements. This must not be modified by the caller
+    """
+    generation = _get_generation(obj)
+    cached = obj.__dict__.get('_element_index')
+    if cached is None or cached[0] != generation:
+        cached = obj.__dict__['_element_index'] = (generation, build())
+    return cached[1]
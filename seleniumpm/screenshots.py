@@ -0,0 +1,358 @@
+"""
+Writing of the screenshots taken by Webpage.take_screenshot() and Element.take_screenshot().
+
+The screenshot itself has to be fetched from the driver on the calling thread, but decoding it and
+writing it to disk does not. With seleniumconfig.async_screenshots = True, the base64 data is handed
+to a ScreenshotWriter, whose worker threads do the decoding, directory creation and file I/O. The
+queue of the writer is bounded: when it is full, take_screenshot() blocks until a worker catches up.
+
+Call flush() (e.g. in the teardown of a test) to wait for every pending screenshot to be written:
+
+    import seleniumpm.screenshots as screenshots
+
+    seleniumconfig.async_screenshots = True
+    page.take_screenshot()
+    ...
+    screenshots.flush()
+
+With seleniumconfig.screenshot_buffer_size > 0, screenshots are not written at all: take_screenshot() keeps
+the last screenshot_buffer_size of them in memory (see ScreenshotBuffer), and they are only written when
+a validation times out (see flush_on_error) or when flush_buffer() is called, e.g. on a test failure.
+"""
+from collections import deque
+from functools import wraps
+import atexit
+import base64
+import errno
+import hashlib
+import logging
+import os
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+import seleniumpm.config as seleniumconfig
+from seleniumpm.artifacts import get_artifact_store
+
+log = logging.getLogger(__name__)
+
+
+def get_screenshot_filename(screenshot_dir, screenshot_name):
+    return "%s/%s.png" % (screenshot_dir, screenshot_name)
+
+
+def write_screenshot(filename, base64_data):
+    """
+    Decodes a base64 screenshot (i.e. driver.get_screenshot_as_base64()) and writes it as a PNG file,
+    creating its directory if needed
+
+    :param filename: The path of the PNG file
+    :param base64_data: The base64 encoded PNG
+    :return: filename
+    """
+    screenshot_dir = os.path.dirname(filename)
+    if screenshot_dir and not os.path.exists(screenshot_dir):
+        try:
+            os.makedirs(screenshot_dir)
+        except OSError as e:
+            # Another thread or process created it in the meantime
+            if e.errno != errno.EEXIST:
+                raise
+    with open(filename, "wb") as screenshot_file:
+        screenshot_file.write(base64.b64decode(base64_data))
+    return filename
+
+
+class ScreenshotWriter(object):
+    """
+    Writes screenshots on background worker threads (see write_screenshot()), through a bounded queue
+    """
+
+    def __init__(self, max_queue_size=None, workers=None):
+        """
+        :param max_queue_size: (Default: seleniumconfig.screenshot_queue_size) The number of screenshots
+                               that can be pending. submit() blocks while the queue is full.
+        :param workers: (Default: seleniumconfig.screenshot_writer_workers) The number of worker threads
+        """
+        self.max_queue_size = max_queue_size if max_queue_size is not None \
+            else seleniumconfig.screenshot_queue_size
+        self.workers = workers if workers is not None else seleniumconfig.screenshot_writer_workers
+        self.queue = queue.Queue(maxsize=self.max_queue_size)
+        self.lock = threading.Lock()
+        self.errors = []
+        self.threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.run, name="seleniumpm-screenshot-writer-{}".format(i))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def run(self):
+        while True:
+            filename, base64_data = self.queue.get()
+            try:
+                write_screenshot(filename, base64_data)
+            except Exception as e:
+                log.error("Failed to save Screenshot at {}: {}".format(filename, e))
+                with self.lock:
+                    self.errors.append((filename, e))
+            finally:
+                self.queue.task_done()
+
+    def submit(self, filename, base64_data):
+        """
+        Queues a screenshot to be written. This blocks while the queue is full.
+
+        :param filename: The path of the PNG file
+        :param base64_data: The base64 encoded PNG
+        :return: filename
+        """
+        self.queue.put((filename, base64_data))
+        return filename
+
+    def pending(self):
+        """
+        :return: The (approximate) number of screenshots that are queued but not yet written
+        """
+        return self.queue.unfinished_tasks
+
+    def flush(self):
+        """
+        Waits until every submitted screenshot is written
+
+        :return: A list of (filename, exception) of the screenshots that failed to be written since the
+                 last flush()
+        """
+        self.queue.join()
+        with self.lock:
+            errors = self.errors
+            self.errors = []
+        return errors
+
+
+# The ScreenshotWriter used when seleniumconfig.async_screenshots is on (created on first use)
+screenshot_writer = None
+screenshot_writer_lock = threading.Lock()
+
+
+def get_screenshot_writer():
+    global screenshot_writer
+    with screenshot_writer_lock:
+        if screenshot_writer is None:
+            screenshot_writer = ScreenshotWriter()
+            # Pending screenshots would be lost with the (daemon) worker threads at exit
+            atexit.register(flush)
+        return screenshot_writer
+
+
+class BufferedScreenshot(object):
+    """
+    A screenshot kept in a ScreenshotBuffer
+    """
+
+    def __init__(self, filename, base64_data, step=None, timestamp=None, page=None):
+        """
+        :param filename: The path the PNG file will be written to, or None if the screenshot goes to the
+                         ArtifactStore (see store_screenshot())
+        :param base64_data: The base64 encoded PNG
+        :param step: (Default: None) What the screenshot was taken of (e.g. the Webpage class name)
+        :param timestamp: (Default: now) When the screenshot was taken
+        :param page: (Default: None) The Webpage class name recorded in the ArtifactStore
+        """
+        self.filename = filename
+        self.base64_data = base64_data
+        self.step = step
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.page = page
+
+    def __repr__(self):
+        return "BufferedScreenshot({}, {}, {})".format(self.filename, self.step, self.timestamp)
+
+
+class ScreenshotBuffer(object):
+    """
+    A ring buffer of the last screenshots taken, bounded both in number and in bytes. The oldest screenshots
+    are dropped to make room for new ones.
+    """
+
+    def __init__(self, max_screenshots=None, max_bytes=None):
+        """
+        :param max_screenshots: (Default: seleniumconfig.screenshot_buffer_size) The number of screenshots
+        :param max_bytes: (Default: seleniumconfig.screenshot_buffer_max_bytes) The total size of the
+                          (base64 encoded) screenshots
+        """
+        self.max_screenshots = max_screenshots
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.screenshots = deque()
+        self.size = 0
+
+    def add(self, screenshot):
+        max_screenshots = self.max_screenshots if self.max_screenshots is not None \
+            else seleniumconfig.screenshot_buffer_size
+        max_bytes = self.max_bytes if self.max_bytes is not None else seleniumconfig.screenshot_buffer_max_bytes
+        with self.lock:
+            self.screenshots.append(screenshot)
+            self.size += len(screenshot.base64_data)
+            while self.screenshots and (len(self.screenshots) > max_screenshots or self.size > max_bytes):
+                self.size -= len(self.screenshots.popleft().base64_data)
+
+    def get_screenshots(self):
+        """
+        :return: The buffered screenshots, oldest first
+        """
+        with self.lock:
+            return list(self.screenshots)
+
+    def clear(self):
+        """
+        Empties the buffer
+
+        :return: The screenshots that were in the buffer, oldest first
+        """
+        with self.lock:
+            screenshots = list(self.screenshots)
+            self.screenshots.clear()
+            self.size = 0
+        return screenshots
+
+    def flush(self, async_screenshots=None):
+        """
+        Writes every buffered screenshot (see write_screenshot()), or puts it in the ArtifactStore if it was
+        taken with seleniumconfig.artifact_store on, and empties the buffer
+
+        :param async_screenshots: (Default: seleniumconfig.async_screenshots) Writes on the ScreenshotWriter
+        :return: The screenshots that were written, oldest first
+        """
+        screenshots = self.clear()
+        for screenshot in screenshots:
+            log.warning("Saving buffered Screenshot of {} taken at {} at {}".format(
+                screenshot.step, time.strftime('%Y_%m_%d-%H_%M_%S', time.localtime(screenshot.timestamp)),
+                screenshot.filename or get_artifact_store().artifact_dir))
+            if screenshot.filename is None:
+                get_artifact_store().put(base64.b64decode(screenshot.base64_data), kind="screenshot",
+                                         page=screenshot.page, step=screenshot.step, ext="png",
+                                         timestamp=screenshot.timestamp)
+            else:
+                write(screenshot.filename, screenshot.base64_data, async_screenshots=async_screenshots)
+        return screenshots
+
+
+# The ScreenshotBuffer used when seleniumconfig.screenshot_buffer_size > 0
+screenshot_buffer = ScreenshotBuffer()
+
+
+def write(filename, base64_data, async_screenshots=None):
+    """
+    Writes a screenshot, either synchronously or through the ScreenshotWriter
+
+    :param filename: The path of the PNG file
+    :param base64_data: The base64 encoded PNG
+    :param async_screenshots: (Default: seleniumconfig.async_screenshots) Writes on the ScreenshotWriter
+    :return: filename
+    """
+    async_screenshots = async_screenshots if async_screenshots is not None else seleniumconfig.async_screenshots
+    if async_screenshots:
+        return get_screenshot_writer().submit(filename, base64_data)
+    return write_screenshot(filename, base64_data)
+
+
+def save_screenshot(filename, base64_data, step=None, async_screenshots=None):
+    """
+    Saves a screenshot taken by take_screenshot(): it is kept in the screenshot_buffer when
+    seleniumconfig.screenshot_buffer_size > 0, and written otherwise (see write())
+
+    :param filename: The path of the PNG file
+    :param base64_data: The base64 encoded PNG
+    :param step: (Default: None) What the screenshot was taken of (e.g. the Webpage class name)
+    :param async_screenshots: (Default: seleniumconfig.async_screenshots) Writes on the ScreenshotWriter
+    :return: filename
+    """
+    if seleniumconfig.screenshot_buffer_size > 0:
+        screenshot_buffer.add(BufferedScreenshot(filename, base64_data, step=step))
+        return filename
+    return write(filename, base64_data, async_screenshots=async_screenshots)
+
+
+def store_screenshot(base64_data, page=None, step=None):
+    """
+    Stores a screenshot in the ArtifactStore (see seleniumpm.artifacts), when seleniumconfig.artifact_store
+    is on. Like save_screenshot(), the screenshot is kept in the screenshot_buffer when
+    seleniumconfig.screenshot_buffer_size > 0, and only put in the ArtifactStore when the buffer is flushed.
+    It is never stored asynchronously.
+
+    :param base64_data: The base64 encoded PNG
+    :param page: (Default: None) The Webpage class name the screenshot was taken on
+    :param step: (Default: None) The step the screenshot was taken at (e.g. the screenshot name)
+    :return: The sha256 of the PNG (which is known before the screenshot is stored)
+    """
+    png = base64.b64decode(base64_data)
+    if seleniumconfig.screenshot_buffer_size > 0:
+        screenshot_buffer.add(BufferedScreenshot(None, base64_data, step=step, page=page))
+        return hashlib.sha256(png).hexdigest()
+    return get_artifact_store().put(png, kind="screenshot", page=page, step=step, ext="png")
+
+
+def flush_buffer(async_screenshots=None):
+    """
+    Writes the screenshots of the screenshot_buffer (e.g. when a test fails)
+
+    :param async_screenshots: (Default: seleniumconfig.async_screenshots) Writes on the ScreenshotWriter
+    :return: The screenshots that were written, oldest first
+    """
+    return screenshot_buffer.flush(async_screenshots=async_screenshots)
+
+
+class flush_on_error(object):
+    """
+    Writes the screenshots of the screenshot_buffer when a block raises one of the given exceptions. It can
+    be used as a context manager or a decorator:
+
+        with flush_on_error():
+            page.open(wait_for_page_load=True)
+            page.search_field.type("foo")
+
+    Webpage/Widget validate() and wait_for_page_load() flush on TimeoutException. Nothing is written
+    while seleniumconfig.screenshot_enabled is off (e.g. during Webpage.is_page()).
+    """
+
+    def __init__(self, exceptions=(Exception,)):
+        """
+        :param exceptions: (Default: any Exception) The exception type(s) that trigger the flush
+        """
+        self.exceptions = exceptions
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and issubclass(exc_type, self.exceptions) and seleniumconfig.screenshot_enabled:
+            try:
+                flush_buffer()
+            except Exception as e:
+                # Never hide the original error
+                log.error("Failed to save the buffered Screenshots: {}".format(e))
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def flush():
+    """
+    Waits until every screenshot written asynchronously is on disk
+
+    :return: A list of (filename, exception) of the screenshots that failed to be written
+    """
+    with screenshot_writer_lock:
+        writer = screenshot_writer
+    return writer.flush() if writer is not None else []
+
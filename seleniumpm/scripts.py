@@ -0,0 +1,607 @@
+"""
+JavaScript snippets that are executed in the browser through driver.execute_script(). These allow
+seleniumpm to do in a single round trip what would otherwise take one WebDriver call per element.
+
+All the snippets share the same helpers for resolving a seleniumpm Locator (by, value) in the
+browser, so that they understand the same locator strategies as driver.find_element().
+"""
+
+# Helper functions prepended to every script:
+#
+#   seleniumpmFindAll(by, value, root) - All the nodes matching a locator strategy (see
+#                                        selenium.webdriver.common.by.By) under root
+#   seleniumpmFind(by, value, root)    - The first matching node or null
+#   seleniumpmIsVisible(el)            - An approximation of WebElement.is_displayed()
+#   seleniumpmGetText(el)              - An approximation of WebElement.text (the innerText, with
+#                                        whitespace normalized and '' for hidden nodes). See
+#                                        Element.get_texts_in_browser() for where they differ
+HELPERS_JS = """
+function seleniumpmFindAll(by, value, root) {
+    root = root || document;
+    var doc = root.ownerDocument || root;
+    var found = [];
+    var i;
+    if (by === 'xpath') {
+        var snapshot = doc.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (i = 0; i < snapshot.snapshotLength; i++) {
+            found.push(snapshot.snapshotItem(i));
+        }
+        return found;
+    }
+    if (by === 'css selector') {
+        return Array.prototype.slice.call(root.querySelectorAll(value));
+    }
+    if (by === 'id' && root === doc) {
+        var byId = doc.getElementById(value);
+        return byId ? [byId] : [];
+    }
+    if (by === 'id' || by === 'name') {
+        var nodes = root.getElementsByTagName('*');
+        for (i = 0; i < nodes.length; i++) {
+            if (nodes[i].getAttribute(by) === value) {
+                found.push(nodes[i]);
+            }
+        }
+        return found;
+    }
+    if (by === 'class name') {
+        return Array.prototype.slice.call(root.getElementsByClassName(value));
+    }
+    if (by === 'tag name') {
+        return Array.prototype.slice.call(root.getElementsByTagName(value));
+    }
+    if (by === 'link text' || by === 'partial link text') {
+        var links = root.getElementsByTagName('a');
+        for (i = 0; i < links.length; i++) {
+            var text = (links[i].innerText || links[i].textContent || '').trim();
+            if (by === 'link text' ? text === value : text.indexOf(value) !== -1) {
+                found.push(links[i]);
+            }
+        }
+        return found;
+    }
+    throw new Error('Unsupported locator strategy: ' + by);
+}
+
+function seleniumpmFind(by, value, root) {
+    var found = seleniumpmFindAll(by, value, root);
+    return found.length > 0 ? found[0] : null;
+}
+
+function seleniumpmGetText(el) {
+    if (!seleniumpmIsVisible(el)) {
+        return '';
+    }
+    var text = el.innerText;
+    if (typeof text !== 'string') {
+        text = el.textContent || '';
+    }
+    var lines = text.replace(/\\r\\n?/g, '\\n').replace(/\\u00a0/g, ' ').split('\\n');
+    for (var i = 0; i < lines.length; i++) {
+        lines[i] = lines[i].replace(/[ \\t\\f\\v]+/g, ' ').trim();
+    }
+    return lines.join('\\n').replace(/^\\n+|\\n+$/g, '');
+}
+
+function seleniumpmIsVisible(el) {
+    if (!el || el.nodeType !== 1) {
+        return false;
+    }
+    var win = (el.ownerDocument || document).defaultView;
+    var style = win.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.visibility === 'collapse' || style.opacity === '0') {
+        return false;
+    }
+    for (var node = el; node && node.nodeType === 1; node = node.parentNode) {
+        if (win.getComputedStyle(node).display === 'none') {
+            return false;
+        }
+    }
+    return el.offsetWidth > 0 || el.offsetHeight > 0 || el.getClientRects().length > 0;
+}
+"""
+
+# Checks a list of locators in one go
+#
+#   arguments[0] - A list of [by, value, check_visible, root]. 'root' is the node to search from
+#                  for that locator, or null to use arguments[1]
+#   arguments[1] - (Optional) The root node to search from. Default: document
+#
+# Returns a list of [present, visible] for each locator. 'visible' is always true if
+# check_visible was false.
+BATCH_VALIDATE_JS = HELPERS_JS + """
+var locators = arguments[0];
+var root = arguments[1] || document;
+var results = [];
+for (var i = 0; i < locators.length; i++) {
+    var el = null;
+    try {
+        el = seleniumpmFind(locators[i][0], locators[i][1], locators[i][3] || root);
+    } catch (e) {
+        el = null;
+    }
+    var present = el !== null;
+    results.push([present, present && (!locators[i][2] || seleniumpmIsVisible(el))]);
+}
+return results;
+"""
+
+# Reads the rendered text of every node matching a locator in one go
+#
+#   arguments[0] - The locator strategy (by)
+#   arguments[1] - The locator value
+#   arguments[2] - (Optional) The root node to search from. Default: document
+#
+# Returns a list of strings, in document order (i.e. the order of driver.find_elements())
+GET_TEXTS_JS = HELPERS_JS + """
+var found = seleniumpmFindAll(arguments[0], arguments[1], arguments[2] || document);
+var texts = [];
+for (var i = 0; i < found.length; i++) {
+    texts.push(seleniumpmGetText(found[i]));
+}
+return texts;
+"""
+
+# Reads the whole grid of a table in one go. The headers are the 'thead/tr/th' cells and the rows are
+# the 'tbody/tr' rows with their 'td' cells, the same as the xpaths used by seleniumpm Table.
+#
+#   arguments[0] - The locator strategy (by) of the table
+#   arguments[1] - The locator value of the table
+#   arguments[2] - (Optional) The root node to search from. Default: document
+#
+# Returns {columns: [text, ...], rows: [[text, ...], ...]}, or null if the table was not found
+TABLE_SNAPSHOT_JS = HELPERS_JS + """
+var table = seleniumpmFind(arguments[0], arguments[1], arguments[2] || document);
+if (table === null) {
+    return null;
+}
+
+function childrenByTag(node, tag) {
+    var found = [];
+    for (var i = 0; i < node.children.length; i++) {
+        if (node.children[i].tagName.toLowerCase() === tag) {
+            found.push(node.children[i]);
+        }
+    }
+    return found;
+}
+
+function cellTexts(section, rowTag, cellTag) {
+    var rows = [];
+    var sections = childrenByTag(table, section);
+    for (var s = 0; s < sections.length; s++) {
+        var trs = childrenByTag(sections[s], rowTag);
+        for (var r = 0; r < trs.length; r++) {
+            var cells = childrenByTag(trs[r], cellTag);
+            var texts = [];
+            for (var c = 0; c < cells.length; c++) {
+                texts.push(seleniumpmGetText(cells[c]));
+            }
+            rows.push(texts);
+        }
+    }
+    return rows;
+}
+
+var columns = [];
+var headers = cellTexts('thead', 'tr', 'th');
+for (var h = 0; h < headers.length; h++) {
+    columns = columns.concat(headers[h]);
+}
+return {columns: columns, rows: cellTexts('tbody', 'tr', 'td')};
+"""
+
+# Reads a window of rows of a table, i.e. the '(tbody/tr)[position() > first and position() <= last]' rows
+#
+#   arguments[0] - The locator strategy (by) of the table
+#   arguments[1] - The locator value of the table
+#   arguments[2] - (Optional) The root node to search from. Default: document
+#   arguments[3] - The number of rows to skip (first)
+#   arguments[4] - The position of the last row of the window (last)
+#
+# Returns a list of rows, each being a list of the 'td' cell texts, or null if the table was not found
+TABLE_ROWS_JS = HELPERS_JS + """
+var table = seleniumpmFind(arguments[0], arguments[1], arguments[2] || document);
+if (table === null) {
+    return null;
+}
+var rows = seleniumpmFindAll('xpath', '(./tbody/tr)[position() > ' + Number(arguments[3]) +
+                             ' and position() <= ' + Number(arguments[4]) + ']', table);
+var results = [];
+for (var r = 0; r < rows.length; r++) {
+    var texts = [];
+    for (var c = 0; c < rows[r].children.length; c++) {
+        if (rows[r].children[c].tagName.toLowerCase() === 'td') {
+            texts.push(seleniumpmGetText(rows[r].children[c]));
+        }
+    }
+    results.push(texts);
+}
+return results;
+"""
+
+# Filters the rows of a table in the browser, so that only the matching rows are sent back
+#
+#   arguments[0] - The locator strategy (by) of the table
+#   arguments[1] - The locator value of the table
+#   arguments[2] - (Optional) The root node to search from. Default: document
+#   arguments[3] - A list of predicates [column, operator, value, regex_flags] that must all match. 'column'
+#                  starts at 1 (like td[n]) and 'operator' is one of '==', '!=', 'contains', '~=' (regular
+#                  expression search), '>', '>=', '<' or '<=' (compared with the first number in the cell)
+#   arguments[4] - null to return the row indexes only. Otherwise, a list of the columns to return (an empty
+#                  list returns every cell)
+#
+# Returns a list of row indexes (starting at 0), or a list of [row index, [text, ...]], or null if the table
+# was not found
+TABLE_QUERY_JS = HELPERS_JS + """
+var table = seleniumpmFind(arguments[0], arguments[1], arguments[2] || document);
+if (table === null) {
+    return null;
+}
+var predicates = arguments[3];
+var columns = arguments[4];
+var numberRe = /([\\-]*\\d+\\.\\d+|[\\-]*\\d+)/;
+var regexes = [];
+for (var p = 0; p < predicates.length; p++) {
+    regexes.push(predicates[p][1] === '~=' ? new RegExp(predicates[p][2], predicates[p][3]) : null);
+}
+
+function matches(text, p) {
+    var operator = predicates[p][1];
+    var value = predicates[p][2];
+    if (text === null) {
+        return false;
+    }
+    if (operator === '==') {
+        return text === value;
+    }
+    if (operator === '!=') {
+        return text !== value;
+    }
+    if (operator === 'contains') {
+        return text.indexOf(value) !== -1;
+    }
+    if (operator === '~=') {
+        return regexes[p].test(text);
+    }
+    var found = text.match(numberRe);
+    var number = found ? parseFloat(found[1]) : NaN;
+    if (isNaN(number)) {
+        return false;
+    }
+    if (operator === '>') {
+        return number > value;
+    }
+    if (operator === '>=') {
+        return number >= value;
+    }
+    if (operator === '<') {
+        return number < value;
+    }
+    return number <= value;
+}
+
+var results = [];
+var index = 0;
+for (var s = 0; s < table.children.length; s++) {
+    if (table.children[s].tagName.toLowerCase() !== 'tbody') {
+        continue;
+    }
+    var rows = table.children[s].children;
+    for (var r = 0; r < rows.length; r++) {
+        if (rows[r].tagName.toLowerCase() !== 'tr') {
+            continue;
+        }
+        var cells = [];
+        for (var c = 0; c < rows[r].children.length; c++) {
+            if (rows[r].children[c].tagName.toLowerCase() === 'td') {
+                cells.push(rows[r].children[c]);
+            }
+        }
+        var texts = {};
+        var text = function (column) {
+            if (!(column in texts)) {
+                texts[column] = column >= 1 && column <= cells.length ? seleniumpmGetText(cells[column - 1]) : null;
+            }
+            return texts[column];
+        };
+        var matched = true;
+        for (p = 0; p < predicates.length && matched; p++) {
+            matched = matches(text(predicates[p][0]), p);
+        }
+        if (matched) {
+            if (columns === null) {
+                results.push(index);
+            } else {
+                var values = [];
+                var selected = columns.length > 0 ? columns : cells.map(function (cell, i) { return i + 1; });
+                for (c = 0; c < selected.length; c++) {
+                    values.push(text(selected[c]));
+                }
+                results.push([index, values]);
+            }
+        }
+        index++;
+    }
+}
+return results;
+"""
+
+# Reads the columns of a table as numbers, i.e. the first number (see seleniumpm number_re) of each 'td' cell
+#
+#   arguments[0] - The locator strategy (by) of the table
+#   arguments[1] - The locator value of the table
+#   arguments[2] - (Optional) The root node to search from. Default: document
+#   arguments[3] - The columns to read (starting at 1, like td[n]). An empty list reads every column.
+#
+# Returns {columns: [column, ...], values: [[number or null, ...], ...], integers: [bool, ...]} with one
+# 'values' list per column (null if the cell has no number or the row has no such cell) and whether every
+# value of the column is an integer, or null if the table was not found
+TABLE_NUMBERS_JS = HELPERS_JS + """
+var table = seleniumpmFind(arguments[0], arguments[1], arguments[2] || document);
+if (table === null) {
+    return null;
+}
+var columns = arguments[3];
+var numberRe = /([\\-]*\\d+\\.\\d+|[\\-]*\\d+)/;
+var rows = [];
+var widest = 0;
+for (var s = 0; s < table.children.length; s++) {
+    if (table.children[s].tagName.toLowerCase() !== 'tbody') {
+        continue;
+    }
+    var trs = table.children[s].children;
+    for (var r = 0; r < trs.length; r++) {
+        if (trs[r].tagName.toLowerCase() !== 'tr') {
+            continue;
+        }
+        var cells = [];
+        for (var c = 0; c < trs[r].children.length; c++) {
+            if (trs[r].children[c].tagName.toLowerCase() === 'td') {
+                cells.push(trs[r].children[c]);
+            }
+        }
+        widest = Math.max(widest, cells.length);
+        rows.push(cells);
+    }
+}
+if (columns.length === 0) {
+    for (c = 1; c <= widest; c++) {
+        columns.push(c);
+    }
+}
+var values = [];
+var integers = [];
+for (c = 0; c < columns.length; c++) {
+    var column = [];
+    var integer = true;
+    for (r = 0; r < rows.length; r++) {
+        var cell = rows[r][columns[c] - 1];
+        var found = cell ? seleniumpmGetText(cell).match(numberRe) : null;
+        var number = found ? parseFloat(found[1]) : NaN;
+        if (isNaN(number)) {
+            column.push(null);
+            integer = false;
+        } else {
+            column.push(number);
+            integer = integer && found[1].indexOf('.') === -1;
+        }
+    }
+    values.push(column);
+    integers.push(integer);
+}
+return {columns: columns, values: values, integers: integers};
+"""
+
+# A DOM-change counter for a table. A MutationObserver is installed on the table the first time, and the
+# returned version changes whenever the content of the table changes (or the table node is replaced).
+TABLE_VERSION_HELPERS_JS = """
+function seleniumpmTableVersion(table) {
+    if (!table.seleniumpmTableId) {
+        window.seleniumpmTableIds = (window.seleniumpmTableIds || 0) + 1;
+        table.seleniumpmTableId = window.seleniumpmTableIds;
+        table.seleniumpmTableChanges = 0;
+        new MutationObserver(function () {
+            table.seleniumpmTableChanges++;
+        }).observe(table, {childList: true, subtree: true, characterData: true});
+    }
+    return table.seleniumpmTableId + ':' + table.seleniumpmTableChanges;
+}
+"""
+
+# Returns the DOM-change version of a table (see TABLE_VERSION_HELPERS_JS)
+#
+#   arguments[0] - The locator strategy (by) of the table
+#   arguments[1] - The locator value of the table
+#   arguments[2] - (Optional) The root node to search from. Default: document
+#
+# Returns the version, or null if the table was not found
+TABLE_VERSION_JS = HELPERS_JS + TABLE_VERSION_HELPERS_JS + """
+var table = seleniumpmFind(arguments[0], arguments[1], arguments[2] || document);
+return table === null ? null : seleniumpmTableVersion(table);
+"""
+
+# Reads the text of one column of a table, i.e. the 'tbody/tr/td[n]' cells
+#
+#   arguments[0] - The locator strategy (by) of the table
+#   arguments[1] - The locator value of the table
+#   arguments[2] - (Optional) The root node to search from. Default: document
+#   arguments[3] - The column (starting at 1, like td[n])
+#
+# Returns {version: ..., cells: [text or null, ...]} with one entry per row (null if the row has no such
+# cell), or null if the table was not found
+TABLE_COLUMN_JS = HELPERS_JS + TABLE_VERSION_HELPERS_JS + """
+var table = seleniumpmFind(arguments[0], arguments[1], arguments[2] || document);
+if (table === null) {
+    return null;
+}
+var column = arguments[3];
+var cells = [];
+for (var s = 0; s < table.children.length; s++) {
+    if (table.children[s].tagName.toLowerCase() !== 'tbody') {
+        continue;
+    }
+    var rows = table.children[s].children;
+    for (var r = 0; r < rows.length; r++) {
+        if (rows[r].tagName.toLowerCase() !== 'tr') {
+            continue;
+        }
+        var cell = null;
+        var count = 0;
+        for (var c = 0; c < rows[r].children.length; c++) {
+            if (rows[r].children[c].tagName.toLowerCase() === 'td' && ++count === column) {
+                cell = seleniumpmGetText(rows[r].children[c]);
+                break;
+            }
+        }
+        cells.push(cell);
+    }
+}
+return {version: seleniumpmTableVersion(table), cells: cells};
+"""
+
+# Waits in the browser for a condition on a locator, using a MutationObserver so that the callback
+# fires as soon as the DOM changes (with a short in-browser poll as a fallback for changes that do
+# not mutate the DOM, like a checkbox being checked or a stylesheet finishing to load). This is
+# meant for driver.execute_async_script().
+#
+#   arguments[0] - The locator strategy (by)
+#   arguments[1] - The locator value
+#   arguments[2] - The condition: 'present', 'visible' or 'selected'
+#   arguments[3] - The timeout in milliseconds
+#   arguments[4] - (Optional) The root node to search from. Default: document
+#
+# Calls back with true if the condition was met before the timeout; false otherwise.
+WAIT_FOR_CONDITION_JS = HELPERS_JS + """
+var by = arguments[0];
+var value = arguments[1];
+var condition = arguments[2];
+var timeoutMs = arguments[3];
+var root = arguments[4] || document;
+var callback = arguments[arguments.length - 1];
+
+function check() {
+    var el = null;
+    try {
+        el = seleniumpmFind(by, value, root);
+    } catch (e) {
+        return false;
+    }
+    if (el === null) {
+        return false;
+    }
+    if (condition === 'visible') {
+        return seleniumpmIsVisible(el);
+    }
+    if (condition === 'selected') {
+        return !!(el.selected || el.checked);
+    }
+    return true;
+}
+
+if (check()) {
+    callback(true);
+} else {
+    var finished = false;
+    var observer = null;
+    var interval = null;
+    var timer = null;
+    var finish = function (result) {
+        if (finished) {
+            return;
+        }
+        finished = true;
+        observer.disconnect();
+        clearInterval(interval);
+        clearTimeout(timer);
+        callback(result);
+    };
+    observer = new MutationObserver(function () {
+        if (check()) {
+            finish(true);
+        }
+    });
+    observer.observe(document.documentElement,
+                     {childList: true, subtree: true, attributes: true, characterData: true});
+    interval = setInterval(function () {
+        if (check()) {
+            finish(true);
+        }
+    }, 100);
+    timer = setTimeout(function () {
+        finish(check());
+    }, timeoutMs);
+}
+"""
+
+# Reads the Navigation Timing of the current document, preferring the Navigation Timing Level 2 entry
+# (performance.getEntriesByType('navigation')) over the deprecated performance.timing.
+#
+# Returns {dns, connect, ttfb, dom_content_loaded, load} in milliseconds, where dns and connect are
+# the durations of those phases and the others are relative to the start of the navigation. An event
+# that has not happened yet (e.g. load while the load event is still running) is null. Returns null if
+# the browser does not support Navigation Timing.
+NAVIGATION_TIMING_JS = """
+var perf = window.performance;
+if (!perf) {
+    return null;
+}
+var entry = perf.getEntriesByType ? perf.getEntriesByType('navigation')[0] : null;
+var start = 0;
+if (!entry) {
+    entry = perf.timing;
+    if (!entry || !entry.navigationStart) {
+        return null;
+    }
+    start = entry.navigationStart;
+}
+function since(end) {
+    return end > 0 ? end - start : null;
+}
+return {
+    dns: entry.domainLookupEnd - entry.domainLookupStart,
+    connect: entry.connectEnd - entry.connectStart,
+    ttfb: since(entry.responseStart),
+    dom_content_loaded: since(entry.domContentLoadedEventEnd),
+    load: since(entry.loadEventEnd)
+};
+"""
+
+# Reads the Resource Timing entries of the current document (i.e. every image, script, stylesheet, XHR,
+# etc. that was fetched), in the order they were started.
+#
+# Returns a list of {name, initiator_type, start, duration, transfer_size} with times in milliseconds
+# relative to the start of the navigation (transfer_size is null if the browser does not report it).
+# Returns null if the browser does not support Resource Timing.
+RESOURCE_TIMING_JS = """
+var perf = window.performance;
+if (!perf || !perf.getEntriesByType) {
+    return null;
+}
+var entries = perf.getEntriesByType('resource');
+var resources = [];
+for (var i = 0; i < entries.length; i++) {
+    var entry = entries[i];
+    resources.push({
+        name: entry.name,
+        initiator_type: entry.initiatorType,
+        start: entry.startTime,
+        duration: entry.duration,
+        transfer_size: typeof entry.transferSize === 'number' ? entry.transferSize : null
+    });
+}
+return resources;
+"""
+
+# Returns the bounding rect {x, y, width, height} of the element arguments[0] relative to the viewport in
+# CSS pixels, along with the devicePixelRatio (dpr) to scale it to the pixels of a screenshot. The element
+# is scrolled into view first if it is not entirely within the viewport.
+ELEMENT_RECT_JS = """
+var el = arguments[0];
+var rect = el.getBoundingClientRect();
+if (rect.top < 0 || rect.left < 0 || rect.bottom > window.innerHeight || rect.right > window.innerWidth) {
+    el.scrollIntoView();
+    rect = el.getBoundingClientRect();
+}
+return {x: rect.left, y: rect.top, width: rect.width, height: rect.height, dpr: window.devicePixelRatio || 1};
+"""
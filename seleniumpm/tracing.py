@@ -0,0 +1,241 @@
+"""
+Hierarchical trace spans of the seleniumpm operations (open, validate, wait_for_*, click, switch_in/out,
+etc.), which can be dumped as Chrome Trace Event JSON and loaded in chrome://tracing or Perfetto.
+
+Tracing is off by default, in which case a traced operation costs a check of seleniumconfig.tracing.
+Once enabled, every traced operation records a span (its name, the attribute path and locator of the
+element, its start and its duration) in an in-memory buffer:
+
+    import seleniumpm.config as seleniumconfig
+    import seleniumpm.tracing as tracing
+
+    seleniumconfig.tracing = True
+    page.open(wait_for_page_load=True)
+    page.my_widget.my_button.click()
+    tracing.tracer.dump("trace.json")
+
+Spans are nested per thread: a span started while another one is in progress on the same thread is
+its child (e.g. the wait_for_present() of every element of a validate()).
+
+The stack of spans in progress is also what seleniumpm.profiler attributes WebDriver commands to. While
+a profiler is installed (see Tracer.track()), spans are started even if tracing is off, but they are
+only kept in the buffer when tracing is on.
+"""
+from functools import wraps
+import json
+import os
+import threading
+
+import seleniumpm.config as seleniumconfig
+from seleniumpm.metrics import perf_counter
+
+
+class Span(object):
+    """
+    A traced operation. Spans are created with span() and used as a context manager.
+    """
+
+    def __init__(self, tracer, name, args, owner=None):
+        """
+        :param tracer: The Tracer the span is recorded in
+        :param name: The name of the span
+        :param args: The arguments shown with the span
+        :param owner: (Default: None) The object whose method is traced (see traced())
+        """
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.owner = owner
+        self.start = None
+        self.duration = None
+        self.parent = None
+        self.thread_id = None
+        # The number of WebDriver commands issued during the span (see seleniumpm.profiler)
+        self.commands = 0
+
+    def __enter__(self):
+        stack = self.tracer.get_stack()
+        self.parent = stack[-1] if stack else None
+        self.thread_id = threading.current_thread().ident
+        stack.append(self)
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = perf_counter() - self.start
+        stack = self.tracer.get_stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        if self.commands:
+            self.args['commands'] = self.commands
+        if seleniumconfig.tracing:
+            self.tracer.record(self)
+        return False
+
+
+class NoopSpan(object):
+    """
+    The span returned by span() when tracing is off
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer(object):
+    """
+    Keeps the stack of spans in progress of every thread, and a buffer of the finished spans
+    """
+
+    def __init__(self, max_spans=None):
+        """
+        :param max_spans: (Default: seleniumconfig.tracing_max_spans) The number of finished spans kept in
+                          the buffer. Spans finished once the buffer is full are counted in 'dropped'.
+        """
+        self.max_spans = max_spans
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.spans = []
+        self.dropped = 0
+        self.origin = perf_counter()
+        # The number of profilers that need the stack of spans in progress (see track())
+        self.tracking = 0
+
+    def track(self):
+        """
+        Starts spans even when tracing is off, so that the operation in progress is known (e.g. by
+        seleniumpm.profiler). Every track() must be matched by an untrack().
+        """
+        with self.lock:
+            self.tracking += 1
+
+    def untrack(self):
+        with self.lock:
+            self.tracking = max(0, self.tracking - 1)
+
+    def is_active(self):
+        """
+        :return: True if spans should be started, i.e. tracing is on or the spans are tracked
+        """
+        return seleniumconfig.tracing or self.tracking > 0
+
+    def get_stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def get_current_span(self):
+        """
+        :return: The innermost span in progress on the current thread, or None
+        """
+        stack = self.get_stack()
+        return stack[-1] if stack else None
+
+    def record(self, span):
+        max_spans = self.max_spans if self.max_spans is not None else seleniumconfig.tracing_max_spans
+        with self.lock:
+            if len(self.spans) < max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def get_spans(self):
+        """
+        :return: A copy of the finished spans, in the order they finished
+        """
+        with self.lock:
+            return list(self.spans)
+
+    def reset(self):
+        with self.lock:
+            del self.spans[:]
+            self.dropped = 0
+            self.origin = perf_counter()
+
+    def to_chrome_trace(self):
+        """
+        :return: The finished spans as a Chrome Trace Event dict, i.e. {'traceEvents': [...]} of complete
+                 ('X') events with microsecond timestamps
+        """
+        pid = os.getpid()
+        events = []
+        for span in sorted(self.get_spans(), key=lambda span: span.start):
+            events.append({
+                'name': span.name,
+                'cat': 'seleniumpm',
+                'ph': 'X',
+                'ts': (span.start - self.origin) * 1000000,
+                'dur': span.duration * 1000000,
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': span.args
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'dropped_spans': self.dropped}}
+
+    def dump(self, filename):
+        """
+        Writes the finished spans as Chrome Trace Event JSON
+
+        :param filename: The path of the JSON file
+        :return: filename
+        """
+        with open(filename, "w") as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file, default=str)
+        return filename
+
+
+# The tracer that seleniumpm records into
+tracer = Tracer()
+
+
+def span(name, **args):
+    """
+    Starts a span of the global tracer (use it as a context manager). When tracing is off, this returns
+    a no-op span.
+
+        with tracing.span("checkout", user="bob"):
+            ...
+
+    :param name: The name of the span
+    :param args: The arguments shown with the span (e.g. path and locator)
+    """
+    if not tracer.is_active():
+        return NOOP_SPAN
+    return Span(tracer, name, args)
+
+
+def traced(name=None):
+    """
+    A decorator for the methods of a Webpage or Element that records every call as a span named
+    '<class name>.<name>'. The arguments of the span are those returned by the get_trace_args() of the
+    instance. A traced override that calls the traced method it overrides (e.g. IFrame.validate()) records
+    a single span.
+
+    :param name: (Default: the method name) The name of the operation
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not (seleniumconfig.tracing or tracer.tracking):
+                return func(self, *args, **kwargs)
+            full_name = "{}.{}".format(self.__class__.__name__, span_name)
+            current = tracer.get_current_span()
+            if current is not None and current.owner is self and current.name == full_name:
+                # The same operation, e.g. super().validate() in an override of validate()
+                return func(self, *args, **kwargs)
+            with Span(tracer, full_name, self.get_trace_args(), owner=self):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
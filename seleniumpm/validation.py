@@ -0,0 +1,271 @@
+"""
+The element checks behind Webpage.validate() and Widget.validate()
+"""
+from multiprocessing.pool import ThreadPool
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, \
+    TimeoutException
+
+import seleniumpm.config as seleniumconfig
+from seleniumpm.poller import Poller
+from seleniumpm.scripts import BATCH_VALIDATE_JS
+
+
+def validate_elements(container, elements, deadline, force_check_visibility, failfast_check_element,
+                      batch_validation=False, concurrent_check_element=False):
+    """
+    Checks that every element is present (and visible, if the element expects to be visible) on
+    the page.
+
+    :param container: The Webpage or Widget that the elements belong to
+    :param elements: A list of seleniumpm.webelements.Element to check
+    :param deadline: A seleniumpm.deadline.Deadline shared by all the element checks, so that
+                     the whole validation is bounded by a single timeout
+    :param force_check_visibility: Whether or not to check for visibility on every element
+    :param failfast_check_element: If False, then check every element and raise a
+                                   TimeoutException combining all of the failures
+    :param batch_validation: If True, then check all the elements using a single execute_script()
+                             per poll instead of one WebDriverWait per element
+    :param concurrent_check_element: If True and failfast_check_element is False, then the element
+                                     checks run concurrently on a thread pool. Elements of an
+                                     IFrame are always checked serially within their own frame.
+    :raises TimeoutException: if an element doesn't appear before the deadline
+    """
+    reset_scoped_roots(elements)
+    if batch_validation:
+        return batch_validate_elements(container, elements, deadline, force_check_visibility,
+                                       failfast_check_element)
+    from seleniumpm.iframe import IFrame
+    elements = get_checked_elements(container, elements, force_check_visibility)
+    if concurrent_check_element and not failfast_check_element and \
+            not isinstance(container, IFrame):
+        return concurrent_validate_elements(container, elements, deadline, force_check_visibility)
+    error_msgs = []
+    for element in elements:
+        try:
+            check_element(element, deadline, force_check_visibility)
+        except TimeoutException as ex:
+            container.log.debug(ex.msg)
+            if failfast_check_element:
+                raise ex
+            container.log.debug("Continuing check on other elements")
+            error_msgs.append(ex.msg)
+    if len(error_msgs) > 0:
+        raise TimeoutException("- \n".join(error_msgs))
+
+
+def uses_keep_alive(driver):
+    """
+    :return: True if the command executor of the driver sends every command over a single keep-alive
+             connection (e.g. webdriver.Chrome and webdriver.Firefox)
+    """
+    return bool(getattr(getattr(driver, "command_executor", None), "keep_alive", False))
+
+
+def concurrent_validate_elements(container, elements, deadline, force_check_visibility):
+    """
+    This is the same as validate_elements() with failfast_check_element=False, except that the
+    element checks run on a bounded thread pool (see seleniumconfig.concurrent_check_max_workers).
+    The failing checks wait on the deadline in parallel, so every element gets the whole timeout
+    to appear and reporting all of the failures still takes roughly one timeout (rather than the
+    first failure using up the budget of all the checks that come after it).
+
+    IFrames are validated serially once the pool is done, because switching into an iFrame changes
+    the frame context for every thread sharing the WebDriver session. Every element is checked
+    serially if the command executor of the driver reuses a keep-alive connection (see
+    uses_keep_alive()), which is not safe to share across threads.
+
+    :raises TimeoutException: if an element doesn't appear before the deadline
+    """
+    from seleniumpm.iframe import IFrame
+    iframes = []
+    others = []
+    for element in elements:
+        if isinstance(element, IFrame) and (force_check_visibility or element.check_visible):
+            iframes.append(element)
+        else:
+            others.append(element)
+
+    def check(element):
+        try:
+            check_element(element, deadline, force_check_visibility)
+        except TimeoutException as ex:
+            container.log.debug(ex.msg)
+            return ex.msg
+        return None
+
+    max_workers = seleniumconfig.concurrent_check_max_workers
+    if uses_keep_alive(container.driver):
+        if not getattr(container.driver, "seleniumpm_keep_alive_warned", False):
+            container.log.warning("The command executor of the driver uses keep_alive=True, so the elements are "
+                                  "checked serially (see seleniumconfig.concurrent_check_element)")
+            container.driver.seleniumpm_keep_alive_warned = True
+        max_workers = 1
+
+    error_msgs = []
+    if others:
+        pool = ThreadPool(max(1, min(max_workers, len(others))))
+        try:
+            error_msgs.extend(msg for msg in pool.map(check, others) if msg is not None)
+        finally:
+            pool.close()
+            pool.join()
+    for iframe in iframes:
+        msg = check(iframe)
+        if msg is not None:
+            error_msgs.append(msg)
+    if len(error_msgs) > 0:
+        raise TimeoutException("- \n".join(error_msgs))
+
+
+def check_element(element, deadline, force_check_visibility):
+    """
+    Checks a single element for presence, and for visibility if the element expects to be visible.
+    An IFrame is checked by validating its own elements.
+
+    :raises TimeoutException: if the element doesn't appear before the deadline
+    """
+    from seleniumpm.iframe import IFrame
+    check_visible = force_check_visibility or element.check_visible
+    if check_visible and isinstance(element, IFrame):
+        element.validate(force_check_visibility=force_check_visibility, deadline=deadline)
+        return
+    condition = "present"
+    try:
+        # Presence and visibility share the remaining time rather than each getting it
+        element.wait_for_present(deadline.remaining())
+        if check_visible:
+            condition = "visible"
+            element.wait_for_visible(deadline.remaining())
+    except TimeoutException as ex:
+        # Reported with the timeout of the whole validation (like batch_validate_elements()) rather
+        # than with what was left of it
+        ex.msg = ex.message = element.get_timeout_message(condition, deadline.timeout)
+        raise ex
+
+
+def batch_validate_elements(container, elements, deadline, force_check_visibility,
+                            failfast_check_element, polling=None):
+    """
+    This is the same as validate_elements(), except that the presence and visibility of all the
+    elements is checked by a single execute_script() call. Only the locators that are still
+    missing are sent again on the next poll, so a page that is already loaded is validated in
+    one round trip.
+
+    IFrames are still validated one by one since their elements can only be checked after
+    switching into the iFrame.
+
+    :param polling: (Default: seleniumconfig.polling_interval_in_sec) This controls how often to
+                    check for the missing elements
+    :raises TimeoutException: if an element doesn't appear before the deadline
+    """
+    from seleniumpm.iframe import IFrame
+    checks = []
+    iframes = []
+    for element in get_checked_elements(container, elements, force_check_visibility):
+        check_visible = force_check_visibility or element.check_visible
+        if check_visible and isinstance(element, IFrame):
+            iframes.append(element)
+        else:
+            checks.append((element, check_visible))
+
+    state = {'pending': checks, 'present': []}
+
+    def poll():
+        pending = state['pending']
+        locators = []
+        for element, check_visible in pending:
+            by, value = element.get_scoped_locator()
+            locators.append([by, value, check_visible, get_search_root(element)])
+        try:
+            results = container.driver.execute_script(
+                BATCH_VALIDATE_JS, [locator for locator in locators if locator[3] is not False])
+        except StaleElementReferenceException:
+            # The root of a scoped container was re-rendered; find it again on the next poll
+            reset_scoped_roots(element for element, check_visible in pending)
+            return False
+        results = iter(results)
+        missing = []
+        present = []
+        for check, locator in zip(pending, locators):
+            # An element whose scoped container was not found is missing as well
+            is_present, is_visible = next(results) if locator[3] is not False else (False, False)
+            if not (is_present and is_visible):
+                missing.append(check)
+                present.append(is_present)
+        state['pending'] = missing
+        state['present'] = present
+        return not missing
+
+    if checks:
+        Poller(deadline=deadline, polling=polling, name="batch_validate").poll(poll)
+    pending = state['pending']
+    present = state['present']
+
+    error_msgs = []
+    for (element, check_visible), is_present in zip(pending, present):
+        msg = element.get_timeout_message("visible" if is_present else "present",
+                                          deadline.timeout)
+        container.log.debug(msg)
+        if failfast_check_element:
+            raise TimeoutException(msg)
+        error_msgs.append(msg)
+    for iframe in iframes:
+        try:
+            iframe.validate(force_check_visibility=force_check_visibility,
+                            batch_validation=True, deadline=deadline)
+        except TimeoutException as ex:
+            container.log.debug(ex.msg)
+            if failfast_check_element:
+                raise ex
+            error_msgs.append(ex.msg)
+    if len(error_msgs) > 0:
+        raise TimeoutException("- \n".join(error_msgs))
+
+
+def get_search_root(element):
+    """
+    :return: The root WebElement of the scoped container of element, None if the element is not
+             scoped, or False if the scoped container could not be found
+    """
+    container = element.get_scoped_container()
+    if container is None:
+        return None
+    try:
+        return container.get_root_webelement()
+    except NoSuchElementException:
+        return False
+
+
+def reset_scoped_roots(elements):
+    """
+    Clears the cached root WebElement of the scoped containers of the elements, so that a
+    validation starts from fresh roots (see Widget.mark_scoped())
+    """
+    for element in elements:
+        container = element.get_scoped_container()
+        if container is not None:
+            container.reset_root_webelement(parents=True)
+
+
+def get_checked_elements(container, elements, force_check_visibility):
+    """
+    Filters out the elements that should not be checked (i.e. marked do_not_check or without a
+    Locator), and warns about invisible elements that are going to be checked for visibility.
+
+    :return: A list of seleniumpm.webelements.Element
+    """
+    checked = []
+    for element in elements:
+        # Continue if the element has marked itself do_not_check=True or a Locator is not defined
+        if element.do_not_check or element.locator is None:
+            continue
+        # Print a WARNING message when force_check_visibility=True and element has been marked
+        # 'invisible'
+        if force_check_visibility and not element.check_visible:
+            container.log.warning("element {}={} ({}) was marked as 'invisible' "
+                                  "but force_check_visibility=True".format(element.locator.by,
+                                                                           element.locator.value,
+                                                                           container.__class__))
+        checked.append(element)
+    return checked
@@ -0,0 +1,312 @@
+"""
+Visual regression checks of pages and widgets based on a perceptual hash of their screenshot.
+
+Comparing full-resolution screenshots pixel by pixel on every run is slow and brittle (anti-aliasing,
+compression noise, etc.). Instead, the difference hash (dHash) of a screenshot is compared with the hash
+of its baseline: the screenshot is shrunk to a (hash_size + 1) x hash_size grayscale thumbnail, and every
+bit of the hash tells whether a pixel is brighter than its right neighbour. Two screenshots look alike if
+the Hamming distance of their hashes (i.e. the number of differing bits) is at most a threshold. The
+baseline image is only read, and the full pixel diff only computed, when that check fails:
+
+    page.open(wait_for_page_load=True)
+    page.check_visual()
+    page.search_widget.check_visual(threshold=3)
+
+The first check of a name stores the screenshot as its baseline in seleniumconfig.visual_baseline_dir (set
+seleniumconfig.visual_update_baselines = True to replace the existing baselines). When a check fails, the
+screenshot and an image of the differing pixels are written to seleniumconfig.screenshot_dir, and
+VisualRegression is raised.
+
+This requires Pillow to be installed (e.g. pip install seleniumpm[visual]).
+"""
+from io import BytesIO
+import errno
+import json
+import logging
+import os
+
+import seleniumpm.config as seleniumconfig
+
+log = logging.getLogger(__name__)
+
+
+def get_image_module():
+    """
+    :return: PIL.Image
+    :raises ImportError: if Pillow is not installed
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Visual checks require Pillow (pip install Pillow)")
+    return Image
+
+
+def open_image(png):
+    """
+    :param png: The content of a PNG file (e.g. base64.b64decode(driver.get_screenshot_as_base64()))
+    :return: A PIL Image
+    """
+    image = get_image_module().open(BytesIO(png))
+    image.load()
+    return image
+
+
+def to_png(image):
+    """
+    :return: The content of a PIL Image encoded as PNG
+    """
+    output = BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
+
+
+def write_png(filename, image):
+    """
+    Writes a PIL Image as a PNG file
+
+    :return: filename
+    """
+    with open(filename, "wb") as png_file:
+        png_file.write(to_png(image))
+    return filename
+
+
+def crop_image(image, rect):
+    """
+    Crops a screenshot to the bounding rect of an element (see seleniumpm.scripts.ELEMENT_RECT_JS). The rect
+    is in CSS pixels, so it is scaled by the devicePixelRatio of the browser.
+
+    :param image: A PIL Image of the screenshot
+    :param rect: A dict of 'x', 'y', 'width', 'height' and (optionally) 'dpr'
+    :return: A PIL Image
+    :raises AttributeError: if the rect is not within the screenshot
+    """
+    scale = rect.get('dpr') or 1
+    left = max(0, int(round(rect['x'] * scale)))
+    top = max(0, int(round(rect['y'] * scale)))
+    right = min(image.size[0], int(round((rect['x'] + rect['width']) * scale)))
+    bottom = min(image.size[1], int(round((rect['y'] + rect['height']) * scale)))
+    if right <= left or bottom <= top:
+        raise AttributeError("The rect {} is not within the {}x{} screenshot!".format(
+            rect, image.size[0], image.size[1]))
+    return image.crop((left, top, right, bottom))
+
+
+def dhash(image, hash_size=None):
+    """
+    Computes the difference hash (dHash) of an image
+
+    :param image: A PIL Image
+    :param hash_size: (Default: seleniumconfig.visual_hash_size) The hash has hash_size * hash_size bits
+    :return: The hash as an int
+    """
+    hash_size = hash_size if hash_size is not None else seleniumconfig.visual_hash_size
+    Image = get_image_module()
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            offset = row * (hash_size + 1) + col
+            value = value << 1 | (1 if pixels[offset] > pixels[offset + 1] else 0)
+    return value
+
+
+def hamming_distance(hash1, hash2):
+    """
+    :return: The number of bits that differ between two hashes
+    """
+    return bin(hash1 ^ hash2).count("1")
+
+
+def diff_images(expected, actual, tolerance=0):
+    """
+    Computes the full pixel diff of two images
+
+    :param expected: A PIL Image (e.g. the baseline)
+    :param actual: A PIL Image
+    :param tolerance: (Default: 0) The difference of a channel (0-255) under which a pixel is not counted as
+                      changed
+    :return: A tuple of ({'changed_pixels', 'ratio', 'bbox'}, PIL Image of the changed pixels) where 'ratio'
+             is the fraction of changed pixels and 'bbox' is the (left, top, right, bottom) of the changes,
+             or None. If the images differ in size, every pixel counts as changed and there is no image.
+    """
+    if expected.size != actual.size:
+        return {'changed_pixels': actual.size[0] * actual.size[1], 'ratio': 1.0, 'bbox': None,
+                'size': (expected.size, actual.size)}, None
+    from PIL import ImageChops
+    difference = ImageChops.difference(expected.convert("RGB"), actual.convert("RGB")).convert("L")
+    mask = difference.point(lambda value: 255 if value > tolerance else 0)
+    changed_pixels = mask.histogram()[255]
+    return {'changed_pixels': changed_pixels,
+            'ratio': float(changed_pixels) / (actual.size[0] * actual.size[1]),
+            'bbox': mask.getbbox()}, mask
+
+
+class VisualCheckResult(object):
+    """
+    The outcome of a visual check (see check_screenshot())
+    """
+
+    def __init__(self, name, hash, baseline_hash, threshold, created=False, diff=None):
+        """
+        :param name: The name of the baseline
+        :param hash: The hash of the screenshot
+        :param baseline_hash: The hash of the baseline
+        :param threshold: The maximum Hamming distance of the hashes
+        :param created: (Default: False) Whether the screenshot was stored as the baseline
+        :param diff: (Default: None) The full pixel diff (see diff_images()), only computed when the hashes
+                     are too far apart
+        """
+        self.name = name
+        self.hash = hash
+        self.baseline_hash = baseline_hash
+        self.threshold = threshold
+        self.created = created
+        self.diff = diff
+        self.distance = hamming_distance(hash, baseline_hash)
+
+    @property
+    def passed(self):
+        return self.distance <= self.threshold
+
+    def __repr__(self):
+        return "VisualCheckResult({}, distance={}, threshold={}, created={})".format(
+            self.name, self.distance, self.threshold, self.created)
+
+
+class VisualRegression(AssertionError):
+    """
+    Raised when the screenshot of a page or widget does not look like its baseline
+    """
+
+    def __init__(self, message, result):
+        super(VisualRegression, self).__init__(message)
+        self.result = result
+
+
+def ensure_dir(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        # Another thread or process created it in the meantime
+        if e.errno != errno.EEXIST:
+            raise
+
+
+class BaselineStore(object):
+    """
+    Stores a baseline per name as <name>.png, along with its hash in <name>.json so that checking a
+    screenshot does not need to read the baseline image
+    """
+
+    def __init__(self, baseline_dir=None):
+        """
+        :param baseline_dir: (Default: seleniumconfig.visual_baseline_dir) The directory of the baselines
+        """
+        self.baseline_dir = baseline_dir if baseline_dir is not None else seleniumconfig.visual_baseline_dir
+
+    def get_path(self, name, ext):
+        return os.path.join(self.baseline_dir, "{}.{}".format(name.replace(os.sep, "_"), ext))
+
+    def get_hash(self, name, hash_size):
+        """
+        :return: The hash of a baseline, or None if there is no baseline with that name
+        """
+        path = self.get_path(name, "json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as hash_file:
+            baseline = json.load(hash_file)
+        if baseline['hash_size'] != hash_size:
+            # The baseline was hashed with another hash_size
+            return dhash(self.load_image(name), hash_size)
+        return int(baseline['hash'], 16)
+
+    def load_image(self, name):
+        """
+        :return: The PIL Image of a baseline
+        :raises IOError: if there is no baseline with that name
+        """
+        with open(self.get_path(name, "png"), "rb") as png_file:
+            return open_image(png_file.read())
+
+    def save(self, name, image, hash, hash_size):
+        """
+        Stores (or replaces) a baseline
+
+        :param name: The name of the baseline
+        :param image: A PIL Image
+        :param hash: The hash of the image (see dhash())
+        :param hash_size: The hash_size the hash was computed with
+        """
+        ensure_dir(self.baseline_dir)
+        write_png(self.get_path(name, "png"), image)
+        with open(self.get_path(name, "json"), "w") as hash_file:
+            json.dump({'hash': "{:x}".format(hash), 'hash_size': hash_size, 'size': list(image.size)},
+                      hash_file)
+
+
+def check_screenshot(png, name, rect=None, threshold=None, hash_size=None, baseline_dir=None,
+                     update_baseline=None, screenshot_dir=None):
+    """
+    Compares the perceptual hash of a screenshot (or of a part of it) with the one of its baseline. If there
+    is no baseline yet, the screenshot becomes the baseline. If the hashes are too far apart, the full pixel
+    diff is computed, and the screenshot and the image of the diff are written to screenshot_dir as
+    <name>_actual.png and <name>_diff.png.
+
+    :param png: The content of the PNG screenshot
+    :param name: The name of the baseline (e.g. the Webpage class name or the attribute path of a Widget)
+    :param rect: (Default: None) Only checks that part of the screenshot (see crop_image())
+    :param threshold: (Default: seleniumconfig.visual_hash_threshold) The maximum Hamming distance between
+                      the hashes of the screenshot and of the baseline
+    :param hash_size: (Default: seleniumconfig.visual_hash_size) See dhash()
+    :param baseline_dir: (Default: seleniumconfig.visual_baseline_dir) The directory of the baselines
+    :param update_baseline: (Default: seleniumconfig.visual_update_baselines) Replaces the baseline with the
+                            screenshot
+    :param screenshot_dir: (Default: seleniumconfig.screenshot_dir) The directory for the images of a failure
+    :return: A VisualCheckResult
+    """
+    threshold = threshold if threshold is not None else seleniumconfig.visual_hash_threshold
+    hash_size = hash_size if hash_size is not None else seleniumconfig.visual_hash_size
+    update_baseline = update_baseline if update_baseline is not None else seleniumconfig.visual_update_baselines
+    screenshot_dir = screenshot_dir if screenshot_dir is not None else seleniumconfig.screenshot_dir
+    store = BaselineStore(baseline_dir)
+    image = open_image(png)
+    if rect is not None:
+        image = crop_image(image, rect)
+    hash = dhash(image, hash_size)
+    baseline_hash = None if update_baseline else store.get_hash(name, hash_size)
+    if baseline_hash is None:
+        log.info("Saving the baseline of {} in {}".format(name, store.baseline_dir))
+        store.save(name, image, hash, hash_size)
+        return VisualCheckResult(name, hash, hash, threshold, created=True)
+    result = VisualCheckResult(name, hash, baseline_hash, threshold)
+    if not result.passed:
+        result.diff, diff_image = diff_images(store.load_image(name), image)
+        ensure_dir(screenshot_dir)
+        actual_filename = os.path.join(screenshot_dir, "{}_actual.png".format(name.replace(os.sep, "_")))
+        log.warning("Saving the Screenshot that differs from the baseline of {} at {}".format(name,
+                                                                                             actual_filename))
+        write_png(actual_filename, image)
+        if diff_image is not None:
+            write_png(os.path.join(screenshot_dir, "{}_diff.png".format(name.replace(os.sep, "_"))), diff_image)
+    return result
+
+
+def assert_screenshot(png, name, **kwargs):
+    """
+    Like check_screenshot(), but raises VisualRegression if the check fails
+
+    :return: The VisualCheckResult
+    :raises VisualRegression: if the screenshot does not look like its baseline
+    """
+    result = check_screenshot(png, name, **kwargs)
+    if not result.passed:
+        diff = result.diff
+        raise VisualRegression("The screenshot of {} does not look like its baseline: the Hamming distance of "
+                               "the hashes is {} (threshold {}), {:.2%} of the pixels changed in {}".format(
+                                   name, result.distance, result.threshold, diff['ratio'],
+                                   diff['bbox'] if 'size' not in diff else "a screenshot of another size"),
+                               result)
+    return result
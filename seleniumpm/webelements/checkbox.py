@@ -7,8 +7,8 @@ class Checkbox(Clickable):
 
     def select(self):
         if not self.is_selected():
-            self.get_webelement().click()
+            self.with_webelement(lambda webelement: webelement.click())
 
     def unselect(self):
         if self.is_selected():
-            self.get_webelement().click()
+            self.with_webelement(lambda webelement: webelement.click())
@@ -1,5 +1,5 @@
 from seleniumpm.webelements.element import Element
-from selenium.webdriver.support.wait import WebDriverWait
+from seleniumpm.tracing import traced
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
@@ -8,11 +8,13 @@ class Clickable(Element):
     def __init__(self, driver, locator):
         super(Clickable, self).__init__(driver, locator)
 
+    @traced()
     def wait_for_clickable(self, timeout=None):
         timeout = timeout if timeout is not None else self.element_timeout
         try:
-            WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable((self.locator.by, self.locator.value)))
+            condition = EC.element_to_be_clickable(self.get_scoped_locator())
+            self.get_poller(timeout, "wait_for_clickable").until(
+                lambda: self.find_in_context(condition))
         except TimeoutException as e:
             e.message = "TimeoutException waiting for clickable {}={} with timeout={}s ({})".format(self.locator.by,
                                                                                                     self.locator.value,
@@ -22,6 +24,7 @@ class Clickable(Element):
             raise e
         return self
 
+    @traced()
     def click(self, checkVisibility=False):
         """
         This is the standard selenium click() operation
@@ -30,10 +33,11 @@ class Clickable(Element):
         """
         if checkVisibility:
             self.is_present_and_visible()
-        self.get_webelement().click()
+        self.with_webelement(lambda webelement: webelement.click())
 
+    @traced()
     def click_invisible(self):
         """
         This bypasses Selenium's enforcement on only allowing clicks on visible objects
         """
-        self.driver.execute_script("arguments[0].click();", self.get_webelement())
+        self.with_webelement(lambda webelement: self.driver.execute_script("arguments[0].click();", webelement))
@@ -1,22 +1,46 @@
 from functools import wraps
-import base64
 import json
 import logging
-import os
 import re
+import threading
 import time
 
 from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, \
+    StaleElementReferenceException
 from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.by import By
 import seleniumpm.config as seleniumconfig
+import seleniumpm.metrics as metrics
+import seleniumpm.screenshots as screenshots
+from seleniumpm.tracing import traced
 from seleniumpm.locator import Locator
+from seleniumpm.poller import Poller
+from seleniumpm.scripts import GET_TEXTS_JS, WAIT_FOR_CONDITION_JS
 
 # Regular expression to find numbers (both int and float) in a string
 number_re = r'([\-]*\d+\.\d+|[\-]*\d+)'
 
+# Guards the script timeouts of the waits in progress on every driver (see Element.raise_script_timeout())
+script_timeout_lock = threading.Lock()
+
+
+def get_navigation(driver):
+    """
+    :return: The number of navigations (see mark_navigation()) done with this driver. A cached
+             WebElement is only reused within the navigation it was found in.
+    """
+    return getattr(driver, "seleniumpm_navigation", 0)
+
+
+def mark_navigation(driver):
+    """
+    Records that the driver loaded a new document (e.g. Webpage.open() or refresh()), which
+    invalidates every cached WebElement
+    """
+    driver.seleniumpm_navigation = get_navigation(driver) + 1
+
 
 class Element(object):
 
@@ -53,25 +77,117 @@ class Element(object):
 
     def get_webelement(self):
         """
-        This method basically does a driver.find_element(by, value) call
+        This method basically does a driver.find_element(by, value) call. If the element belongs to a
+        scoped Widget/Panel (see Widget.mark_scoped()), then the element is found from the root
+        WebElement of that container instead of the whole document.
+
+        When seleniumconfig.cache_webelements=True, the WebElement is cached and reused until the
+        next navigation (see with_webelement() for the handling of stale WebElements).
 
         :return: A Selenium WebElement
         """
         if self.locator is None:
             raise AttributeError("locator was not specified!")
-        return self.driver.find_element(self.locator.by, self.locator.value)
+        if not seleniumconfig.cache_webelements:
+            return self.find_webelement()
+        navigation = get_navigation(self.driver)
+        cached = self.__dict__.get('_webelement')
+        if cached is not None and cached[0] == navigation:
+            return cached[1]
+        webelement = self.find_webelement()
+        self._webelement = (navigation, webelement)
+        return webelement
+
+    def find_webelement(self):
+        """
+        Finds the WebElement of this element, bypassing the WebElement cache
+
+        :return: A Selenium WebElement
+        """
+        return self.find_in_context(lambda context: context.find_element(*self.get_scoped_locator()))
+
+    def clear_webelement_cache(self):
+        self._webelement = None
+        return self
+
+    def with_webelement(self, action):
+        """
+        Calls action() with the WebElement of this element. When the WebElement cache is enabled and
+        the WebElement turns out to be stale (e.g. the element was re-rendered), then the element is
+        found again and action() is retried once.
+
+        :param action: A callable taking a Selenium WebElement
+        :return: The value returned by action()
+        """
+        try:
+            return action(self.get_webelement())
+        except StaleElementReferenceException:
+            if not seleniumconfig.cache_webelements:
+                raise
+            self.clear_webelement_cache()
+            return action(self.get_webelement())
 
     def get_webelements(self):
         """
-        This method basically does a driver.find_elements(by, value) call
+        This method basically does a driver.find_elements(by, value) call (scoped the same way as
+        get_webelement())
 
         :return: A list of Selenium WebElements
         """
         if self.locator is None:
             raise AttributeError("locator was not specified!")
-        return self.driver.find_elements(self.locator.by, self.locator.value)
+        return self.find_in_context(lambda context: context.find_elements(*self.get_scoped_locator()))
+
+    def get_scoped_container(self):
+        """
+        :return: The scoped Widget/Panel that this element was assigned to, or None if the element is
+                 found from the whole document
+        """
+        container = self.__dict__.get('_container')
+        if container is not None and getattr(container, 'scoped', False) and container.locator is not None:
+            return container
+        return None
+
+    def get_search_context(self):
+        """
+        :return: The root WebElement of the scoped container of this element, or the driver
+        """
+        container = self.get_scoped_container()
+        return container.get_root_webelement() if container is not None else self.driver
+
+    def get_scoped_locator(self):
+        """
+        Returns the (by, value) used for finding this element from get_search_context(). An absolute
+        xpath (e.g. '//div') searches the whole document even from a WebElement, so it is made
+        relative (e.g. './/div') when the element is scoped.
+
+        :return: A tuple of (by, value)
+        """
+        by, value = self.locator.get_tuple()
+        if by == By.XPATH and value.startswith('/') and self.get_scoped_container() is not None:
+            value = '.' + value
+        return by, value
+
+    def find_in_context(self, find):
+        """
+        Calls find() with the search context of this element. If the cached root WebElement of the
+        scoped container went stale (e.g. it was re-rendered), then it is resolved again and find()
+        is retried once.
 
-    def wait_for_webelements(self, expected_min_length=None, timeout=10, polling=0.5):
+        :param find: A callable taking the search context (a WebDriver or WebElement)
+        :return: The value returned by find()
+        """
+        try:
+            return find(self.get_search_context())
+        except StaleElementReferenceException:
+            container = self.get_scoped_container()
+            if container is None:
+                raise
+            container.reset_root_webelement(parents=True)
+            return find(self.get_search_context())
+
+    @traced()
+    def wait_for_webelements(self, expected_min_length=None, timeout=10, polling=None):
         """
         This method does a driver.find_elements(by, value) call, but has an optional expected_min_length
         parameter. This is useful for checking lists after a save has been performed. If no expected_min_length is
@@ -81,23 +197,18 @@ class Element(object):
                                     WebElements is at least the minimum length.
         :param timeout: (Default: 10s) This controls the threshold for how long to check if expected_min_length
                         is specified.
-        :param polling: (Default: 0.5s or 500ms) This controls how often to check
+        :param polling: (Default: seleniumconfig.polling_interval_in_sec) This controls how often to check
         :return: A list of Selenium WebElements. If by the expected_min_length is not met by the timeout period, then
                  the last retrieved list is returned.
         """
         if self.locator is None:
             raise AttributeError("locator was not specified!")
-        current_time = time.time()
-        end_time = (current_time + (timeout * 1000)) \
-            if (expected_min_length is not None and timeout is not None and timeout > 0) else current_time
-        return_elements = []
-        while current_time <= end_time:
-            return_elements = self.get_webelements()
-            if expected_min_length is not None and len(return_elements) >= expected_min_length:
-                return return_elements
-            time.sleep(polling)
-            current_time = time.time()
-        return return_elements
+        if expected_min_length is None or timeout is None or timeout <= 0:
+            return self.get_webelements()
+        return_elements = self.get_poller(timeout, "wait_for_webelements", polling=polling,
+                                          ignored_exceptions=()).poll(
+            self.get_webelements, until=lambda elements: len(elements) >= expected_min_length)
+        return return_elements if return_elements is not None else []
 
     def get_action_chains(self):
         return ActionChains(self.driver)
@@ -108,9 +219,10 @@ class Element(object):
 
         :return: A string
         """
-        return self.get_webelement().text
+        return self.with_webelement(lambda webelement: webelement.text)
 
-    def wait_for_text(self, expected_txt=None, timeout=10, polling=0.5):
+    @traced()
+    def wait_for_text(self, expected_txt=None, timeout=10, polling=None):
         """
         This method does a driver.find_elements(by, value).txt call, but has an optional expected_txt parameter.
 
@@ -118,35 +230,57 @@ class Element(object):
                              WebElement contains the expected txt
         :param timeout: (Default: 10s) This controls the threshold for how long to check if expected_txt
                         is specified.
-        :param polling: (Default: 0.5s or 500ms) This controls how often to check
+        :param polling: (Default: seleniumconfig.polling_interval_in_sec) This controls how often to check
         :return: A string. If by the expected_txt is not met by the timeout period, then the last retrieved text
                  is returned.
         """
-        current_time = time.time()
-        end_time = (current_time + (timeout * 1000)) \
-            if (expected_txt is not None and timeout is not None and timeout > 0) else current_time
-        result_txt = None
-        while current_time <= end_time:
-            result_txt = self.get_text()
-            if expected_txt is not None and expected_txt == result_txt:
-                return result_txt
-            time.sleep(polling)
-            current_time = time.time()
-        return result_txt
+        if expected_txt is None or timeout is None or timeout <= 0:
+            return self.get_text()
+        return self.get_poller(timeout, "wait_for_text", polling=polling, ignored_exceptions=()).poll(
+            self.get_text, until=lambda text: text == expected_txt)
 
-    def get_texts(self):
+    def get_texts(self, bulk=None):
         """
         This method does a driver.find_elements(by, value).txt call
 
+        :param bulk: (Default: seleniumconfig.bulk_text_extraction) If True, then the text of every matching
+                     element is read with a single execute_script() call, instead of one call per element. The
+                     texts are an approximation of WebElement.text (see get_texts_in_browser())
         :return: A list of strings
         """
+        bulk = bulk if bulk is not None else seleniumconfig.bulk_text_extraction
+        if bulk:
+            return self.get_texts_in_browser()
         result_txts = []
         elements = self.get_webelements()
         for element in elements:
             result_txts.append(element.text)
         return result_txts
 
-    def wait_for_texts(self, expected_txt=None, timeout=10, polling=0.5):
+    def get_texts_in_browser(self):
+        """
+        Reads the rendered text of every element matching the locator with a single execute_script() call. This
+        is the innerText of the element, normalized like WebElement.text: whitespace (including &nbsp;) collapsed
+        and trimmed per line, <br> and blocks as line breaks, descendants hidden with display:none or
+        visibility:hidden left out, and '' for hidden elements.
+
+        It is not the WebDriver visibility algorithm though, so the text can differ from WebElement.text for:
+
+            - Descendants that WebDriver considers hidden but innerText does not (e.g. opacity:0, or clipped by
+              an overflow:hidden ancestor)
+            - Browsers without innerText, where textContent is used instead (e.g. old PhantomJS/Firefox): the
+              hidden descendants are included and <br> is not a line break
+
+        :return: A list of strings
+        """
+        if self.locator is None:
+            raise AttributeError("locator was not specified!")
+        by, value = self.get_scoped_locator()
+        return self.find_in_context(lambda context: self.driver.execute_script(
+            GET_TEXTS_JS, by, value, context if context is not self.driver else None))
+
+    @traced()
+    def wait_for_texts(self, expected_txt=None, timeout=10, polling=None):
         """
         This method does a driver.find_elements(by, value).txt call, but has an optional expected_txt parameter. This
         is useful for checking lists after a save has been performed. If no expected_min_length is specified, then
@@ -156,21 +290,15 @@ class Element(object):
                                     list contains the expected txt
         :param timeout: (Default: 10s) This controls the threshold for how long to check if expected_txt
                         is specified.
-        :param polling: (Default: 0.5s or 500ms) This controls how often to check
+        :param polling: (Default: seleniumconfig.polling_interval_in_sec) This controls how often to check
         :return: A list of strings. If by the expected_txt is not met by the timeout period, then
                  the last retrieved list is returned.
         """
-        current_time = time.time()
-        end_time = (current_time + (timeout * 1000)) \
-            if (expected_txt is not None and timeout is not None and timeout > 0) else current_time
-        result_txts = []
-        while current_time <= end_time:
-            result_txts = self.get_texts()
-            if expected_txt is not None and expected_txt in result_txts:
-                return result_txts
-            time.sleep(polling)
-            current_time = time.time()
-        return result_txts
+        if expected_txt is None or timeout is None or timeout <= 0:
+            return self.get_texts()
+        result_txts = self.get_poller(timeout, "wait_for_texts", polling=polling, ignored_exceptions=()).poll(
+            self.get_texts, until=lambda texts: expected_txt in texts)
+        return result_txts if result_txts is not None else []
 
     def get_index_of_text(self, text, operator="=="):
         """
@@ -182,10 +310,10 @@ class Element(object):
                          The second is a search within the text.
         :return: The index where the text was found, otherwise, -1
         """
-        for index, element in enumerate(self.get_texts()):
-            if operator == "==" and element.text == text:
+        for index, element_text in enumerate(self.get_texts()):
+            if operator == "==" and element_text == text:
                 return index
-            elif operator == "~=" and re.search(text, element.text):
+            elif operator == "~=" and re.search(text, element_text):
                 return index
         return -1
 
@@ -227,17 +355,15 @@ class Element(object):
             except ValueError:
                 return None
 
-    def get_numbers(self):
+    def get_numbers(self, bulk=None):
         """
         This simplifies getting a list of numbers from a set of web elements
 
+        :param bulk: (Default: seleniumconfig.bulk_text_extraction) If True, then the texts are read with a single
+                     execute_script() call (see get_texts())
         :return: A list of numbers where each item can be (i) an int, (ii) a float, or (iii) None if neither.
         """
-        web_elements = self.get_webelements()
-        results = []
-        for web_element in web_elements:
-            results.append(self.get_number(web_element.text))
-        return results
+        return [self.get_number(text) for text in self.get_texts(bulk=bulk)]
 
     def get_int(self, string=None, result_index=0):
         """
@@ -276,7 +402,7 @@ class Element(object):
         :param name: This is the attribute that you want to retrieve (e.g. class or href) the value of
         :return: string
         """
-        return self.get_webelement().get_attribute(name)
+        return self.with_webelement(lambda webelement: webelement.get_attribute(name))
 
     def get_attribute_contains(self, name, value):
         """
@@ -302,13 +428,13 @@ class Element(object):
         return True if self.get_attribute(name) == value else False
 
     def is_displayed(self):
-        return self.get_webelement().is_displayed()
+        return self.with_webelement(lambda webelement: webelement.is_displayed())
 
     def is_enabled(self):
-        return self.get_webelement().is_enabled()
+        return self.with_webelement(lambda webelement: webelement.is_enabled())
 
     def is_selected(self):
-        return self.get_webelement().is_selected()
+        return self.with_webelement(lambda webelement: webelement.is_selected())
 
     def is_present(self, timeout=None):
         timeout = timeout if timeout is not None else self.element_timeout
@@ -336,11 +462,13 @@ class Element(object):
         return self.scroll_into_view()
 
     def scroll_into_view(self):
-        self.driver.execute_script("arguments[0].scrollIntoView();", self.get_webelement())
+        self.with_webelement(
+            lambda webelement: self.driver.execute_script("arguments[0].scrollIntoView();", webelement))
         return self
 
     def move_to_element(self):
-        return self.get_action_chains().move_to_element(self.get_webelement()).build().perform()
+        return self.with_webelement(
+            lambda webelement: self.get_action_chains().move_to_element(webelement).build().perform())
 
     def hover_over(self):
         self.move_to_element()
@@ -351,80 +479,192 @@ class Element(object):
 
         :return: str representing the inner-html of an element
         """
-        return self.get_webelement().get_attribute("innerHTML").encode("utf-8")
+        return self.with_webelement(lambda webelement: webelement.get_attribute("innerHTML")).encode("utf-8")
+
+    def get_poller(self, timeout, name, **kwargs):
+        """
+        Returns the seleniumpm.poller.Poller used by the waits of this element. The polling interval,
+        backoff and jitter come from seleniumconfig unless overridden in kwargs.
+
+        :param timeout: The number of seconds to wait
+        :param name: The name under which the wait is recorded (see seleniumpm.poller.wait_stats)
+        :return: A seleniumpm.poller.Poller
+        """
+        kwargs.setdefault('ignored_exceptions', (NoSuchElementException, StaleElementReferenceException))
+        page, widget = self.get_metrics_labels()
+        return Poller(timeout, name=name, page=page, widget=widget, **kwargs)
+
+    def get_metrics_labels(self):
+        """
+        Returns the labels that the timers and waits of this element are recorded under in seleniumpm.metrics: the
+        class name of the Webpage the element (or its top-most Widget) was assigned to, and the class name of the
+        Widget/Panel/IFrame the element was assigned to.
 
+        :return: A tuple of (page, widget), where either can be None
+        """
+        node = self
+        while node.__dict__.get('_container') is not None:
+            node = node.__dict__['_container']
+        page = node.__dict__.get('_page')
+        container = self.__dict__.get('_container')
+        return (page.__class__.__name__ if page is not None else None,
+                container.__class__.__name__ if container is not None else None)
+
+    def get_attr_path(self):
+        """
+        Returns the attribute path of this element from its Webpage, e.g. 'MyPage.my_widget.my_button',
+        by following the Webpage/Widget each element was assigned to
+
+        :return: str, or None if the element was never assigned to a Webpage or Widget
+        """
+        names = []
+        node = self
+        while True:
+            parent = node.__dict__.get('_container') or node.__dict__.get('_page')
+            if parent is None:
+                break
+            names.append(next((name for name in parent.__dict__.get('_element_attrs', ())
+                               if parent.__dict__.get(name) is node), node.__class__.__name__))
+            if not isinstance(parent, Element):
+                names.append(parent.__class__.__name__)
+                break
+            node = parent
+        if not names:
+            if self.attr_name is not None and self.attr_class_name is not None:
+                return "{}.{}".format(self.attr_class_name, self.attr_name)
+            return None
+        return ".".join(reversed(names))
+
+    def get_trace_args(self):
+        """
+        :return: The arguments of the trace spans of this element (see seleniumpm.tracing)
+        """
+        return {'path': self.get_attr_path(),
+                'locator': "{}={}".format(self.locator.by, self.locator.value) if self.locator else None}
+
+    def wait_in_browser(self, condition, timeout):
+        """
+        Waits for a condition on this element from within the browser. A MutationObserver is
+        installed through driver.execute_async_script(), which returns as soon as the condition
+        holds, so the whole wait costs one round trip instead of a find_element() every 500ms.
+
+        This is the wait backend used when seleniumconfig.wait_backend = "observer"
+
+        :param condition: One of 'present', 'visible' or 'selected'
+        :param timeout: The number of seconds to wait
+        :raises TimeoutException: if the condition is not met within timeout
+        """
+        # The extra time is the slack for the round trip, since the script times out on its own
+        script_timeout = timeout + 5
+        self.raise_script_timeout(script_timeout)
+        try:
+            by, value = self.get_scoped_locator()
+
+            def wait(context):
+                root = context if context is not self.driver else None
+                return self.driver.execute_async_script(WAIT_FOR_CONDITION_JS, by, value, condition,
+                                                        int(timeout * 1000), root)
+
+            if not self.find_in_context(wait):
+                raise TimeoutException(self.get_timeout_message(condition, timeout))
+        finally:
+            self.restore_script_timeout(script_timeout)
+
+    def raise_script_timeout(self, script_timeout):
+        """
+        Raises the script timeout of the session to script_timeout for a wait_in_browser(), if it is
+        lower. The script timeouts of the waits in progress are kept on the driver, so that concurrent
+        waits (e.g. with seleniumconfig.concurrent_check_element) share the highest one.
+        """
+        with script_timeout_lock:
+            waits = getattr(self.driver, "seleniumpm_script_timeouts", None)
+            if waits is None:
+                waits = self.driver.seleniumpm_script_timeouts = []
+            current = max(waits + [seleniumconfig.script_timeout_in_sec])
+            waits.append(script_timeout)
+            if script_timeout > current:
+                self.driver.set_script_timeout(script_timeout)
+
+    def restore_script_timeout(self, script_timeout):
+        """
+        Ends a wait started with raise_script_timeout(), and sets the script timeout of the session back
+        to the highest one still needed (or seleniumconfig.script_timeout_in_sec once no wait is left)
+        """
+        with script_timeout_lock:
+            waits = self.driver.seleniumpm_script_timeouts
+            waits.remove(script_timeout)
+            needed = max(waits + [seleniumconfig.script_timeout_in_sec])
+            if needed < script_timeout:
+                self.driver.set_script_timeout(needed)
+
+    def get_timeout_message(self, condition, timeout):
+        """
+        Builds the message used for a TimeoutException raised while waiting on this element
+
+        :param condition: The condition that was waited for (e.g. 'present' or 'visible')
+        :param timeout: The timeout (in seconds) that was used
+        :return: str
+        """
+        timeout = round(timeout, 3) if isinstance(timeout, float) else timeout
+        if self.attr_name is not None and self.attr_class_name is not None:
+            return "TimeoutException waiting for {} ({}.{}) {}={} with timeout={}s ({})".format(
+                condition, self.attr_class_name, self.attr_name, self.locator.by,
+                self.locator.value, timeout, self.__class__)
+        return "TimeoutException waiting for {} {}={} with timeout={}s ({})".format(
+            condition, self.locator.by, self.locator.value, timeout, self.__class__)
+
+    @traced()
     def wait_for_selected(self, timeout=None):
         if self.locator is None:
             raise AttributeError("locator was not specified!")
         timeout = timeout if timeout is not None else self.element_timeout
         try:
-            WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_selected((self.locator.by, self.locator.value)))
-        except TimeoutException as e:
-            if self.attr_name is not None and self.attr_class_name is not None:
-                e.message = "TimeoutException waiting for selected ({}.{}) " \
-                            "{}={} with timeout={}s ({})" \
-                    .format(self.attr_class_name,
-                            self.attr_name,
-                            self.locator.by,
-                            self.locator.value,
-                            timeout,
-                            self.__class__)
+            if seleniumconfig.wait_backend == "observer":
+                self.wait_in_browser("selected", timeout)
             else:
-                e.message = "TimeoutException waiting for selected {}={} with timeout={}s ({})" \
-                    .format(self.locator.by, self.locator.value, timeout, self.__class__)
+                condition = EC.element_located_to_be_selected(self.get_scoped_locator())
+                self.get_poller(timeout, "wait_for_selected").until(lambda: self.find_in_context(condition))
+        except TimeoutException as e:
+            e.message = self.get_timeout_message("selected", timeout)
             e.msg = e.message
             raise e
         return self
 
+    @traced()
     def wait_for_present(self, timeout=None):
         if self.locator is None:
             raise AttributeError("locator was not specified!")
         timeout = timeout if timeout is not None else self.element_timeout
         try:
-            WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located((self.locator.by, self.locator.value)))
-        except TimeoutException as e:
-            if self.attr_name is not None and self.attr_class_name is not None:
-                e.message = "TimeoutException waiting for present ({}.{}) " \
-                            "{}={} with timeout={}s ({})" \
-                    .format(self.attr_class_name,
-                            self.attr_name,
-                            self.locator.by,
-                            self.locator.value,
-                            timeout,
-                            self.__class__)
+            if seleniumconfig.wait_backend == "observer":
+                self.wait_in_browser("present", timeout)
             else:
-                e.message = "TimeoutException waiting for present {}={} with timeout={}s ({})" \
-                    .format(self.locator.by, self.locator.value, timeout, self.__class__)
+                condition = EC.presence_of_element_located(self.get_scoped_locator())
+                self.get_poller(timeout, "wait_for_present").until(lambda: self.find_in_context(condition))
+        except TimeoutException as e:
+            e.message = self.get_timeout_message("present", timeout)
             e.msg = e.message
             raise e
         return self
 
+    @traced()
     def wait_for_visible(self, timeout=None):
         if self.locator is None:
             raise AttributeError("locator was not specified!")
         timeout = timeout if timeout is not None else self.element_timeout
         try:
-            WebDriverWait(self.driver, timeout).until(
-                EC.visibility_of_element_located((self.locator.by, self.locator.value)))
-        except TimeoutException as e:
-            if self.attr_name is not None and self.attr_class_name is not None:
-                e.message = "TimeoutException waiting for visible ({}.{}) " \
-                            "{}={} with timeout={}s ({})" \
-                    .format(self.attr_class_name,
-                            self.attr_name,
-                            self.locator.by,
-                            self.locator.value,
-                            timeout,
-                            self.__class__)
+            if seleniumconfig.wait_backend == "observer":
+                self.wait_in_browser("visible", timeout)
             else:
-                e.message = "TimeoutException waiting for visible {}={} with timeout={}s ({})" \
-                    .format(self.locator.by, self.locator.value, timeout, self.__class__)
+                condition = EC.visibility_of_element_located(self.get_scoped_locator())
+                self.get_poller(timeout, "wait_for_visible").until(lambda: self.find_in_context(condition))
+        except TimeoutException as e:
+            e.message = self.get_timeout_message("visible", timeout)
             e.msg = e.message
             raise e
         return self
 
+    @traced()
     def wait_for_present_and_visible(self, timeout=None, present_timeout=None, visible_timeout=None):
         present_timeout = present_timeout if present_timeout is not None else self.element_timeout
         visible_timeout = visible_timeout if visible_timeout is not None else self.element_timeout
@@ -441,35 +681,44 @@ class Element(object):
                                 the type
         :param debug_logger_object: (Default: None) Ability to reference your own debugger object. I am assuming there
                                     is a debug(msg) method, in which this method will write to.
-        :return: screenshot_name
+        :return: screenshot_name, or the sha256 of the screenshot when seleniumconfig.artifact_store is on (see
+                 seleniumpm.artifacts)
         """
         screenshot_name = "screenshot_%s" % time.strftime(
             '%Y_%m_%d-%H_%M_%S') if screenshot_name is None else screenshot_name
+        if seleniumconfig.artifact_store:
+            return screenshots.store_screenshot(self.driver.get_screenshot_as_base64(),
+                                                page=self.get_metrics_labels()[0], step=screenshot_name)
         screenshot_dir = seleniumconfig.screenshot_dir if screenshot_dir is None else screenshot_dir
         debug_logger_object = seleniumconfig.debug_logger_object if debug_logger_object is None else debug_logger_object
-        filename = "%s/%s.png" % (screenshot_dir, screenshot_name)
+        filename = screenshots.get_screenshot_filename(screenshot_dir, screenshot_name)
 
-        # Ensure that path exists, otherwise create it
-        if not os.path.exists(screenshot_dir):
-            os.makedirs(screenshot_dir)
         # Debugging information
         if debug_logger_object is not None:
             debug_logger_object.debug("Saving ScreenShot at %s" % filename)
         else:
             self.log.warning("Saving Screenshot at %s" % filename)
 
-        base64_data = self.driver.get_screenshot_as_base64()
-        screenshot_data = base64.decodestring(base64_data)
-        screenshot_file = open(filename, "w")
-        screenshot_file.write(screenshot_data)
-        screenshot_file.close()
+        # The directory is created when the screenshot is written (possibly on a background thread, see
+        # seleniumconfig.async_screenshots)
+        screenshots.save_screenshot(filename, self.driver.get_screenshot_as_base64(),
+                                    step=self.get_attr_path() or self.__class__.__name__)
 
         return screenshot_name
         return self
 
+    def _get_state(self):
+        """
+        Returns the attributes that define an Element for equality and hashing. Private attributes
+        (prefixed with '_') are internal bookkeeping and are excluded.
+
+        :return: a dict of the public attributes
+        """
+        return dict((key, value) for key, value in self.__dict__.items() if not key.startswith('_'))
+
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self._get_state() == other._get_state()
         return NotImplemented
 
     def __ne__(self, other):
@@ -478,7 +727,7 @@ class Element(object):
         return NotImplemented
 
     def __hash__(self):
-        return hash(tuple(sorted(self.__dict__.items())))
+        return hash(tuple(sorted(self._get_state().items())))
 
     def dict(self):
         """
@@ -532,6 +781,7 @@ class Element(object):
         """
         attr = "start_time" if type is None else "{}_start_time".format(type)
         setattr(self.driver, attr, time.time())
+        metrics.start_timer(self.driver, type, owner=self)
         return getattr(self.driver, attr)
 
     def stop_timer(self, type=None):
@@ -556,6 +806,8 @@ class Element(object):
         start_time = getattr(self.driver, start_attr)
         end_time = getattr(self.driver, end_attr)
         setattr(self.driver, duration_attr, end_time - start_time)
+        page, widget = self.get_metrics_labels()
+        metrics.stop_timer(self.driver, type, page=page, widget=widget, owner=self)
         return end_time
 
     def get_split_time(self, type=None):
@@ -612,4 +864,5 @@ class Element(object):
         setattr(self.driver, start_attr, 0)
         setattr(self.driver, end_attr, 0)
         setattr(self.driver, duration_attr, 0)
+        metrics.reset_timer(self.driver, type, owner=self)
         return self
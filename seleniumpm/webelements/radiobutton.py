@@ -7,4 +7,4 @@ class RadioButton(Clickable):
 
     def select(self):
         if not self.is_selected():
-            self.get_webelement().click()
+            self.with_webelement(lambda webelement: webelement.click())
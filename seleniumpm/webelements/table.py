@@ -1,7 +1,127 @@
+from bisect import bisect_left
+from collections import OrderedDict
+import csv
 import re
+from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
-from seleniumpm.webelements.element import Element
+from seleniumpm.webelements.element import Element, get_navigation
 from seleniumpm.locator import Locator
+from seleniumpm.tracing import traced
+from seleniumpm.scripts import GET_TEXTS_JS, TABLE_COLUMN_JS, TABLE_NUMBERS_JS, TABLE_QUERY_JS, TABLE_ROWS_JS, \
+    TABLE_SNAPSHOT_JS, TABLE_VERSION_JS
+
+# The operators supported by Table.query_row_indexes() and Table.query_rows()
+query_text_operators = ('==', '!=', 'contains', '~=')
+query_number_operators = ('>', '>=', '<', '<=')
+
+# The re flags that can be translated into JavaScript RegExp flags
+query_regex_flags = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'))
+
+
+class TableSnapshot(object):
+    """
+    An in-memory copy of the text of every header and cell of a Table, read with a single execute_script() (see
+    Table.snapshot()). Lookups on a snapshot never go back to the browser.
+
+    The row and column indexes follow the same conventions as the Table methods of the same name.
+    """
+
+    def __init__(self, column_names, rows):
+        """
+        :param column_names: A list of the header texts ('thead/tr/th')
+        :param rows: A list of rows ('tbody/tr'), each being a list of the cell texts ('td')
+        """
+        self.column_names = list(column_names)
+        self.rows = [tuple(row) for row in rows]
+
+    def get_row_index(self, column_index, pattern, regex_flag=0):
+        """
+        Same as Table.get_row_index(), where column_index is the 'td[column_index]' of every row
+
+        :return: The row index that contains the pattern, otherwise returns -1 if not found
+        """
+        row_index = 0
+        for row in self.rows:
+            # Rows without that cell are not matched by the td[column_index] xpath, so they are not counted either
+            if 0 < column_index <= len(row):
+                if re.search(pattern=pattern, string=row[column_index - 1], flags=regex_flag):
+                    return row_index
+                row_index += 1
+        return -1
+
+    def get_column_names(self):
+        return list(self.column_names)
+
+    def get_text(self, row_index, column_index):
+        """
+        Returns the text of the cell found by Table.get_element(row_index, column_index), i.e.
+        'tbody/tr[row_index]/td[column_index]'
+
+        :raises IndexError: if the cell doesn't exist
+        """
+        if row_index < 1 or column_index < 1:
+            raise IndexError("row_index={} and column_index={} start at 1 (like tr[n]/td[n])".format(
+                row_index, column_index))
+        return self.rows[row_index - 1][column_index - 1]
+
+    def get_rows(self):
+        """
+        :return: A list of rows, each being a tuple of the cell texts
+        """
+        return list(self.rows)
+
+    def count_rows(self):
+        return len(self.rows)
+
+
+class TableIndex(object):
+    """
+    A hash index of the cells of one column of a Table, built from a single execute_script() (see
+    Table.get_index()). This answers get_row_index() style lookups on a key column (e.g. an ID) in O(1) for
+    exact matches, and with a binary search for prefix matches.
+    """
+
+    def __init__(self, column_index, cells, version=None):
+        """
+        :param column_index: The column that was indexed (starting at 1, like td[n])
+        :param cells: The text of the cell of every row, or None for the rows without that cell
+        :param version: The DOM-change version of the table when the cells were read
+        """
+        self.column_index = column_index
+        self.version = version
+        self.exact = {}
+        entries = []
+        row_index = 0
+        for cell in cells:
+            # Rows without that cell are not counted, the same as in Table.get_row_index()
+            if cell is None:
+                continue
+            self.exact.setdefault(cell, row_index)
+            entries.append((cell, row_index))
+            row_index += 1
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.row_indexes = [index for _, index in entries]
+
+    def get_row_index(self, key, prefix=False):
+        """
+        :param key: The text of the cell to look for
+        :param prefix: (Default: False) If True, then match the cells starting with key (i.e. a
+                       get_row_index() pattern of '^key'). Otherwise, the whole cell must be equal to key.
+        :return: The first row index that matches, otherwise returns -1 if not found
+        """
+        if not prefix:
+            return self.exact.get(key, -1)
+        row_index = -1
+        for position in range(bisect_left(self.keys, key), len(self.keys)):
+            if not self.keys[position].startswith(key):
+                break
+            if row_index == -1 or self.row_indexes[position] < row_index:
+                row_index = self.row_indexes[position]
+        return row_index
+
+    def __len__(self):
+        return len(self.keys)
 
 
 class Table(Element):
@@ -15,6 +135,277 @@ class Table(Element):
             raise AttributeError("Tables only support XPATH locators")
         super(Table, self).__init__(driver, locator)
 
+    @traced()
+    def snapshot(self, refresh=False):
+        """
+        Reads the text of every header and cell of this table with a single execute_script(). The snapshot is
+        cached, and get_row_index(), get_column_names() and count_rows() are served from it until it is
+        invalidated with invalidate_snapshot(), refreshed, or the driver navigates to another page (see
+        Webpage.open() and refresh()).
+
+        :param refresh: (Default: False) Read the table again even if there is a cached snapshot
+        :return: A TableSnapshot
+        :raises NoSuchElementException: if the table doesn't exist
+        """
+        navigation = get_navigation(self.driver)
+        cached = self.get_snapshot()
+        if cached is not None and not refresh:
+            return cached
+        result = self.execute_table_script(TABLE_SNAPSHOT_JS)
+        snapshot = TableSnapshot(result['columns'], result['rows'])
+        self._snapshot = (navigation, snapshot)
+        return snapshot
+
+    def get_snapshot(self):
+        """
+        :return: The cached TableSnapshot, or None if there isn't one (or it was taken before the last navigation)
+        """
+        cached = self.__dict__.get('_snapshot')
+        if cached is not None and cached[0] == get_navigation(self.driver):
+            return cached[1]
+        return None
+
+    def invalidate_snapshot(self):
+        self._snapshot = None
+        return self
+
+    def iter_rows(self, window_size=500):
+        """
+        A generator over the rows of this table as tuples of the cell texts. The rows are fetched in windows of
+        window_size rows (one execute_script() per window), so that only one window is held in memory at a time
+        and no WebElement reference is created per row. Stopping the iteration early skips the rest of the table.
+
+            for row in table.iter_rows():
+                if row[0] == "12345":
+                    break
+
+        NOTE: Each window is read when it is reached, so rows added or removed while iterating can shift the
+        windows that come after.
+
+        :param window_size: (Default: 500) The number of rows fetched per execute_script()
+        :return: A generator of tuples
+        :raises NoSuchElementException: if the table doesn't exist
+        """
+        if window_size < 1:
+            raise ValueError("window_size must be at least 1, but was {}".format(window_size))
+        first = 0
+        while True:
+            rows = self.execute_table_script(TABLE_ROWS_JS, first, first + window_size)
+            for row in rows:
+                yield tuple(row)
+            if len(rows) < window_size:
+                return
+            first += window_size
+
+    @traced()
+    def to_csv(self, csv_file, header=True, window_size=500):
+        """
+        Writes the texts of this table to a CSV file. The rows are streamed with iter_rows(), so only one window
+        of rows is held in memory at a time.
+
+        :param csv_file: A file path, or a file object opened for writing (in binary mode on Python 2)
+        :param header: (Default: True) Write the column names ('thead/tr/th') as the first row. A table without
+                       a 'thead' has no header row.
+        :param window_size: (Default: 500) The number of rows fetched per execute_script() (see iter_rows())
+        :return: The number of rows written (excluding the header)
+        :raises NoSuchElementException: if the table doesn't exist
+        """
+        if not hasattr(csv_file, 'write'):
+            with open(csv_file, 'wb') as f:
+                return self.to_csv(f, header=header, window_size=window_size)
+        writer = csv.writer(csv_file)
+        if header:
+            column_names = self.get_column_names_in_browser()
+            if column_names:
+                writer.writerow([name.encode('utf-8') for name in column_names])
+        count = 0
+        for row in self.iter_rows(window_size=window_size):
+            writer.writerow([text.encode('utf-8') for text in row])
+            count += 1
+        return count
+
+    @traced()
+    def to_numpy(self, column_indexes=None):
+        """
+        Reads the columns of this table as NumPy arrays. The first number of each cell (see number_re) is parsed in
+        the browser, so the whole table is read with a single execute_script(). This requires numpy to be installed
+        (e.g. pip install seleniumpm[numpy]).
+
+            totals = table.to_numpy([5])[5]
+            assert totals.sum() == 1000
+
+        :param column_indexes: (Default: None) The columns (like td[n]) to read. By default, every column is read.
+        :return: An OrderedDict of column_index to a 1-d numpy array. A column where every cell is an integer is
+                 an int64 array, and otherwise a float64 array with NaN for the cells without a number.
+        :raises ImportError: if numpy is not installed
+        :raises NoSuchElementException: if the table doesn't exist
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("Table.to_numpy() requires numpy (pip install numpy)")
+        result = self.execute_table_script(TABLE_NUMBERS_JS, list(column_indexes) if column_indexes else [])
+        arrays = OrderedDict()
+        for column_index, values, integer in zip(result['columns'], result['values'], result['integers']):
+            if integer:
+                arrays[column_index] = numpy.array(values, dtype=numpy.int64)
+            else:
+                arrays[column_index] = numpy.array([numpy.nan if value is None else value for value in values],
+                                                   dtype=numpy.float64)
+        return arrays
+
+    def get_column_names_in_browser(self):
+        """
+        Same as get_column_names(), but with a single execute_script()
+
+        :return: A list of the column names
+        """
+        by, value = self.get_scoped_locator()
+        return self.find_in_context(lambda context: self.driver.execute_script(
+            GET_TEXTS_JS, by, value + "/thead/tr/th", context if context is not self.driver else None))
+
+    @traced()
+    def query_row_indexes(self, predicates, regex_flag=0):
+        """
+        Returns the indexes of the rows matching every predicate. The predicates are evaluated in the browser by a
+        single execute_script(), so only the matching row indexes are sent back.
+
+            # Rows where column 3 matches 'Fail.*' and column 5 is greater than 100
+            table.query_row_indexes([(3, "~=", "Fail.*"), (5, ">", 100)])
+
+        :param predicates: A list of (column_index, operator, value) where column_index is like td[column_index],
+                           and operator is one of:
+
+                           - '==' / '!=': The cell text is (not) equal to value
+                           - 'contains': The cell text contains value
+                           - '~=': The cell text matches the regular expression value (a re.search())
+                           - '>', '>=', '<', '<=': The first number in the cell (see number_re) compared to value
+        :param regex_flag: These are the re flags (e.g. re.IGNORECASE) applied to the '~=' predicates - Default: 0
+        :return: A list of row indexes (starting at 0, the same as get_row_index())
+        :raises NoSuchElementException: if the table doesn't exist
+        """
+        return self.execute_table_script(TABLE_QUERY_JS, self.compile_predicates(predicates, regex_flag), None)
+
+    @traced()
+    def query_rows(self, predicates, column_indexes=None, regex_flag=0):
+        """
+        Same as query_row_indexes(), except that the texts of the matching rows are returned as well
+
+        :param predicates: See query_row_indexes()
+        :param column_indexes: (Default: None) The columns (like td[n]) to return. By default, every cell is
+                               returned.
+        :param regex_flag: See query_row_indexes()
+        :return: A list of (row_index, (text, ...)). A column that the row doesn't have is returned as None
+        :raises NoSuchElementException: if the table doesn't exist
+        """
+        results = self.execute_table_script(TABLE_QUERY_JS, self.compile_predicates(predicates, regex_flag),
+                                            list(column_indexes) if column_indexes is not None else [])
+        return [(row_index, tuple(texts)) for row_index, texts in results]
+
+    @staticmethod
+    def compile_predicates(predicates, regex_flag=0):
+        """
+        Validates and converts query predicates into the arguments of TABLE_QUERY_JS
+
+        :raises AttributeError: if a predicate is not valid
+        """
+        js_flags = ''
+        for flag, js_flag in query_regex_flags:
+            if regex_flag & flag:
+                js_flags += js_flag
+                regex_flag &= ~flag
+        if regex_flag:
+            raise AttributeError("Only re.IGNORECASE and re.MULTILINE can be used in a query, but regex_flag "
+                                 "was '{}'".format(regex_flag))
+        compiled = []
+        for column_index, operator, value in predicates:
+            if operator in query_number_operators:
+                if isinstance(value, bool) or not isinstance(value, (int, long, float)):
+                    raise AttributeError("Operator '{}' expects a number, but value was '{}'".format(operator, value))
+            elif operator not in query_text_operators:
+                raise AttributeError("Operator '{}' is not one of {}".format(
+                    operator, query_text_operators + query_number_operators))
+            compiled.append([column_index, operator, value, js_flags])
+        return compiled
+
+    def get_index(self, column_index, revalidate=False):
+        """
+        Returns a TableIndex of a key column, which is built from a single execute_script() and then cached, so
+        that any number of lookups cost no WebDriver round trip. The index is rebuilt after invalidate_index(),
+        after a navigation (see Webpage.open() and refresh()), or when revalidate=True and the content of the
+        table changed since the index was built.
+
+        When the table can change without a navigation (e.g. rows added by an XHR), either call
+        invalidate_index() after the change, or pass revalidate=True once before a batch of lookups rather than
+        on every lookup.
+
+        :param column_index: The column number (like td[column_index]) to index
+        :param revalidate: (Default: False) Check the DOM-change counter of the table and rebuild the index if the
+                           table changed. This costs one (small) execute_script() per call.
+        :return: A TableIndex
+        :raises NoSuchElementException: if the table doesn't exist
+        """
+        navigation = get_navigation(self.driver)
+        indexes = self.__dict__.get('_indexes')
+        if indexes is None or indexes[0] != navigation:
+            indexes = self._indexes = (navigation, {})
+        index = indexes[1].get(column_index)
+        if index is not None and (not revalidate or self.execute_table_script(TABLE_VERSION_JS) == index.version):
+            return index
+        result = self.execute_table_script(TABLE_COLUMN_JS, column_index)
+        index = indexes[1][column_index] = TableIndex(column_index, result['cells'], result['version'])
+        return index
+
+    @traced()
+    def find_row_index(self, column_index, key, prefix=False, revalidate=False):
+        """
+        This is the indexed version of get_row_index() for a key column (e.g. an ID). Instead of a regular
+        expression, the cell must be equal to key (or start with key if prefix=True).
+
+        :param column_index: The column number (like td[column_index]) that you want to search
+        :param key: The text you want to find (e.g. "12345")
+        :param prefix: (Default: False) Match the cells that start with key
+        :param revalidate: (Default: False) See get_index(). With the default, only the first lookup (after
+                           a navigation or invalidate_index()) costs an execute_script().
+        :return: The row index that contains the key, otherwise returns -1 if not found
+        """
+        return self.get_index(column_index, revalidate=revalidate).get_row_index(key, prefix=prefix)
+
+    def invalidate_index(self, column_index=None):
+        """
+        :param column_index: (Default: None) The index to drop. By default, every index of the table is dropped.
+        """
+        indexes = self.__dict__.get('_indexes')
+        if indexes is not None:
+            if column_index is None:
+                indexes[1].clear()
+            else:
+                indexes[1].pop(column_index, None)
+        return self
+
+    def execute_table_script(self, script, *args):
+        """
+        Executes one of the table scripts of seleniumpm.scripts, which take the locator of the table (and its
+        scoped root) as their first arguments
+
+        :raises NoSuchElementException: if the table doesn't exist
+        """
+        by, value = self.get_scoped_locator()
+        result = self.find_in_context(lambda context: self.driver.execute_script(
+            script, by, value, context if context is not self.driver else None, *args))
+        if result is None:
+            raise NoSuchElementException("Table {}={} was not found".format(self.locator.by, self.locator.value))
+        return result
+
+    def get_scoped_xpath(self, path):
+        """
+        :param path: An xpath relative to the table (e.g. '/tbody/tr')
+        :return: The (by, value) of path for finding it from get_search_context() (see get_scoped_locator())
+        """
+        by, value = self.get_scoped_locator()
+        return by, value + path
+
+    @traced()
     def get_row_index(self, column_index, pattern, regex_flag=0):
         """
         Retrieves the row_index that a given 'pattern' is found. The use case is: I want to find which row that contains
@@ -24,15 +415,19 @@ class Table(Element):
         :param regex_flag: These are the re flags (e.g. re.IGNORECASE) - Default: 0
         :return: The row index that contains the pattern, otherwise returns -1 if not found
         """
-        elements = self.driver.find_elements(By.XPATH, "{}{}".format(
-            self.locator.value, "/tbody/tr/td[{}]".format(column_index)))
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            return snapshot.get_row_index(column_index, pattern, regex_flag)
+        elements = self.find_in_context(lambda context: context.find_elements(
+            *self.get_scoped_xpath("/tbody/tr/td[{}]".format(column_index))))
         row_index = 0
         for field in elements:
-            if re.search(pattern=pattern, string=field.get_text(), flags=regex_flag):
+            if re.search(pattern=pattern, string=field.text, flags=regex_flag):
                 return row_index
             row_index += 1
         return -1
 
+    @traced()
     def get_column_names(self):
         """
         Retrieves a list of column names. The column name indexes will correspond to the column_index for the value on
@@ -42,10 +437,13 @@ class Table(Element):
         in this manner, then this operation will return an empty list
         :return:
         """
-        elements = self.driver.find_elements(By.XPATH, "{}{}".format(self.locator.value, "/thead/tr/th"))
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            return snapshot.get_column_names()
+        elements = self.find_in_context(lambda context: context.find_elements(*self.get_scoped_xpath("/thead/tr/th")))
         column_names = []
         for header in elements:
-            column_names.append(header.get_text())
+            column_names.append(header.text)
         return column_names
 
     def get_element(self, row_index, column_index):
@@ -56,8 +454,8 @@ class Table(Element):
         :return:
         :raises NoSuchElementError: if the element doesn't exist
         """
-        return self.driver.find_element(By.XPATH, "{}{}".format(
-            self.locator.value, "/tbody/tr[{}]/td[{}]".format(row_index, column_index)))
+        return self.find_in_context(lambda context: context.find_element(
+            *self.get_scoped_xpath("/tbody/tr[{}]/td[{}]".format(row_index, column_index))))
 
     def get_locator(self, row_index, column_index):
         """
@@ -74,11 +472,15 @@ class Table(Element):
         Returns a list of WebDriver Elements for each row in the table
         :return:
         """
-        return self.driver.find_elements(By.XPATH, "{}{}".format(self.locator.value, "/tbody/tr"))
+        return self.find_in_context(lambda context: context.find_elements(*self.get_scoped_xpath("/tbody/tr")))
 
+    @traced()
     def count_rows(self):
         """
         Returns a count of the number of rows in the table
         :return:
         """
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            return snapshot.count_rows()
         return len(self.get_rows())
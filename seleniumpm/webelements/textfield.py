@@ -7,7 +7,7 @@ class TextField(TextElement):
         super(TextField, self).__init__(driver, locator)
 
     def send_keys(self, txt):
-        self.get_webelement().send_keys(txt)
+        self.with_webelement(lambda webelement: webelement.send_keys(txt))
         return self
 
     def type(self, txt):
@@ -24,8 +24,8 @@ class TextField(TextElement):
         return self.send_keys_delayed(txt=txt, delay=delay)
 
     def clear(self):
-        self.get_webelement().clear()
+        self.with_webelement(lambda webelement: webelement.clear())
         return self
 
     def submit(self):
-        self.get_webelement().submit()
+        self.with_webelement(lambda webelement: webelement.submit())
@@ -1,8 +1,17 @@
+import base64
 import inspect
 import types
 
 from selenium.common.exceptions import TimeoutException
+
 import seleniumpm.config as seleniumconfig
+import seleniumpm.registry as registry
+import seleniumpm.screenshots as screenshots
+import seleniumpm.visual as visual
+from seleniumpm.deadline import Deadline
+from seleniumpm.scripts import ELEMENT_RECT_JS
+from seleniumpm.tracing import traced
+from seleniumpm.validation import validate_elements
 from seleniumpm.webelements.clickable import Clickable
 from seleniumpm.webelements.element import Element
 
@@ -10,6 +19,68 @@ from seleniumpm.webelements.element import Element
 class Widget(Clickable):
     def __init__(self, driver, locator=None):
         super(Clickable, self).__init__(driver, locator)
+        # In scoped mode, child elements are found from the root WebElement of this Widget
+        self.scoped = False
+        self._root_webelement = None
+
+    def __setattr__(self, name, value):
+        registry.register_element_attr(self, name, value)
+        if isinstance(value, Element):
+            # Written directly to __dict__ so that a child Widget does not register its container
+            # as one of its own elements
+            value.__dict__['_container'] = self
+        super(Widget, self).__setattr__(name, value)
+
+    def get_metrics_labels(self):
+        """
+        The timers and waits of a Widget are recorded under its own class name (see
+        Element.get_metrics_labels())
+        """
+        page, container = super(Widget, self).get_metrics_labels()
+        return page, self.__class__.__name__
+
+    def mark_scoped(self):
+        """
+        Opts this Widget into scoped mode: the WebElement of the Widget is found once and cached,
+        and the elements assigned to it are found with root.find_element() instead of searching the
+        whole document. Absolute xpaths of the child elements (e.g. '//a') are made relative to the
+        root (e.g. './/a'). The cached root is refreshed at the start of every validate(), and
+        whenever it goes stale.
+
+        :return: self
+        """
+        self.scoped = True
+        return self
+
+    def mark_unscoped(self):
+        self.scoped = False
+        self.reset_root_webelement()
+        return self
+
+    def get_root_webelement(self):
+        """
+        :return: The cached WebElement of this Widget, which is the search context of its child
+                 elements in scoped mode
+        """
+        if self._root_webelement is None:
+            self._root_webelement = self.find_webelement()
+        return self._root_webelement
+
+    def reset_root_webelement(self, parents=False):
+        """
+        Clears the cached WebElement of this Widget, so that it is found again on the next lookup
+
+        :param parents: (Default: False) Also clear the cached WebElements of the scoped containers
+                        this Widget belongs to
+        """
+        self._root_webelement = None
+        container = self.get_scoped_container()
+        if parents and container is not None:
+            container.reset_root_webelement(parents=True)
+
+    def __delattr__(self, name):
+        registry.unregister_element_attr(self, name)
+        super(Widget, self).__delattr__(name)
 
     def dict(self):
         """
@@ -25,6 +96,7 @@ class Widget(Clickable):
         dictionary['methods'] = self.get_methods_local()
         return dictionary
 
+    @screenshots.flush_on_error(TimeoutException)
     def wait_for_widget_load(self, timeout=None, force_check_visibility=False, check_myself=True):
         """
         This implementation is the same as Webpage.wait_for_page_load(). This is to support iFrame
@@ -40,25 +112,33 @@ class Widget(Clickable):
                              validation against itself. The scenario where this could be used is in
                              a situation where you want to validate the elements of this container,
                              but not the Locator of the container itself.
-        :raises TimeoutException: if an element doesn't appear within timeout
+        :raises TimeoutException: if an element doesn't appear within timeout. The timeout is a
+                                  hard upper bound for the whole validation
         :return: self
         """
         timeout = timeout if timeout is not None else self.page_timeout
         timer_type = '{}_load'.format(self.__class__.__name__)
         self.start_timer(type=timer_type)
-        self.validate(timeout=timeout, force_check_visibility=force_check_visibility,
-                             check_myself=check_myself)
+        deadline = Deadline(timeout)
+        self.validate(force_check_visibility=force_check_visibility, check_myself=check_myself,
+                      deadline=deadline)
         self.stop_timer(type=timer_type)
-        self.log.debug("{} Widget load time in {}sec".format(self.__class__.__name__,
-                                                             self.get_duration(timer_type)))
+        self.log.debug("{} Widget load time in {}sec (validate took {}sec of a {}sec budget)".format(
+            self.__class__.__name__, self.get_duration(timer_type), deadline.elapsed(), timeout))
         return self
 
-    def validate(self, timeout=None, force_check_visibility=False, failfast_check_element=None, check_myself=False):
+    @traced()
+    @screenshots.flush_on_error(TimeoutException)
+    def validate(self, timeout=None, force_check_visibility=False, failfast_check_element=None,
+                 check_myself=False, batch_validation=None, deadline=None,
+                 concurrent_check_element=None):
         """
         The intention of validate is to make sure that an already loaded widget contains these
         elements.
 
-        :param timeout: (Default: 10s) The number of seconds to poll waiting for an element
+        :param timeout: (Default: 10s) The number of seconds to poll waiting for the elements. This
+                        is shared by all the elements, so it is a hard upper bound for the whole
+                        validation.
         :param force_check_visibility: (Default: False) Some elements can mark itself as invisible
                                        (but present) on load. The default is to respect this setting
                                        and only check for presence. Setting this to 'True' means you
@@ -69,57 +149,38 @@ class Widget(Clickable):
                                        re-raise the TimeoutException with a combined list of all
                                        WebElements that failed their check. This is useful for
                                        debugging your Webpage/Widget and all its elements.
-                                       However, it does have the Selenium side-effect that the
-                                       time it takes for the method to return could be compounded
-                                       because of the timeout on each failure.
         :param check_myself: (Default: True) Since a Widget/Panel/IFrame is a type of Element, it
                              also has a locator. This is used for enabling/disabling adding a
                              validation against itself. The scenario where this could be used is in
                              a situation where you want to validate the elements of this container,
                              but not the Locator of the container itself.
+        :param batch_validation: (Default: False) If set to True, then the presence and visibility
+                                 of all the elements is checked with a single execute_script()
+                                 call per poll, instead of a WebDriverWait per element.
+        :param deadline: (Default: None) A seleniumpm.deadline.Deadline to use instead of timeout.
+                         This is how the time budget is shared with a parent Webpage/Widget.
+        :param concurrent_check_element: (Default: False) If set to True along with
+                                         failfast_check_element=False, then the elements are
+                                         checked concurrently on a thread pool, so that reporting
+                                         all the failures takes roughly one timeout.
         :raises TimeoutException: if an element doesn't appear within timeout
         :return: self
         """
         timeout = timeout if timeout is not None else self.element_timeout
+        deadline = deadline if deadline is not None else Deadline(timeout)
         failfast_check_element = failfast_check_element \
             if failfast_check_element is not None else seleniumconfig.failfast_check_element
-        error_msgs = []
-        from seleniumpm.iframe import IFrame
-        for element in self.get_element_attr(expand_iframe_elements=False,
-                                             check_myself=check_myself):
-            # Continue if the element has marked itself do_not_check=True or a Locator is not defined
-            if element.do_not_check or element.locator is None:
-                continue
-            # Check for presence and visibility
-            if force_check_visibility or element.check_visible:
-                # Print to stderr a WARNING message when force_check_visibility=True
-                # and element has been marked 'invisible'
-                if force_check_visibility and not element.check_visible:
-                    self.log.warning("[WARNING] element {}={} ({}) was marked as "
-                                     "'invisible' but force_check_visibility=True".format(
-                        element.locator.by, element.locator.value, self.__class__))
-                try:
-                    if isinstance(element, IFrame):
-                        element.validate(timeout=timeout, force_check_visibility=force_check_visibility)
-                    else:
-                        element.wait_for_present_and_visible(timeout)
-                except TimeoutException as ex:
-                    self.log.debug(ex.msg)
-                    if failfast_check_element:
-                        raise ex
-                    self.log.debug("Continuing check on other elements")
-                    error_msgs.append(ex.msg)
-            else:
-                try:
-                    element.wait_for_present(timeout)
-                except TimeoutException as ex:
-                    self.log.debug(ex.msg)
-                    if failfast_check_element:
-                        raise ex
-                    self.log.debug("Continuing check on other elements")
-                    error_msgs.append(ex.msg)
-        if len(error_msgs) > 0:
-            raise TimeoutException("- \n".join(error_msgs))
+        batch_validation = batch_validation \
+            if batch_validation is not None else seleniumconfig.batch_validation
+        concurrent_check_element = concurrent_check_element if concurrent_check_element is not None \
+            else seleniumconfig.concurrent_check_element
+        validate_elements(self, self.get_element_attr(expand_iframe_elements=False,
+                                                      check_myself=check_myself),
+                          deadline=deadline,
+                          force_check_visibility=force_check_visibility,
+                          failfast_check_element=failfast_check_element,
+                          batch_validation=batch_validation,
+                          concurrent_check_element=concurrent_check_element)
         return self
 
     def get_element_attr(self, type=Element, override_check_visible=False,
@@ -168,13 +229,9 @@ class Widget(Clickable):
                 elements[attr_name] = self
             else:
                 elements.append(self)
-        for attr in dir(self):
-            # This is to catch potential exceptions thrown in situations where a developer
-            # decorates a method with @property and the method raises an error
-            try:
-                element = getattr(self, attr, None)
-            except:
-                element = None
+        # Only the registered Element attributes are visited, so @property getters are never run
+        for attr in registry.get_element_attrs(self):
+            element = getattr(self, attr, None)
             # Ensure that it is of type Element
             if isinstance(element, Element):
                 # Set some Widget meta-data in the element
@@ -235,10 +292,8 @@ class Widget(Clickable):
         :return: A dict of Element types
         """
         elements = {}
-        for attr in dir(self):
-            element = getattr(self, attr)
-            if isinstance(element, Element) and attr in self.__dict__.keys():
-                elements[attr] = element
+        for attr in registry.get_local_element_attrs(self):
+            elements[attr] = self.__dict__[attr]
         return elements
 
     def is_widget_loaded(self, timeout=None, force_check_visibility=False, screenshot_enabled=False):
@@ -268,6 +323,28 @@ class Widget(Clickable):
         finally:
             seleniumconfig.screenshot_enabled = screenshot_value
 
+    @traced()
+    def check_visual(self, name=None, threshold=None, baseline_dir=None, update_baseline=None):
+        """
+        Checks that this widget looks like its baseline by comparing the perceptual hashes of the part of
+        the screenshot within its bounding rect (see seleniumpm.visual). The widget is scrolled into view if
+        needed, and the first check stores the crop as the baseline. This requires Pillow to be installed.
+
+        :param name: (Default: the attribute path of the widget, e.g. 'MyPage.my_widget') The name of the
+                     baseline
+        :param threshold: (Default: seleniumconfig.visual_hash_threshold) The maximum Hamming distance
+                          between the hashes of the crop and of the baseline
+        :param baseline_dir: (Default: seleniumconfig.visual_baseline_dir) The directory of the baselines
+        :param update_baseline: (Default: seleniumconfig.visual_update_baselines) Replaces the baseline
+        :return: A seleniumpm.visual.VisualCheckResult
+        :raises VisualRegression: if the widget does not look like its baseline
+        """
+        name = name if name is not None else self.get_attr_path() or self.__class__.__name__
+        rect = self.with_webelement(lambda webelement: self.driver.execute_script(ELEMENT_RECT_JS, webelement))
+        return visual.assert_screenshot(base64.b64decode(self.driver.get_screenshot_as_base64()), name,
+                                        rect=rect, threshold=threshold, baseline_dir=baseline_dir,
+                                        update_baseline=update_baseline)
+
     def get_methods_local(self):
         """
         Returns only the local methods defined for this class
@@ -276,8 +353,9 @@ class Widget(Clickable):
                  (values)
         """
         results = {}
-        for attr in dir(self):
-            method = getattr(self, attr)
+        # Methods are looked up on the class so that @property getters are never run
+        for attr in dir(self.__class__):
+            method = getattr(self.__class__, attr)
             if type(method) == types.MethodType and \
                             method.__name__ not in ('__init__') and \
                             method.__func__ in method.im_class.__dict__.values():
@@ -292,10 +370,21 @@ class Widget(Clickable):
 
         :return: A dict of all the elements
         """
-        return self.get_element_attr(override_check_visible=True,
-                                     override_do_not_check=True,
-                                     expand_iframe_elements=True,
-                                     result_type=dict)
+        return dict(self.get_element_index())
+
+    def get_element_index(self):
+        """
+        Returns the memoized index of all the webelements that have been defined on the widget. The
+        index is only rebuilt when an element is added or removed somewhere in the
+        Widget/Panel/IFrame tree, so lookups through it are plain dict hits.
+
+        :return: A dict of all the elements. This is shared and must not be modified
+        """
+        return registry.get_element_index(
+            self, lambda: self.get_element_attr(override_check_visible=True,
+                                                override_do_not_check=True,
+                                                expand_iframe_elements=True,
+                                                result_type=dict))
 
     def __getattr__(self, name):
         """
@@ -310,7 +399,7 @@ class Widget(Clickable):
         if name in ('__members__', '__methods__'):
             return
         # Checking if the element is defined in the sub-widgets, panels, or iframes
-        all_elements = self.get_all_elements_on_widget()
+        all_elements = self.get_element_index()
         if name in all_elements:
             return all_elements[name]
         else:
@@ -1,13 +1,22 @@
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+import seleniumpm.artifacts as artifacts
 import seleniumpm.config as seleniumconfig
+import seleniumpm.metrics as metrics
+import seleniumpm.registry as registry
+import seleniumpm.screenshots as screenshots
+import seleniumpm.visual as visual
 
+from seleniumpm.deadline import Deadline
 from seleniumpm.iframe import IFrame
 from seleniumpm.locator import Locator
-from seleniumpm.webelements.element import Element
+from seleniumpm.poller import Poller
+from seleniumpm.scripts import NAVIGATION_TIMING_JS, RESOURCE_TIMING_JS
+from seleniumpm.tracing import traced
+from seleniumpm.validation import validate_elements
+from seleniumpm.webelements.element import Element, mark_navigation
 from seleniumpm.webelements.widget import Widget
 from seleniumpm.webelements.panel import Panel
 
@@ -72,7 +81,25 @@ class Webpage(object):
         elif url and not isinstance(url, tuple):
             self.url = urlparse(url)
 
-    def open(self, url=None, timeout=None, wait_for_page_load=False):
+    def __setattr__(self, name, value):
+        registry.register_element_attr(self, name, value)
+        if isinstance(value, Element):
+            # Used for labelling the metrics of the element (see Element.get_metrics_labels())
+            value.__dict__['_page'] = self
+        super(Webpage, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        registry.unregister_element_attr(self, name)
+        super(Webpage, self).__delattr__(name)
+
+    def get_trace_args(self):
+        """
+        :return: The arguments of the trace spans of this page (see seleniumpm.tracing)
+        """
+        return {'path': self.__class__.__name__, 'url': self.url.geturl() if self.url else None}
+
+    @traced()
+    def open(self, url=None, timeout=None, wait_for_page_load=False, navigation_timing=None):
         """
         This method has two forms of operation:
 
@@ -85,10 +112,15 @@ class Webpage(object):
                     constructor
         :param timeout: (Default: 30s) The number of seconds to poll waiting for an element
         :param wait_for_page_load: (Default: False) Waits for this page load
+        :param navigation_timing: (Default: seleniumconfig.navigation_timing) Reads the Navigation
+                                  Timing of the page after waiting for the page load. See
+                                  wait_for_page_load()
         :raises TimeoutException: An exception if there are elements that were expected to be
                                   present on the page
         :return:
         """
+        # Every cached WebElement belongs to the previous document
+        mark_navigation(self.driver)
         if url:
             self.driver.get(url)
         elif self.url:
@@ -100,36 +132,45 @@ class Webpage(object):
             self.start_timer(type="page_load")
             self.driver.get(url)
             if wait_for_page_load:
-                self.wait_for_page_load(timeout=timeout, start_timer=False)
+                self.wait_for_page_load(timeout=timeout, start_timer=False,
+                                        navigation_timing=navigation_timing)
         else:
             raise AttributeError("Url is not defined!")
         return self
 
-    def refresh(self, timeout=None, wait_for_page_load=False):
+    @traced()
+    def refresh(self, timeout=None, wait_for_page_load=False, navigation_timing=None):
         """
         Does a page refresh
 
         :param timeout: (Default: 30s) The number of seconds to poll waiting for an element
         :param wait_for_page_load: (Default: False) Waits for this page load
+        :param navigation_timing: (Default: seleniumconfig.navigation_timing) Reads the Navigation
+                                  Timing of the page after waiting for the page load
         :raises TimeoutException: An exception if there are elements that were expected to be
                                   present on the page
         """
         self.start_timer(type="page_load")
+        mark_navigation(self.driver)
         self.driver.refresh()
         if wait_for_page_load:
-            self.wait_for_page_load(timeout=timeout, start_timer=False)
+            self.wait_for_page_load(timeout=timeout, start_timer=False,
+                                    navigation_timing=navigation_timing)
         return self
 
-    def reload(self, timeout=None, wait_for_page_load=False):
+    def reload(self, timeout=None, wait_for_page_load=False, navigation_timing=None):
         """
         Does a page refresh
 
         :param timeout: (Default: 30s) The number of seconds to poll waiting for an element
         :param wait_for_page_load: (Default: False) Waits for this page load
+        :param navigation_timing: (Default: seleniumconfig.navigation_timing) Reads the Navigation
+                                  Timing of the page after waiting for the page load
         :raises TimeoutException: An exception if there are elements that were expected to be
                                   present on the page
         """
-        return self.refresh(timeout=timeout, wait_for_page_load=wait_for_page_load)
+        return self.refresh(timeout=timeout, wait_for_page_load=wait_for_page_load,
+                            navigation_timing=navigation_timing)
 
     def close(self):
         """Closes the browser
@@ -191,6 +232,7 @@ class Webpage(object):
         """
         attr = "start_time" if type is None else "{}_start_time".format(type)
         setattr(self.driver, attr, time.time())
+        metrics.start_timer(self.driver, type, owner=self)
         return getattr(self.driver, attr)
 
     def stop_timer(self, type=None):
@@ -215,6 +257,7 @@ class Webpage(object):
         start_time = getattr(self.driver, start_attr)
         end_time = getattr(self.driver, end_attr)
         setattr(self.driver, duration_attr, end_time - start_time)
+        metrics.stop_timer(self.driver, type, page=self.__class__.__name__, owner=self)
         return end_time
 
     def get_split_time(self, type=None):
@@ -273,8 +316,37 @@ class Webpage(object):
         setattr(self.driver, start_attr, 0)
         setattr(self.driver, end_attr, 0)
         setattr(self.driver, duration_attr, 0)
+        metrics.reset_timer(self.driver, type, owner=self)
         return self
 
+    def save_html(self, screenshot_dir=None, html_name=None):
+        """
+        Dumps the html of the entire webpage (see get_html()) next to the screenshots, or in the
+        artifact store when seleniumconfig.artifact_store is on (see seleniumpm.artifacts)
+
+        :param screenshot_dir: (Default: './screenshots') The directory path for the html
+        :param html_name: (Default: "html_%s" % time.strftime('%Y_%m_%d-%H_%M_%S')) The file name
+                          excluding the type
+        :return: html_name, or the sha256 of the html when seleniumconfig.artifact_store is on
+        """
+        html_name = "html_%s" % time.strftime('%Y_%m_%d-%H_%M_%S') if html_name is None else html_name
+        html = self.get_html().encode("utf-8")
+        if seleniumconfig.artifact_store:
+            return artifacts.get_artifact_store().put(html, kind="html", page=self.__class__.__name__,
+                                                      step=html_name, ext="html")
+        screenshot_dir = seleniumconfig.screenshot_dir if screenshot_dir is None else screenshot_dir
+        filename = "%s/%s.html" % (screenshot_dir, html_name)
+
+        # Ensure that path exists, otherwise create it
+        if not os.path.exists(screenshot_dir):
+            self.log.debug("This path '{}' does not exist! Creating it now!".format(screenshot_dir))
+            os.makedirs(screenshot_dir)
+        self.log.warning("Saving html at %s" % filename)
+
+        with open(filename, "wb") as html_file:
+            html_file.write(html)
+        return html_name
+
     def get_current_url(self):
         """Returns the current page url
         """
@@ -308,6 +380,7 @@ class Webpage(object):
         """
         return Element(self.driver, Locator.by_xpath("//html")).get_html()
 
+    @traced()
     def wait_for_title(self, title, timeout=None):
         """
         This could be used similarly to a wait_for_page_load() if the page title can uniquely
@@ -318,11 +391,15 @@ class Webpage(object):
         :raises TimeoutException: if the title does not appear within timeout period
         """
         timeout = timeout if timeout is not None else self.element_timeout
-        WebDriverWait(driver=self.driver, timeout=timeout).until(EC.title_contains(title))
+        condition = EC.title_contains(title)
+        Poller(timeout, name="wait_for_title").until(lambda: condition(self.driver))
         return self
 
+    @traced()
+    @screenshots.flush_on_error(TimeoutException)
     def wait_for_page_load(self, timeout=None, force_check_visibility=False, start_timer=True,
-                           stop_timer=True):
+                           stop_timer=True, batch_validation=None, navigation_timing=None,
+                           resource_timing=None):
         """
         This method "waits for page load" by checking that all expected objects are both present
         and visible on the page. This is similar to validate() operation except that sometimes
@@ -336,23 +413,178 @@ class Webpage(object):
                                        want to check for both present and visible.
         :param start_timer: (Default: True) This will start the timer for 'page_load'
         :param stop_timer: (Default: True) This will stop the timer for 'page_load'
+        :param batch_validation: (Default: False) Checks all the elements with a single
+                                 execute_script() call per poll. See validate()
+        :param navigation_timing: (Default: seleniumconfig.navigation_timing) Reads the Navigation
+                                  Timing of the page once it is loaded (a single execute_script()
+                                  call), and reports it next to the page_load timer as
+                                  driver.page_load_navigation_timing. See record_navigation_timing()
+        :param resource_timing: (Default: seleniumconfig.resource_timing) Summarizes the Resource
+                                Timing of the page once it is loaded, as
+                                driver.page_load_resource_timing. See record_resource_timing()
         :return: self if everything is successful
-        :raises TimeoutException: if an element doesn't appear within timeout
+        :raises TimeoutException: if an element doesn't appear within timeout. The timeout is a
+                                  hard upper bound for the whole validation, not a per-element
+                                  timeout
         """
         timeout = timeout if timeout is not None else self.page_timeout
+        navigation_timing = navigation_timing if navigation_timing is not None \
+            else seleniumconfig.navigation_timing
+        resource_timing = resource_timing if resource_timing is not None \
+            else seleniumconfig.resource_timing
         self.start_timer(type="page_load") if start_timer else None
-        self.validate(timeout=timeout, force_check_visibility=force_check_visibility)
+        deadline = Deadline(timeout)
+        try:
+            self.validate(force_check_visibility=force_check_visibility,
+                          batch_validation=batch_validation, deadline=deadline)
+        finally:
+            # Reported next to the page_load timer (i.e. driver.page_load_validate_time)
+            self.driver.page_load_validate_time = deadline.elapsed()
         self.stop_timer(type="page_load") if stop_timer else None
-        self.log.debug("Page load for {} took {}sec".format(self.__class__.__name__,
-                                                            self.get_duration("page_load")))
+        self.record_navigation_timing() if navigation_timing else None
+        self.record_resource_timing() if resource_timing else None
+        self.log.debug("Page load for {} took {}sec (validate took {}sec of a {}sec budget)".format(
+            self.__class__.__name__, self.get_duration("page_load"),
+            self.driver.page_load_validate_time, timeout))
         return self
 
-    def validate(self, timeout=None, force_check_visibility=False, failfast_check_element=None):
+    def get_navigation_timing(self):
+        """
+        Reads the browser's Navigation Timing of the current page with a single execute_script() call.
+        Unlike the page_load timer, these are measured by the browser itself and so exclude the
+        WebDriver round trips and polling of seleniumpm.
+
+        :return: A dict of 'dns' and 'connect' (the duration of those phases), and 'ttfb',
+                 'dom_content_loaded' and 'load' (relative to the start of the navigation) in seconds.
+                 An event that has not happened yet is None. Returns None if the browser does not
+                 support Navigation Timing.
+        """
+        timing = self.driver.execute_script(NAVIGATION_TIMING_JS)
+        if not timing:
+            return None
+        return dict((phase, value / 1000.0 if value is not None else None)
+                    for phase, value in timing.items())
+
+    def record_navigation_timing(self):
+        """
+        Reads the Navigation Timing of the current page (see get_navigation_timing()) and reports it
+        next to the page_load timer:
+
+            - driver.page_load_navigation_timing is set to the dict of phases. If the page_load timer
+              was stopped, it also has a 'harness' phase, which is the part of
+              driver.page_load_duration_time that is not the browser's load (i.e. the WebDriver
+              round trips and polling)
+            - Every phase is recorded in seleniumpm.metrics as a 'navigation_timing' sample with
+              type=<phase>
+
+        :return: The dict of phases, or None if the browser does not support Navigation Timing
+        """
+        timing = self.get_navigation_timing()
+        self.driver.page_load_navigation_timing = timing
+        if timing is None:
+            return None
+        duration = getattr(self.driver, "page_load_duration_time", 0)
+        if duration and timing.get('load') is not None:
+            timing['harness'] = max(0, duration - timing['load'])
+        for phase, value in timing.items():
+            if value is not None:
+                metrics.metrics_registry.observe('navigation_timing', value, page=self.__class__.__name__,
+                                                 type=phase)
+        return timing
+
+    def get_resource_timing(self):
+        """
+        Reads the browser's Resource Timing of the current page (i.e. every image, script, stylesheet,
+        XHR, etc. it fetched) with a single execute_script() call
+
+        :return: A list of {'name', 'initiator_type', 'start', 'duration', 'transfer_size'} dicts
+                 (the name is the url of the resource, and 'start' is relative to the start of the
+                 navigation) with times in seconds. Returns None if the browser does not support
+                 Resource Timing.
+        """
+        resources = self.driver.execute_script(RESOURCE_TIMING_JS)
+        if resources is None:
+            return None
+        for resource in resources:
+            resource['start'] = resource['start'] / 1000.0
+            resource['duration'] = resource['duration'] / 1000.0
+        return resources
+
+    def record_resource_timing(self, top=None, waterfall=None, screenshot_dir=None, waterfall_name=None):
+        """
+        Reads the Resource Timing of the current page (see get_resource_timing()) and reports a
+        summary of it next to the page_load timer:
+
+            - driver.page_load_resource_timing is set to the summary of
+              seleniumpm.metrics.summarize_resource_timing(), i.e. the resources aggregated by
+              initiator type and domain, and the slowest resources
+            - The duration of every resource is recorded in seleniumpm.metrics as a
+              'resource_timing' sample with type=<initiator type>
+
+        :param top: (Default: seleniumconfig.resource_timing_top) The number of slowest resources to
+                    keep in the summary
+        :param waterfall: (Default: seleniumconfig.resource_timing_waterfall) Also writes every
+                          resource as JSON next to the screenshots
+        :param screenshot_dir: (Default: './screenshots') The directory path for the waterfall
+        :param waterfall_name: (Default: "waterfall_%s" % time.strftime('%Y_%m_%d-%H_%M_%S')) The
+                               file name excluding the type
+        :return: The summary, or None if the browser does not support Resource Timing
+        """
+        top = top if top is not None else seleniumconfig.resource_timing_top
+        waterfall = waterfall if waterfall is not None else seleniumconfig.resource_timing_waterfall
+        resources = self.get_resource_timing()
+        if resources is None:
+            self.driver.page_load_resource_timing = None
+            return None
+        summary = metrics.summarize_resource_timing(resources, top=top)
+        self.driver.page_load_resource_timing = summary
+        for resource in resources:
+            metrics.metrics_registry.observe('resource_timing', resource['duration'],
+                                             page=self.__class__.__name__,
+                                             type=resource['initiator_type'] or 'other')
+        if waterfall:
+            self.save_resource_waterfall(resources, screenshot_dir=screenshot_dir,
+                                         waterfall_name=waterfall_name)
+        return summary
+
+    def save_resource_waterfall(self, resources, screenshot_dir=None, waterfall_name=None):
+        """
+        Writes the Resource Timing of a page (see get_resource_timing()) as a JSON file next to the
+        screenshots
+
+        :param resources: The list returned by get_resource_timing()
+        :param screenshot_dir: (Default: './screenshots') The directory path for the waterfall
+        :param waterfall_name: (Default: "waterfall_%s" % time.strftime('%Y_%m_%d-%H_%M_%S')) The
+                               file name excluding the type
+        :return: waterfall_name
+        """
+        waterfall_name = "waterfall_%s" % time.strftime(
+            '%Y_%m_%d-%H_%M_%S') if waterfall_name is None else waterfall_name
+        screenshot_dir = seleniumconfig.screenshot_dir if screenshot_dir is None else screenshot_dir
+        filename = "%s/%s.json" % (screenshot_dir, waterfall_name)
+
+        # Ensure that path exists, otherwise create it
+        if not os.path.exists(screenshot_dir):
+            self.log.debug("This path '{}' does not exist! Creating it now!".format(screenshot_dir))
+            os.makedirs(screenshot_dir)
+        self.log.info("Saving Resource Timing waterfall at %s" % filename)
+
+        with open(filename, "w") as waterfall_file:
+            json.dump({'page': self.__class__.__name__, 'url': self.get_current_url(),
+                       'resources': resources}, waterfall_file, indent=4)
+        return waterfall_name
+
+    @traced()
+    @screenshots.flush_on_error(TimeoutException)
+    def validate(self, timeout=None, force_check_visibility=False, failfast_check_element=None,
+                 batch_validation=None, deadline=None, concurrent_check_element=None):
         """
         The intention of validate is to make sure that an already loaded webpage contains these
         elements.
 
-        :param timeout: (Default: 10s) The number of seconds to poll waiting for an element
+        :param timeout: (Default: 10s) The number of seconds to poll waiting for the elements. This
+                        is shared by all the elements, so it is a hard upper bound for the whole
+                        validation.
         :param force_check_visibility: (Default: False) Some elements can mark itself as invisible
                                        (but present) on load. The default is to respect this setting
                                        and only check for presence. Setting this to 'True' means you
@@ -363,54 +595,34 @@ class Webpage(object):
                                        re-raise the TimeoutException with a combined list of all
                                        WebElements that failed their check. This is useful for
                                        debugging your Webpage/Widget and all its elements.
-                                       However, it does have the Selenium side-effect that the
-                                       time it takes for the method to return could be compounded
-                                       because of the timeout on each failure.
+        :param batch_validation: (Default: False) If set to True, then the presence and visibility
+                                 of all the elements is checked with a single execute_script()
+                                 call per poll, instead of a WebDriverWait per element. This is
+                                 much faster against a remote WebDriver.
+        :param deadline: (Default: None) A seleniumpm.deadline.Deadline to use instead of timeout.
+                         This is how the time budget is shared with the caller.
+        :param concurrent_check_element: (Default: False) If set to True along with
+                                         failfast_check_element=False, then the elements are
+                                         checked concurrently on a thread pool, so that reporting
+                                         all the failures takes roughly one timeout.
         :raises TimeoutException: if an element doesn't appear within timeout
         """
         timeout = timeout if timeout is not None else self.element_timeout
+        deadline = deadline if deadline is not None else Deadline(timeout)
         failfast_check_element = failfast_check_element \
             if failfast_check_element is not None else seleniumconfig.failfast_check_element
-        error_msgs = []
-        for element in self.get_element_attr():
-            # Continue if the element has marked itself do_not_check=True
-            if element.do_not_check or element.locator is None:
-                continue
-            # Check for presence and visibility
-            if force_check_visibility or element.check_visible:
-                # Print to stderr a WARNING message when force_check_visibility=True and element
-                # has been marked 'invisible'
-                if force_check_visibility and not element.check_visible:
-                    self.log.warning("element {}={} ({}) was marked as 'invisible' "
-                                     "but force_check_visibility=True".format(element.locator.by,
-                                                                              element.locator.value,
-                                                                              self.__class__))
-                try:
-                    if isinstance(element, IFrame):
-                        element.validate(timeout=timeout,
-                                         force_check_visibility=force_check_visibility)
-                    else:
-                        element.wait_for_present_and_visible(timeout)
-                except TimeoutException as ex:
-                    self.log.debug(ex.msg)
-                    if failfast_check_element:
-                        raise ex
-                    self.log.debug("Continuing check on other elements")
-                    error_msgs.append(ex.msg)
-            else:
-                try:
-                    element.wait_for_present(timeout)
-                except TimeoutException as ex:
-                    self.log.debug(ex.msg)
-                    if failfast_check_element:
-                        raise ex
-                    self.log.debug("Continuing check on other elements")
-                    error_msgs.append(ex.msg)
-        if len(error_msgs) > 0:
-            raise TimeoutException("- \n".join(error_msgs))
+        batch_validation = batch_validation \
+            if batch_validation is not None else seleniumconfig.batch_validation
+        concurrent_check_element = concurrent_check_element if concurrent_check_element is not None \
+            else seleniumconfig.concurrent_check_element
+        validate_elements(self, self.get_element_attr(), deadline=deadline,
+                          force_check_visibility=force_check_visibility,
+                          failfast_check_element=failfast_check_element,
+                          batch_validation=batch_validation,
+                          concurrent_check_element=concurrent_check_element)
         return self
 
-    def is_page(self, timeout=None, force_check_visibility=False):
+    def is_page(self, timeout=None, force_check_visibility=False, screenshot_enabled=False):
         """
         This is like validate() operation except that it returns a boolean True/False. The idea is
         to ask whether or not you are on a page; this is an implementation of that idea. There are
@@ -422,16 +634,21 @@ class Webpage(object):
                                        (but present) on load. The default is to respect this setting
                                        and only check for presence. Setting this to 'True' means you
                                        want to check for both present and visible.
+        :param screenshot_enabled: (Default: False) This temporarily enables/disables screenshots
         :return: True if validate() does not throw an exception; False otherwise
         """
         timeout = timeout if timeout is not None else self.page_timeout
+        screenshot_value = seleniumconfig.screenshot_enabled
         try:
+            seleniumconfig.screenshot_enabled = screenshot_enabled
             self.validate(timeout=timeout,
                           force_check_visibility=force_check_visibility,
                           failfast_check_element=True)
             return True
         except:
             return False
+        finally:
+            seleniumconfig.screenshot_enabled = screenshot_value
 
     def take_screenshot(self, screenshot_dir=None, screenshot_name=None):
         """
@@ -440,28 +657,47 @@ class Webpage(object):
         :param screenshot_dir: (Default: './screenshots') The directory path for the screenshots
         :param screenshot_name: (Default: "screenshot_%s" % time.strftime('%Y_%m_%d-%H_%M_%S')) The
                                 file name excluding the type
-        :return: screenshot_name
+        :return: screenshot_name, or the sha256 of the screenshot when seleniumconfig.artifact_store is
+                 on (see seleniumpm.artifacts)
         """
         screenshot_name = "screenshot_%s" % time.strftime(
             '%Y_%m_%d-%H_%M_%S') if screenshot_name is None else screenshot_name
+        if seleniumconfig.artifact_store:
+            return screenshots.store_screenshot(self.driver.get_screenshot_as_base64(),
+                                                page=self.__class__.__name__, step=screenshot_name)
         screenshot_dir = seleniumconfig.screenshot_dir if screenshot_dir is None else screenshot_dir
-        filename = "%s/%s.png" % (screenshot_dir, screenshot_name)
+        filename = screenshots.get_screenshot_filename(screenshot_dir, screenshot_name)
 
-        # Ensure that path exists, otherwise create it
-        if not os.path.exists(screenshot_dir):
-            self.log.debug("This path '{}' does not exist! Creating it now!".format(screenshot_dir))
-            os.makedirs(screenshot_dir)
         # Debugging information
         self.log.warning("Saving Screenshot at %s" % filename)
 
-        base64_data = self.driver.get_screenshot_as_base64()
-        screenshot_data = base64.decodestring(base64_data)
-        screenshot_file = open(filename, "w")
-        screenshot_file.write(screenshot_data)
-        screenshot_file.close()
+        # The directory is created when the screenshot is written (possibly on a background thread, see
+        # seleniumconfig.async_screenshots)
+        screenshots.save_screenshot(filename, self.driver.get_screenshot_as_base64(),
+                                    step=self.__class__.__name__)
 
         return screenshot_name
 
+    @traced()
+    def check_visual(self, name=None, threshold=None, baseline_dir=None, update_baseline=None):
+        """
+        Checks that the current page looks like its baseline by comparing the perceptual hashes of their
+        screenshots (see seleniumpm.visual). The first check stores the screenshot as the baseline. This
+        requires Pillow to be installed.
+
+        :param name: (Default: the Webpage class name) The name of the baseline
+        :param threshold: (Default: seleniumconfig.visual_hash_threshold) The maximum Hamming distance
+                          between the hashes of the screenshot and of the baseline
+        :param baseline_dir: (Default: seleniumconfig.visual_baseline_dir) The directory of the baselines
+        :param update_baseline: (Default: seleniumconfig.visual_update_baselines) Replaces the baseline
+        :return: A seleniumpm.visual.VisualCheckResult
+        :raises VisualRegression: if the page does not look like its baseline
+        """
+        name = name if name is not None else self.__class__.__name__
+        return visual.assert_screenshot(base64.b64decode(self.driver.get_screenshot_as_base64()), name,
+                                        threshold=threshold, baseline_dir=baseline_dir,
+                                        update_baseline=update_baseline)
+
     def get_element_attr(self, type=Element, override_check_visible=False,
                          override_do_not_check=False, expand_iframe_elements=False,
                          result_type=list):
@@ -492,13 +728,9 @@ class Webpage(object):
                 "'dict', but was '{}'".format(result_type))
         elements = [] if result_type == list else {}
         temp_widgets = {}
-        for attr in dir(self):
-            # This is to catch potential exceptions thrown in situations where a developer
-            # decorates a method with @property and the method raises an error
-            try:
-                element = getattr(self, attr, None)
-            except:
-                element = None
+        # Only the registered Element attributes are visited, so @property getters are never run
+        for attr in registry.get_element_attrs(self):
+            element = getattr(self, attr, None)
             # Ensure that it is of type Element
             if isinstance(element, Element):
                 # Set some Webpage meta-data in the element
@@ -572,10 +804,8 @@ class Webpage(object):
         :return: A dict of Element types
         """
         elements = {}
-        for attr in dir(self):
-            element = getattr(self, attr)
-            if isinstance(element, Element) and attr in self.__dict__.keys():
-                elements[attr] = element
+        for attr in registry.get_local_element_attrs(self):
+            elements[attr] = self.__dict__[attr]
         return elements
 
     def get_methods_local(self):
@@ -586,8 +816,9 @@ class Webpage(object):
                  (values)
         """
         results = {}
-        for attr in dir(self):
-            method = getattr(self, attr)
+        # Methods are looked up on the class so that @property getters are never run
+        for attr in dir(self.__class__):
+            method = getattr(self.__class__, attr)
             if type(method) == types.MethodType and \
                             method.__name__ not in ('__init__') and \
                             method.__func__ in method.im_class.__dict__.values():
@@ -602,10 +833,21 @@ class Webpage(object):
 
         :return: A dict of all the elements
         """
-        return self.get_element_attr(override_check_visible=True,
-                                     override_do_not_check=True,
-                                     expand_iframe_elements=True,
-                                     result_type=dict)
+        return dict(self.get_element_index())
+
+    def get_element_index(self):
+        """
+        Returns the memoized index of all the webelements that have been defined on the page. The
+        index is only rebuilt when an element is added or removed somewhere in the
+        Widget/Panel/IFrame tree, so lookups through it are plain dict hits.
+
+        :return: A dict of all the elements. This is shared and must not be modified
+        """
+        return registry.get_element_index(
+            self, lambda: self.get_element_attr(override_check_visible=True,
+                                                override_do_not_check=True,
+                                                expand_iframe_elements=True,
+                                                result_type=dict))
 
     def __getattr__(self, name):
         """
@@ -620,7 +862,7 @@ class Webpage(object):
         if name in ('__members__', '__methods__'):
             return
         # Checking if the element is defined in the sub-widgets, panels, or iframes
-        all_elements = self.get_all_elements_on_page()
+        all_elements = self.get_element_index()
         if name in all_elements:
             return all_elements[name]
         else:
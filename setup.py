@@ -65,6 +65,7 @@ setup(
     package_dir={'seleniumpm': 'seleniumpm'},
     include_package_data=True,
     install_requires=requires,
+    extras_require={'numpy': ['numpy'], 'visual': ['Pillow']},
     license='Apache 2.0',
     keywords=['testing', 'seleniumpm', 'selenium', 'pagemodel', 'pageobjectmodel'],
     zip_safe=False,
@@ -0,0 +1,91 @@
+import base64
+import mmap
+import os
+
+import pytest
+
+import seleniumpm.artifacts as artifacts
+import seleniumpm.config as seleniumconfig
+import seleniumpm.screenshots as screenshots
+from seleniumpm.artifacts import ArtifactStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+class TestArtifactStore(object):
+    def test_put_deduplicates_blobs(self, tmpdir):
+        store = ArtifactStore(str(tmpdir), run_id="run")
+        digest = store.put(PNG, kind="screenshot", page="MyPage", step="first", ext="png")
+        assert store.put(PNG, kind="screenshot", page="MyPage", step="second", ext="png") == digest
+        assert os.listdir(str(tmpdir.join("blobs", digest[:2]))) == [digest + ".png"]
+        first, second = store.iter_index()
+        assert first['hash'] == second['hash'] == digest
+        assert (first['step'], second['step']) == ("first", "second")
+        assert first['run_id'] == "run" and first['kind'] == "screenshot" and first['size'] == len(PNG)
+
+    def test_read(self, tmpdir):
+        store = ArtifactStore(str(tmpdir), run_id="run")
+        digest = store.put(PNG, kind="screenshot", ext="png")
+        assert store.read(digest) == PNG
+        assert store.find_path(digest) == store.get_path(digest, "png")
+
+    def test_map(self, tmpdir):
+        store = ArtifactStore(str(tmpdir), run_id="run")
+        digest = store.put(PNG, kind="screenshot", ext="png")
+        blob = store.map(digest)
+        try:
+            assert isinstance(blob, mmap.mmap)
+            assert len(blob) == len(PNG) and blob[:8] == PNG[:8]
+        finally:
+            blob.close()
+
+    def test_missing_blob(self, tmpdir):
+        with pytest.raises(IOError):
+            ArtifactStore(str(tmpdir), run_id="run").read("ab" * 32)
+
+    def test_index_is_shared_by_runs(self, tmpdir):
+        ArtifactStore(str(tmpdir), run_id="first").put(b"<html/>", kind="html", ext="html")
+        store = ArtifactStore(str(tmpdir), run_id="second")
+        store.put(PNG, kind="screenshot", ext="png")
+        assert [entry['run_id'] for entry in store.iter_index()] == ["first", "second"]
+        assert [entry['kind'] for entry in store.iter_index(run_id="first")] == ["html"]
+
+    def test_get_artifact_store_follows_config(self, tmpdir):
+        artifact_dir = seleniumconfig.artifact_dir
+        try:
+            seleniumconfig.artifact_dir = str(tmpdir.join("a"))
+            store = artifacts.get_artifact_store()
+            assert artifacts.get_artifact_store() is store
+            seleniumconfig.artifact_dir = str(tmpdir.join("b"))
+            assert artifacts.get_artifact_store().artifact_dir == str(tmpdir.join("b"))
+        finally:
+            seleniumconfig.artifact_dir = artifact_dir
+
+    def test_store_screenshot(self, tmpdir):
+        artifact_dir = seleniumconfig.artifact_dir
+        try:
+            seleniumconfig.artifact_dir = str(tmpdir)
+            digest = screenshots.store_screenshot(base64.b64encode(PNG), page="MyPage", step="screenshot")
+            assert artifacts.get_artifact_store().read(digest) == PNG
+            entry, = artifacts.get_artifact_store().iter_index()
+            assert entry['page'] == "MyPage" and entry['ext'] == "png"
+        finally:
+            seleniumconfig.artifact_dir = artifact_dir
+
+    def test_buffered_screenshot_is_stored_on_flush(self, tmpdir):
+        artifact_dir = seleniumconfig.artifact_dir
+        try:
+            seleniumconfig.artifact_dir = str(tmpdir)
+            seleniumconfig.screenshot_buffer_size = 2
+            digest = screenshots.store_screenshot(base64.b64encode(PNG), page="MyPage", step="screenshot")
+            store = artifacts.get_artifact_store()
+            assert list(store.iter_index()) == [], "Expecting nothing to be stored until the buffer is flushed"
+            buffered, = screenshots.flush_buffer()
+            entry, = store.iter_index()
+            assert entry['hash'] == digest and entry['page'] == "MyPage" and entry['step'] == "screenshot"
+            assert entry['timestamp'] == buffered.timestamp
+            assert store.read(digest) == PNG
+        finally:
+            seleniumconfig.artifact_dir = artifact_dir
+            seleniumconfig.screenshot_buffer_size = 0
+            screenshots.screenshot_buffer.clear()
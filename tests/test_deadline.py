@@ -0,0 +1,23 @@
+import time
+
+from seleniumpm.deadline import Deadline
+
+
+class TestDeadline(object):
+    def test_new_deadline(self):
+        deadline = Deadline(10)
+        assert deadline.timeout == 10
+        assert not deadline.expired(), "Expecting a new deadline to not be expired"
+        assert 9 < deadline.remaining() <= 10, "Expecting ~10s remaining"
+
+    def test_deadline_expires(self):
+        deadline = Deadline(0.1)
+        time.sleep(0.2)
+        assert deadline.expired(), "Expecting the deadline to be expired"
+        assert deadline.remaining() == 0, "Expecting remaining() to never be negative"
+        assert deadline.elapsed() >= 0.2, "Expecting elapsed() to keep counting after expiring"
+
+    def test_zero_deadline(self):
+        deadline = Deadline(0)
+        assert deadline.expired(), "Expecting a 0s deadline to be expired immediately"
+        assert deadline.remaining() == 0
@@ -0,0 +1,189 @@
+import threading
+import time
+
+import pytest
+
+from seleniumpm.metrics import Histogram, MetricsRegistry
+import seleniumpm.metrics as metrics
+
+
+class FakeDriver(object):
+    pass
+
+
+class TestHistogram(object):
+    def test_empty_histogram(self):
+        histogram = Histogram()
+        assert histogram.count == 0
+        assert histogram.percentile(50) is None
+        assert histogram.summary()['mean'] is None
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.add(value)
+        assert histogram.count == 100
+        assert histogram.sum == 5050
+        assert histogram.min == 1
+        assert histogram.max == 100
+        assert histogram.percentile(0) == 1
+        assert histogram.percentile(100) == 100
+        assert histogram.percentile(50) == pytest.approx(50.5)
+        assert histogram.percentile(95) == pytest.approx(95.05)
+        summary = histogram.summary()
+        assert summary['p99'] == pytest.approx(99.01)
+        assert summary['mean'] == pytest.approx(50.5)
+
+
+class TestMetricsRegistry(object):
+    def test_counters_and_histograms_are_keyed(self):
+        registry = MetricsRegistry()
+        registry.increment('clicks', page='MyPage')
+        registry.increment('clicks', 2, page='MyPage')
+        registry.increment('clicks', page='OtherPage')
+        registry.observe('timer', 1.5, page='MyPage', widget='MyWidget', type='MyWidget_load')
+        assert registry.get_counter('clicks', page='MyPage') == 3
+        assert registry.get_counter('clicks', page='OtherPage') == 1
+        assert registry.get_counter('clicks') == 0
+        assert registry.get_histogram('timer', page='MyPage', widget='MyWidget', type='MyWidget_load').samples == [1.5]
+        assert registry.get_histogram('timer', page='MyPage') is None
+
+    def test_summary(self):
+        registry = MetricsRegistry()
+        registry.increment('wait_timeouts', type='wait_for_present')
+        registry.observe('timer', 2, page='MyPage', type='page_load')
+        summary = registry.summary()
+        assert summary[0] == {'name': 'wait_timeouts', 'page': None, 'widget': None, 'type': 'wait_for_present',
+                              'value': 1}
+        assert summary[1]['count'] == 1
+        assert summary[1]['p95'] == 2
+        registry.reset()
+        assert registry.summary() == []
+
+    def test_concurrent_observe(self):
+        registry = MetricsRegistry()
+
+        def observe():
+            for _ in range(1000):
+                registry.observe('timer', 1)
+                registry.increment('count')
+
+        threads = [threading.Thread(target=observe) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert registry.get_histogram('timer').count == 8000
+        assert registry.get_counter('count') == 8000
+
+
+class TestTimers(object):
+    def setup_method(self, method):
+        metrics.metrics_registry.reset()
+
+    def test_every_stop_is_kept(self):
+        driver = FakeDriver()
+        for _ in range(3):
+            metrics.start_timer(driver, 'page_load')
+            assert metrics.stop_timer(driver, 'page_load', page='MyPage') >= 0
+        assert metrics.metrics_registry.get_histogram('timer', page='MyPage', type='page_load').count == 3
+
+    def test_stop_without_start(self):
+        driver = FakeDriver()
+        assert metrics.stop_timer(driver, 'page_load') is None
+        metrics.start_timer(driver, 'page_load')
+        metrics.reset_timer(driver, 'page_load')
+        assert metrics.stop_timer(driver, 'page_load') is None
+        assert metrics.metrics_registry.summary() == []
+
+    def test_overlapping_timers_of_pages_sharing_a_driver(self):
+        driver = FakeDriver()
+        first_page, second_page = object(), object()
+        metrics.start_timer(driver, 'page_load', owner=first_page)
+        time.sleep(0.1)
+        metrics.start_timer(driver, 'page_load', owner=second_page)
+        second = metrics.stop_timer(driver, 'page_load', page='SecondPage', owner=second_page)
+        first = metrics.stop_timer(driver, 'page_load', page='FirstPage', owner=first_page)
+        assert first >= 0.1, "Expecting the first timer to keep its own start"
+        assert second < 0.1
+        assert metrics.metrics_registry.get_histogram('timer', page='FirstPage', type='page_load').count == 1
+        assert metrics.metrics_registry.get_histogram('timer', page='SecondPage', type='page_load').count == 1
+
+    def test_overlapping_timers_on_threads(self):
+        driver = FakeDriver()
+        widget = object()
+        durations = {}
+        second_started = threading.Event()
+
+        def first():
+            metrics.start_timer(driver, 'widget_load', owner=widget)
+            second_started.wait(5)
+            time.sleep(0.2)
+            durations['first'] = metrics.stop_timer(driver, 'widget_load', page='MyPage', widget='MyWidget',
+                                                    owner=widget)
+
+        def second():
+            time.sleep(0.1)
+            metrics.start_timer(driver, 'widget_load', owner=widget)
+            second_started.set()
+            durations['second'] = metrics.stop_timer(driver, 'widget_load', page='MyPage', widget='MyWidget',
+                                                    owner=widget)
+
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert durations['first'] >= 0.3
+        assert durations['second'] < 0.1
+        histogram = metrics.metrics_registry.get_histogram('timer', page='MyPage', widget='MyWidget',
+                                                           type='widget_load')
+        assert histogram.count == 2
+
+    def test_timer_stopped_on_another_thread(self):
+        driver = FakeDriver()
+        page = object()
+        metrics.start_timer(driver, 'page_load', owner=page)
+        durations = []
+        thread = threading.Thread(target=lambda: durations.append(
+            metrics.stop_timer(driver, 'page_load', page='MyPage', owner=page)))
+        thread.start()
+        thread.join()
+        assert durations[0] is not None
+
+    def test_timer_stopped_by_another_owner(self):
+        driver = FakeDriver()
+        pages = [object() for _ in range(4)]
+        metrics.start_timer(driver, 'page_load', owner=pages[0])
+        assert metrics.stop_timer(driver, 'page_load', page='NextPage', owner=pages[1]) is not None
+        metrics.start_timer(driver, 'page_load', owner=pages[0])
+        metrics.start_timer(driver, 'page_load', owner=pages[1])
+        assert metrics.stop_timer(driver, 'page_load', page='NextPage', owner=pages[2]) is None
+
+
+class TestResourceTimingSummary(object):
+    resources = [
+        {'name': 'https://example.com/app.js', 'initiator_type': 'script', 'start': 0.1, 'duration': 0.5,
+         'transfer_size': 1000},
+        {'name': 'https://cdn.example.com/logo.png', 'initiator_type': 'img', 'start': 0.2, 'duration': 1.5,
+         'transfer_size': None},
+        {'name': 'https://cdn.example.com/style.css', 'initiator_type': 'link', 'start': 0.1, 'duration': 0.2,
+         'transfer_size': 300},
+        {'name': 'https://example.com/api', 'initiator_type': 'xmlhttprequest', 'start': 1.0, 'duration': 0.3,
+         'transfer_size': 50},
+    ]
+
+    def test_summary(self):
+        summary = metrics.summarize_resource_timing(self.resources, top=2)
+        assert summary['count'] == 4
+        assert summary['end'] == pytest.approx(1.7)
+        assert summary['by_domain']['cdn.example.com'] == {'count': 2, 'duration': pytest.approx(1.7),
+                                                           'max_duration': 1.5, 'transfer_size': 300}
+        assert summary['by_domain']['example.com']['count'] == 2
+        assert summary['by_initiator_type']['script']['transfer_size'] == 1000
+        assert [resource['name'] for resource in summary['slowest']] == \
+            ['https://cdn.example.com/logo.png', 'https://example.com/app.js']
+
+    def test_summary_of_no_resources(self):
+        summary = metrics.summarize_resource_timing([])
+        assert summary == {'count': 0, 'end': 0, 'by_initiator_type': {}, 'by_domain': {}, 'slowest': []}
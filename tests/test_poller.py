@@ -0,0 +1,82 @@
+import time
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+import seleniumpm.poller as poller
+from seleniumpm.deadline import Deadline
+from seleniumpm.poller import Poller
+
+
+class TestPoller(object):
+    def setup_method(self, method):
+        poller.reset_wait_stats()
+
+    def test_poll_returns_when_condition_is_met(self):
+        values = iter([1, 2, 3, 4])
+        p = Poller(timeout=5, polling=0.01, name="test")
+        assert p.poll(lambda: next(values), until=lambda value: value == 3) == 3
+        assert p.satisfied
+        assert p.polls == 3
+
+    def test_poll_returns_last_value_on_timeout(self):
+        p = Poller(timeout=0.1, polling=0.01, name="test")
+        start_time = time.time()
+        assert p.poll(lambda: "wrong", until=lambda value: value == "right") == "wrong"
+        assert not p.satisfied
+        assert time.time() - start_time < 1, "Expecting the poll to stop at the deadline"
+
+    def test_zero_timeout_polls_once(self):
+        p = Poller(timeout=0, name="test")
+        p.poll(lambda: False)
+        assert p.polls == 1
+
+    def test_until_raises_timeout(self):
+        with pytest.raises(TimeoutException) as e:
+            Poller(timeout=0.05, polling=0.01, name="test").until(lambda: None, message="never")
+        assert "never" in str(e.value)
+
+    def test_ignored_exceptions(self):
+        calls = []
+
+        def condition():
+            calls.append(1)
+            if len(calls) < 3:
+                raise NoSuchElementException()
+            return True
+
+        assert Poller(timeout=5, polling=0.01, name="test").until(condition)
+        assert len(calls) == 3
+        del calls[:]
+        with pytest.raises(NoSuchElementException):
+            Poller(timeout=5, polling=0.01, name="test", ignored_exceptions=()).until(condition)
+
+    def test_backoff_with_ceiling(self):
+        p = Poller(timeout=5, polling=0.1, backoff=2, max_polling=0.5, jitter=0)
+        intervals = [p.get_interval(i) for i in range(1, 6)]
+        assert intervals == pytest.approx([0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_jitter(self):
+        p = Poller(timeout=5, polling=1, backoff=1, jitter=0.25)
+        for _ in range(100):
+            assert 0.75 <= p.get_interval(1) <= 1.25
+
+    def test_shared_deadline(self):
+        deadline = Deadline(0.1)
+        time.sleep(0.1)
+        p = Poller(deadline=deadline, polling=1, name="test")
+        start_time = time.time()
+        p.poll(lambda: False)
+        assert time.time() - start_time < 0.5, "Expecting no sleep past an expired deadline"
+
+    def test_wait_stats(self):
+        Poller(timeout=5, polling=0.01, name="found").until(lambda: True)
+        Poller(timeout=0.05, polling=0.01, name="missing").poll(lambda: False)
+        stats = poller.get_wait_stats()
+        assert stats["found"]["waits"] == 1
+        assert stats["found"]["polls"] == 1
+        assert stats["found"]["timeouts"] == 0
+        assert stats["missing"]["timeouts"] == 1
+        assert stats["missing"]["polls"] > 1
+        poller.reset_wait_stats()
+        assert poller.get_wait_stats() == {}
@@ -0,0 +1,158 @@
+import pytest
+
+import seleniumpm.config as seleniumconfig
+import seleniumpm.profiler as profiler
+import seleniumpm.tracing as tracing
+from seleniumpm.tracing import traced
+
+
+class FakeExecutor(object):
+    url = "http://localhost:4444/wd/hub"
+
+    def execute(self, command, params):
+        if command == "fail":
+            raise IOError("connection refused")
+        return {'status': 0, 'value': "x" * 10}
+
+
+class FakeDriver(object):
+    def __init__(self):
+        self.command_executor = FakeExecutor()
+
+    def execute(self, command, params=None):
+        return self.command_executor.execute(command, params)
+
+
+class Operation(object):
+    def __init__(self, driver):
+        self.driver = driver
+
+    def get_trace_args(self):
+        return {'path': 'MyPage.operation'}
+
+    @traced()
+    def outer(self):
+        self.driver.execute("getTitle")
+        self.inner()
+
+    @traced()
+    def inner(self):
+        self.driver.execute("findElement", {'using': 'id', 'value': 'q'})
+        self.driver.execute("findElement", {'using': 'id', 'value': 'q'})
+
+
+@pytest.fixture
+def driver():
+    driver = FakeDriver()
+    yield driver
+    profiler.unprofile_commands(driver)
+
+
+class TestProfiler(object):
+    def test_commands_are_attributed_to_operations(self, driver):
+        command_profiler = profiler.profile_commands(driver)
+        Operation(driver).outer()
+        driver.execute("quit")
+        report = command_profiler.get_report()
+        assert report["Operation.outer"]['commands'] == 1
+        assert report["Operation.inner"]['commands'] == 2
+        assert report["Operation.inner"]['by_command'] == {"findElement": 2}
+        assert report["Operation.inner"]['bytes_sent'] == 2 * len('{"using": "id", "value": "q"}')
+        assert report[profiler.NO_OPERATION]['by_command'] == {"quit": 1}
+        assert all(record.path == 'MyPage.operation' for record in command_profiler.get_records()[:3])
+        assert "Operation.inner" in command_profiler.format_report()
+
+    def test_spans_are_not_kept_without_tracing(self, driver):
+        tracing.tracer.reset()
+        profiler.profile_commands(driver)
+        Operation(driver).outer()
+        assert not seleniumconfig.tracing
+        assert tracing.tracer.get_spans() == []
+
+    def test_span_commands_are_inclusive(self, driver):
+        profiler.profile_commands(driver)
+        tracing.tracer.reset()
+        try:
+            seleniumconfig.tracing = True
+            Operation(driver).outer()
+        finally:
+            seleniumconfig.tracing = False
+        inner, outer = tracing.tracer.get_spans()
+        assert inner.args['commands'] == 2
+        assert outer.args['commands'] == 3
+        tracing.tracer.reset()
+
+    def test_failed_commands_are_recorded(self, driver):
+        command_profiler = profiler.profile_commands(driver)
+        with pytest.raises(IOError):
+            driver.execute("fail")
+        record, = command_profiler.get_records()
+        assert record.command == "fail" and record.bytes_received == 0
+
+    def test_listeners(self, driver):
+        command_profiler = profiler.profile_commands(driver)
+        commands = []
+        command_profiler.add_listener(lambda record: commands.append(record.command))
+        driver.execute("getTitle")
+        assert commands == ["getTitle"]
+
+    def test_unprofile_restores_executor(self, driver):
+        executor = driver.command_executor
+        command_profiler = profiler.profile_commands(driver)
+        assert profiler.profile_commands(driver) is command_profiler
+        assert driver.command_executor.url == executor.url
+        assert tracing.tracer.tracking == 1
+        assert profiler.unprofile_commands(driver) is command_profiler
+        assert driver.command_executor is executor
+        assert tracing.tracer.tracking == 0
+        assert profiler.unprofile_commands(driver) is None
+
+
+class TestCommandBudget(object):
+    def test_within_budget(self, driver):
+        executor = driver.command_executor
+        with profiler.command_budget(max_commands=3, driver=driver) as budget:
+            Operation(driver).outer()
+        assert budget.count == 3
+        assert driver.command_executor is executor, "Expecting the budget to unprofile the driver"
+
+    def test_budget_exceeded(self, driver):
+        with pytest.raises(profiler.CommandBudgetExceeded) as e:
+            with profiler.command_budget(max_commands=2, driver=driver):
+                Operation(driver).outer()
+        assert isinstance(e.value, AssertionError)
+        assert len(e.value.records) == 3
+        message = str(e.value)
+        assert message.startswith("3 WebDriver commands were issued, but the budget is 2:")
+        assert "Operation.inner: 2 (findElement=2)" in message
+        assert "Operation.outer: 1 (getTitle=1)" in message
+
+    def test_budget_keeps_existing_profiler(self, driver):
+        command_profiler = profiler.profile_commands(driver)
+        with profiler.command_budget(max_commands=5, driver=driver):
+            Operation(driver).inner()
+        assert profiler.get_command_profiler(driver) is command_profiler
+        assert len(command_profiler.get_records()) == 2
+        assert command_profiler.listeners == []
+
+    def test_budget_does_not_mask_errors(self, driver):
+        with pytest.raises(IOError):
+            with profiler.command_budget(max_commands=0, driver=driver):
+                driver.execute("getTitle")
+                driver.execute("fail")
+
+    def test_decorator_uses_driver_of_self(self, driver):
+        class BudgetedOperation(Operation):
+            @profiler.command_budget(max_commands=1)
+            def outer(self):
+                return super(BudgetedOperation, self).outer()
+
+        with pytest.raises(profiler.CommandBudgetExceeded):
+            BudgetedOperation(driver).outer()
+
+    def test_invalid_budget(self, driver):
+        with pytest.raises(AttributeError):
+            profiler.command_budget(max_commands=-1, driver=driver)
+        with pytest.raises(AttributeError):
+            with profiler.command_budget(max_commands=1):
+                pass
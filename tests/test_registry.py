@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+import seleniumpm.config as seleniumconfig
+from seleniumpm.locator import Locator
+from seleniumpm.webelements.button import Button
+from seleniumpm.webelements.widget import Widget
+from seleniumpm.webpage import Webpage
+
+
+class FakeDriver(object):
+    pass
+
+
+class MyWidget(Widget):
+    def __init__(self, driver, locator=None):
+        super(MyWidget, self).__init__(driver, locator)
+        self.button = Button(driver, Locator.by_id("button"))
+
+
+class MyPage(Webpage):
+    def __init__(self, driver, url=None):
+        super(MyPage, self).__init__(driver, url)
+        self.widget = MyWidget(driver, Locator.by_id("widget"))
+
+
+class PropertyPage(MyPage):
+    @property
+    def broken(self):
+        raise RuntimeError("@property getters must not be evaluated")
+
+    def search(self, query, submit=True):
+        pass
+
+
+class PropertyWidget(MyWidget):
+    @property
+    def broken(self):
+        raise RuntimeError("@property getters must not be evaluated")
+
+    def expand(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_driver_config():
+    seleniumconfig.disable_check_for_selenium_webdriver = True
+    yield
+    seleniumconfig.disable_check_for_selenium_webdriver = False
+
+
+class TestElementIndex(object):
+    def test_index_is_memoized_per_page(self):
+        page = MyPage(FakeDriver())
+        index = page.get_element_index()
+        assert page.get_element_index() is index
+        # Building and changing other page objects does not invalidate the index
+        other = MyPage(FakeDriver())
+        other.widget.link = Button(other.driver, Locator.by_id("link"))
+        assert page.get_element_index() is index
+
+    def test_index_is_rebuilt_when_its_tree_changes(self):
+        page = MyPage(FakeDriver())
+        index = page.get_element_index()
+        widget_index = page.widget.get_element_index()
+        page.widget.link = Button(page.driver, Locator.by_id("link"))
+        assert page.get_element_index() is not index
+        assert page.widget.get_element_index() is not widget_index
+        assert page.link is page.widget.link
+        del page.widget.link
+        with pytest.raises(AttributeError):
+            page.link
+
+    def test_concurrent_changes_are_not_lost(self):
+        page = MyPage(FakeDriver())
+
+        def add_buttons(widget):
+            for i in range(200):
+                widget.button = Button(widget.driver, Locator.by_id("button"))
+
+        threads = [threading.Thread(target=add_buttons, args=(page.widget,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert page.widget.__dict__['_element_generation'] == 4 * 200 + 1
+
+
+class TestPropertyGetters(object):
+    def test_webpage_traversal_does_not_evaluate_properties(self):
+        page = PropertyPage(FakeDriver())
+        assert sorted(page.get_element_attr(result_type=dict)) == ["button", "widget"]
+        assert page.get_methods_local() == {'search': ['query', 'submit']}
+
+    def test_widget_traversal_does_not_evaluate_properties(self):
+        widget = PropertyWidget(FakeDriver(), Locator.by_id("widget"))
+        assert "button" in widget.get_element_attr(result_type=dict)
+        assert widget.get_methods_local() == {'expand': []}
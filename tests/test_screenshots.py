@@ -0,0 +1,133 @@
+import base64
+import threading
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+import seleniumpm.config as seleniumconfig
+import seleniumpm.screenshots as screenshots
+from seleniumpm.screenshots import BufferedScreenshot, ScreenshotBuffer, ScreenshotWriter, flush_on_error
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+PNG_BASE64 = base64.b64encode(PNG)
+
+
+class TestScreenshots(object):
+    def test_write_screenshot_creates_directory(self, tmpdir):
+        filename = screenshots.get_screenshot_filename(str(tmpdir.join("a", "b")), "screenshot")
+        screenshots.write_screenshot(filename, PNG_BASE64)
+        assert tmpdir.join("a", "b", "screenshot.png").read_binary() == PNG
+
+    def test_writer_writes_in_the_background(self, tmpdir):
+        writer = ScreenshotWriter(max_queue_size=4, workers=2)
+        filenames = [screenshots.get_screenshot_filename(str(tmpdir), "screenshot_{}".format(i)) for i in range(10)]
+        for filename in filenames:
+            writer.submit(filename, PNG_BASE64)
+        assert writer.flush() == []
+        assert writer.pending() == 0
+        for i in range(10):
+            assert tmpdir.join("screenshot_{}.png".format(i)).read_binary() == PNG
+
+    def test_writer_applies_backpressure(self, tmpdir):
+        writer = ScreenshotWriter(max_queue_size=1, workers=1)
+        release = threading.Event()
+        original_write = screenshots.write_screenshot
+        try:
+            screenshots.write_screenshot = lambda filename, base64_data: release.wait()
+            writer.submit("first", PNG_BASE64)
+            writer.submit("second", PNG_BASE64)
+            submitted = threading.Event()
+            thread = threading.Thread(target=lambda: (writer.submit("third", PNG_BASE64), submitted.set()))
+            thread.start()
+            assert not submitted.wait(0.2), "Expecting submit() to block while the queue is full"
+            release.set()
+            thread.join(5)
+            assert submitted.is_set()
+            writer.flush()
+        finally:
+            release.set()
+            screenshots.write_screenshot = original_write
+
+    def test_writer_reports_errors(self, tmpdir):
+        writer = ScreenshotWriter(max_queue_size=2, workers=1)
+        tmpdir.join("file").write("")
+        filename = screenshots.get_screenshot_filename(str(tmpdir.join("file")), "screenshot")
+        writer.submit(filename, PNG_BASE64)
+        errors = writer.flush()
+        assert [error_filename for error_filename, e in errors] == [filename]
+        assert writer.flush() == []
+
+    def test_save_screenshot_with_async_screenshots(self, tmpdir):
+        filename = screenshots.get_screenshot_filename(str(tmpdir), "screenshot")
+        try:
+            seleniumconfig.async_screenshots = True
+            assert screenshots.save_screenshot(filename, PNG_BASE64) == filename
+        finally:
+            seleniumconfig.async_screenshots = False
+        assert screenshots.flush() == []
+        assert tmpdir.join("screenshot.png").read_binary() == PNG
+
+    def test_exit_hook_is_registered_with_the_writer(self, monkeypatch):
+        registered = []
+        monkeypatch.setattr(screenshots.atexit, "register", registered.append)
+        monkeypatch.setattr(screenshots, "screenshot_writer", None)
+        writer = screenshots.get_screenshot_writer()
+        assert registered == [screenshots.flush]
+        assert screenshots.get_screenshot_writer() is writer
+        assert registered == [screenshots.flush], "Expecting the exit hook to be registered once"
+
+
+class TestScreenshotBuffer(object):
+    def test_buffer_keeps_last_screenshots(self):
+        buffer = ScreenshotBuffer(max_screenshots=2, max_bytes=1000)
+        for i in range(3):
+            buffer.add(BufferedScreenshot("screenshot_{}".format(i), PNG_BASE64, step="step {}".format(i)))
+        assert [screenshot.step for screenshot in buffer.get_screenshots()] == ["step 1", "step 2"]
+        assert buffer.size == 2 * len(PNG_BASE64)
+
+    def test_buffer_is_bounded_in_bytes(self):
+        buffer = ScreenshotBuffer(max_screenshots=10, max_bytes=len(PNG_BASE64) * 2)
+        for i in range(3):
+            buffer.add(BufferedScreenshot("screenshot_{}".format(i), PNG_BASE64))
+        assert [screenshot.filename for screenshot in buffer.get_screenshots()] == ["screenshot_1", "screenshot_2"]
+
+    def test_buffered_screenshots_are_only_written_on_error(self, tmpdir):
+        filename = screenshots.get_screenshot_filename(str(tmpdir), "screenshot")
+        try:
+            seleniumconfig.screenshot_buffer_size = 5
+            screenshots.save_screenshot(filename, PNG_BASE64, step="MyPage")
+            with flush_on_error(TimeoutException):
+                pass
+            assert not tmpdir.join("screenshot.png").check()
+            with pytest.raises(TimeoutException):
+                with flush_on_error(TimeoutException):
+                    raise TimeoutException("timed out")
+        finally:
+            seleniumconfig.screenshot_buffer_size = 0
+            screenshots.screenshot_buffer.clear()
+        assert tmpdir.join("screenshot.png").read_binary() == PNG
+        assert screenshots.screenshot_buffer.get_screenshots() == []
+
+    def test_flush_on_error_ignores_other_errors(self, tmpdir):
+        filename = screenshots.get_screenshot_filename(str(tmpdir), "screenshot")
+        try:
+            seleniumconfig.screenshot_buffer_size = 5
+            screenshots.save_screenshot(filename, PNG_BASE64)
+
+            @flush_on_error(TimeoutException)
+            def fail():
+                raise ValueError("not a timeout")
+
+            with pytest.raises(ValueError):
+                fail()
+            assert len(screenshots.screenshot_buffer.get_screenshots()) == 1
+            seleniumconfig.screenshot_enabled = False
+            with pytest.raises(TimeoutException):
+                with flush_on_error():
+                    raise TimeoutException("timed out")
+            assert len(screenshots.screenshot_buffer.get_screenshots()) == 1
+        finally:
+            seleniumconfig.screenshot_enabled = True
+            seleniumconfig.screenshot_buffer_size = 0
+            screenshots.screenshot_buffer.clear()
+        assert not tmpdir.join("screenshot.png").check()
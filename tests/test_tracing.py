@@ -0,0 +1,143 @@
+import json
+import threading
+
+import pytest
+
+import seleniumpm.config as seleniumconfig
+import seleniumpm.tracing as tracing
+from seleniumpm.locator import Locator
+from seleniumpm.tracing import Tracer, Span, traced
+from seleniumpm.webelements.button import Button
+from seleniumpm.webelements.widget import Widget
+from seleniumpm.webpage import Webpage
+
+
+class FakeDriver(object):
+    pass
+
+
+class MyWidget(Widget):
+    def __init__(self, driver, locator=None):
+        super(MyWidget, self).__init__(driver, locator)
+        self.button = Button(driver, Locator.by_id("button"))
+
+
+class MyPage(Webpage):
+    def __init__(self, driver, url=None):
+        super(MyPage, self).__init__(driver, url)
+        self.widget = MyWidget(driver, Locator.by_id("widget"))
+
+
+class Operation(object):
+    def get_trace_args(self):
+        return {'path': 'Operation'}
+
+    @traced()
+    def outer(self):
+        return self.inner()
+
+    @traced(name="renamed")
+    def inner(self):
+        return "done"
+
+    @traced()
+    def fail(self):
+        raise ValueError("failed")
+
+
+class Override(Operation):
+    @traced()
+    def outer(self):
+        return super(Override, self).outer()
+
+
+class Chain(Operation):
+    def __init__(self, next=None):
+        self.next = next
+
+    @traced()
+    def outer(self):
+        return self.next.outer() if self.next is not None else "done"
+
+
+@pytest.fixture(autouse=True)
+def enable_tracing():
+    seleniumconfig.tracing = True
+    seleniumconfig.disable_check_for_selenium_webdriver = True
+    tracing.tracer.reset()
+    yield
+    seleniumconfig.tracing = False
+    seleniumconfig.disable_check_for_selenium_webdriver = False
+    tracing.tracer.reset()
+
+
+class TestTracing(object):
+    def test_spans_are_nested(self):
+        assert Operation().outer() == "done"
+        inner, outer = tracing.tracer.get_spans()
+        assert outer.name == "Operation.outer"
+        assert inner.name == "Operation.renamed"
+        assert inner.parent is outer
+        assert outer.parent is None
+        assert outer.start <= inner.start and inner.duration <= outer.duration
+
+    def test_override_records_a_single_span(self):
+        assert Override().outer() == "done"
+        inner, outer = tracing.tracer.get_spans()
+        assert outer.name == "Override.outer" and outer.parent is None
+        assert inner.name == "Override.renamed" and inner.parent is outer
+
+    def test_same_operation_of_another_object_is_nested(self):
+        assert Chain(Chain()).outer() == "done"
+        inner, outer = tracing.tracer.get_spans()
+        assert inner.name == outer.name == "Chain.outer"
+        assert inner.parent is outer
+
+    def test_span_records_error(self):
+        with pytest.raises(ValueError):
+            Operation().fail()
+        span, = tracing.tracer.get_spans()
+        assert span.args == {'path': 'Operation', 'error': 'ValueError'}
+        assert tracing.tracer.get_current_span() is None
+
+    def test_no_spans_when_tracing_is_off(self):
+        seleniumconfig.tracing = False
+        Operation().outer()
+        with tracing.span("manual"):
+            pass
+        assert tracing.tracer.get_spans() == []
+
+    def test_spans_are_per_thread(self):
+        with tracing.span("main"):
+            thread = threading.Thread(target=Operation().inner)
+            thread.start()
+            thread.join()
+        inner, main = tracing.tracer.get_spans()
+        assert inner.parent is None
+        assert inner.thread_id != main.thread_id
+
+    def test_max_spans(self):
+        tracer = Tracer(max_spans=2)
+        for i in range(3):
+            with Span(tracer, "span", {}):
+                pass
+        assert len(tracer.get_spans()) == 2
+        assert tracer.dropped == 1
+
+    def test_chrome_trace(self, tmpdir):
+        with tracing.span("manual", step=1):
+            Operation().inner()
+        filename = tracing.tracer.dump(str(tmpdir.join("trace.json")))
+        with open(filename) as trace_file:
+            trace = json.load(trace_file)
+        manual, inner = trace['traceEvents']
+        assert manual['name'] == "manual" and manual['ph'] == "X" and manual['args'] == {'step': 1}
+        assert inner['name'] == "Operation.renamed"
+        assert manual['ts'] <= inner['ts'] and inner['dur'] <= manual['dur']
+
+    def test_element_attr_path(self):
+        driver = FakeDriver()
+        page = MyPage(driver)
+        assert page.widget.button.get_attr_path() == "MyPage.widget.button"
+        assert page.widget.get_trace_args() == {'path': "MyPage.widget", 'locator': "id=widget"}
+        assert Button(driver, Locator.by_id("button")).get_attr_path() is None
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+import seleniumpm.config as seleniumconfig
+from seleniumpm.deadline import Deadline
+from seleniumpm.locator import Locator
+from seleniumpm.validation import uses_keep_alive, validate_elements
+from seleniumpm.webelements.element import Element
+from seleniumpm.webpage import Webpage
+
+
+class FakeDriver(object):
+    def find_element(self, by=None, value=None):
+        raise NoSuchElementException("{}={}".format(by, value))
+
+
+class FakeCommandExecutor(object):
+    def __init__(self, keep_alive):
+        self.keep_alive = keep_alive
+
+
+class FakeThreadRecordingDriver(FakeDriver):
+    def __init__(self, keep_alive):
+        self.command_executor = FakeCommandExecutor(keep_alive)
+        self.threads = set()
+
+    def find_element(self, by=None, value=None):
+        self.threads.add(threading.current_thread().ident)
+        return super(FakeThreadRecordingDriver, self).find_element(by, value)
+
+
+class MyPage(Webpage):
+    def __init__(self, driver, url=None):
+        super(MyPage, self).__init__(driver, url)
+        self.first = Element(driver, Locator.by_id("first"))
+        self.second = Element(driver, Locator.by_id("second"))
+
+
+@pytest.fixture(autouse=True)
+def fake_driver_config():
+    seleniumconfig.disable_check_for_selenium_webdriver = True
+    polling_interval = seleniumconfig.polling_interval_in_sec
+    seleniumconfig.polling_interval_in_sec = 0.05
+    yield
+    seleniumconfig.disable_check_for_selenium_webdriver = False
+    seleniumconfig.polling_interval_in_sec = polling_interval
+
+
+class TestValidation(object):
+    def test_timeout_message_reports_the_validate_timeout(self):
+        page = MyPage(FakeDriver())
+        with pytest.raises(TimeoutException) as e:
+            page.validate(timeout=0.2, failfast_check_element=False, batch_validation=False,
+                          concurrent_check_element=False)
+        msgs = e.value.msg.split("- \n")
+        assert len(msgs) == 2
+        # The second element only gets what the first one left of the deadline (i.e. 0s), but is
+        # reported with the timeout of the whole validation
+        assert all("with timeout=0.2s" in msg for msg in msgs), msgs
+        assert "(MyPage.first) id=first" in msgs[0] and "(MyPage.second) id=second" in msgs[1]
+
+    def test_timeout_message_of_visibility_check(self):
+        page = MyPage(FakeDriver())
+        with pytest.raises(TimeoutException) as e:
+            validate_elements(page, [page.first], Deadline(0.1), force_check_visibility=True,
+                              failfast_check_element=True)
+        assert e.value.msg.startswith("TimeoutException waiting for present id=first")
+        assert "with timeout=0.1s" in e.value.msg
+
+    @pytest.mark.parametrize("keep_alive,expected_threads", [(False, 2), (True, 1)])
+    def test_concurrent_checks_fall_back_to_serial_with_keep_alive(self, keep_alive, expected_threads):
+        driver = FakeThreadRecordingDriver(keep_alive)
+        assert uses_keep_alive(driver) is keep_alive
+        page = MyPage(driver)
+        with pytest.raises(TimeoutException) as e:
+            page.validate(timeout=0.3, failfast_check_element=False, batch_validation=False,
+                          concurrent_check_element=True)
+        assert len(e.value.msg.split("- \n")) == 2
+        assert len(driver.threads) == expected_threads
+
+    def test_driver_without_command_executor(self):
+        assert not uses_keep_alive(FakeDriver())
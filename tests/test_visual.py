@@ -0,0 +1,74 @@
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+import seleniumpm.visual as visual
+from seleniumpm.visual import BaselineStore, VisualRegression
+
+
+def make_png(size=(64, 48), box=None, box_color=(0, 0, 0)):
+    """
+    :return: A PNG of a horizontal gradient, optionally with a filled box
+    """
+    image = Image.new("RGB", size)
+    image.putdata([(x * 255 // size[0],) * 3 for y in range(size[1]) for x in range(size[0])])
+    if box is not None:
+        image.paste(box_color, box)
+    return visual.to_png(image)
+
+
+class TestVisual(object):
+    def test_dhash(self):
+        image = visual.open_image(make_png())
+        assert visual.dhash(image, hash_size=8) == visual.dhash(visual.open_image(make_png()), hash_size=8)
+        assert visual.dhash(image, hash_size=16) < 2 ** 256
+        assert visual.hamming_distance(0b1011, 0b0110) == 3
+
+    def test_crop_image(self):
+        image = visual.open_image(make_png())
+        crop = visual.crop_image(image, {'x': 5, 'y': 5, 'width': 10, 'height': 15, 'dpr': 2})
+        assert crop.size == (20, 30)
+        assert visual.crop_image(image, {'x': 60, 'y': 0, 'width': 10, 'height': 10}).size == (4, 10)
+        with pytest.raises(AttributeError):
+            visual.crop_image(image, {'x': 100, 'y': 0, 'width': 10, 'height': 10})
+
+    def test_first_check_creates_baseline(self, tmpdir):
+        result = visual.check_screenshot(make_png(), "MyPage", baseline_dir=str(tmpdir))
+        assert result.created and result.passed and result.distance == 0
+        assert tmpdir.join("MyPage.png").check() and tmpdir.join("MyPage.json").check()
+        assert BaselineStore(str(tmpdir)).get_hash("MyPage", 8) == result.hash
+
+    def test_similar_screenshot_passes_without_diff(self, tmpdir):
+        visual.check_screenshot(make_png(), "MyPage", baseline_dir=str(tmpdir))
+        result = visual.assert_screenshot(make_png(box=(0, 0, 1, 1)), "MyPage", baseline_dir=str(tmpdir),
+                                          screenshot_dir=str(tmpdir.join("screenshots")))
+        assert result.passed and not result.created
+        assert result.diff is None, "Expecting the full diff to be skipped when the hashes are close"
+        assert not tmpdir.join("screenshots").check()
+
+    def test_regression_computes_diff(self, tmpdir):
+        visual.check_screenshot(make_png(), "MyPage", baseline_dir=str(tmpdir))
+        with pytest.raises(VisualRegression) as e:
+            visual.assert_screenshot(make_png(box=(8, 8, 56, 40), box_color=(255, 255, 255)), "MyPage",
+                                     threshold=0, baseline_dir=str(tmpdir),
+                                     screenshot_dir=str(tmpdir.join("screenshots")))
+        result = e.value.result
+        assert isinstance(e.value, AssertionError)
+        assert not result.passed and result.distance > 0
+        assert result.diff['bbox'] == (8, 8, 56, 40)
+        assert 0 < result.diff['ratio'] < 1
+        assert tmpdir.join("screenshots", "MyPage_actual.png").check()
+        assert tmpdir.join("screenshots", "MyPage_diff.png").check()
+
+    def test_size_mismatch(self, tmpdir):
+        visual.check_screenshot(make_png(), "MyPage", baseline_dir=str(tmpdir))
+        result = visual.check_screenshot(make_png(size=(32, 48)), "MyPage", threshold=-1, baseline_dir=str(tmpdir),
+                                         screenshot_dir=str(tmpdir))
+        assert result.diff['ratio'] == 1.0 and result.diff['bbox'] is None
+
+    def test_update_baseline(self, tmpdir):
+        visual.check_screenshot(make_png(), "MyPage", baseline_dir=str(tmpdir))
+        changed = make_png(box=(8, 8, 56, 40), box_color=(255, 255, 255))
+        result = visual.check_screenshot(changed, "MyPage", baseline_dir=str(tmpdir), update_baseline=True)
+        assert result.created
+        assert visual.check_screenshot(changed, "MyPage", threshold=0, baseline_dir=str(tmpdir)).passed
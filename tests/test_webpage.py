@@ -2,6 +2,7 @@ from selenium import webdriver
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.remote.webdriver import WebDriver
 from seleniumpm.locator import Locator
+from seleniumpm.profiler import command_budget
 from seleniumpm.webpage import Webpage
 from seleniumpm.examples.wikipedia import Wikipedia
 from seleniumpm.examples.superwikipedia import SuperWikipedia
@@ -16,6 +17,7 @@ from seleniumpm.iframe import IFrame
 from urlparse import urlparse
 import tests.pages.testingwebpages as testingwebpages
 import pytest
+import time
 
 
 class TestWebPage(object):
@@ -460,3 +462,117 @@ class TestWebPage(object):
             assert False, "Expecting page.foobar to throw an AttributeError!"
         except AttributeError:
             pass
+
+    def test_get_element_attr_after_removing_element(self):
+        page = testingwebpages.MyComplexPage(self.driver)
+        page.visible_widget = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget"))
+        assert len(page.get_element_attr(result_type=dict)) == 7, 'Expecting 7 elements'
+        del page.visible_widget
+        elements = page.get_element_attr(result_type=dict)
+        assert len(elements) == 3, 'Expecting 3 elements'
+        assert 'regular_element_on_widget' not in elements
+
+    def test_get_element_attr_after_replacing_element_with_non_element(self):
+        page = testingwebpages.MyComplexPage(self.driver)
+        page.regular_element = "not an element"
+        elements = page.get_element_attr(result_type=dict)
+        assert len(elements) == 2, 'Expecting 2 elements'
+        assert 'regular_element' not in elements
+        assert 'regular_element' not in page.get_element_attr_local()
+
+    def test_get_element_attr_with_class_level_element(self):
+        class ClassLevelElementPage(Webpage):
+            class_element = Element(self.driver, Locator.by_xpath("//foo"))
+
+        page = ClassLevelElementPage(self.driver)
+        elements = page.get_element_attr(result_type=dict)
+        assert len(elements) == 1, 'Expecting 1 element'
+        assert 'class_element' in elements
+        assert len(page.get_element_attr_local()) == 0, 'Expecting no locally defined elements'
+
+    def test_access_element_after_replacing_widget(self):
+        page = testingwebpages.MyComplexPage(self.driver)
+        page.visible_widget = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget"))
+        first_element = page.regular_element_on_widget
+        page.visible_widget = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget2"))
+        assert page.regular_element_on_widget is not first_element, \
+            "Expecting the element of the replaced widget"
+        assert page.regular_element_on_widget is page.visible_widget.regular_element_on_widget
+
+    def test_access_element_after_modifying_nested_widget(self):
+        page = testingwebpages.MyComplexPage(self.driver)
+        page.visible_widget = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget"))
+        page.regular_element_on_widget
+        page.visible_widget.new_element = Element(self.driver, Locator.by_xpath("//new"))
+        assert page.new_element is page.visible_widget.new_element
+        del page.visible_widget.new_element
+        try:
+            page.new_element
+            assert False, "Expecting page.new_element to throw an AttributeError!"
+        except AttributeError:
+            pass
+
+    def test_batch_validate_returns_self(self):
+        page = Wikipedia(self.driver, "https://en.wikipedia.org/wiki/Selenium")
+        page = page.open().wait_for_page_load(batch_validation=True).validate(batch_validation=True)
+        assert isinstance(page, Wikipedia), "Ensure returned page is of type Wikipedia"
+
+    def test_batch_validate_hidden_elements_on_webpage(self):
+        page = testingwebpages.HiddenElementsPage(self.driver, "https://en.wikipedia.org/wiki/Selenium")
+        try:
+            page.open().validate(timeout=0, batch_validation=True, failfast_check_element=False)
+            assert False, "Expecting there to be a TimeoutException thrown"
+        except TimeoutException as e:
+            assert e.msg.count("TimeoutException waiting for present") == 3, \
+                "Expecting all 3 missing elements to be reported"
+
+    def test_validate_timeout_is_shared_by_all_elements(self):
+        page = testingwebpages.HiddenElementsPage(self.driver, "https://en.wikipedia.org/wiki/Selenium")
+        page.open()
+        start_time = time.time()
+        try:
+            page.validate(timeout=1, failfast_check_element=False)
+            assert False, "Expecting there to be a TimeoutException thrown"
+        except TimeoutException as e:
+            assert e.msg.count("TimeoutException waiting for present") == 3, \
+                "Expecting all 3 missing elements to be reported"
+        assert time.time() - start_time < 2, "Expecting the 1s timeout to bound the whole validate()"
+
+    def test_concurrent_validate_reports_all_elements(self):
+        page = testingwebpages.HiddenElementsPage(self.driver, "https://en.wikipedia.org/wiki/Selenium")
+        page.open()
+        start_time = time.time()
+        try:
+            page.validate(timeout=1, failfast_check_element=False, concurrent_check_element=True)
+            assert False, "Expecting there to be a TimeoutException thrown"
+        except TimeoutException as e:
+            assert e.msg.count("TimeoutException waiting for present") == 3, \
+                "Expecting all 3 missing elements to be reported"
+        assert time.time() - start_time < 2, "Expecting the elements to be checked concurrently"
+
+    def test_open_with_navigation_timing(self):
+        page = testingwebpages.ZeroValidatedElementsPage(self.driver, "https://en.wikipedia.org/wiki/Selenium")
+        page.open(wait_for_page_load=True, navigation_timing=True)
+        timing = self.driver.page_load_navigation_timing
+        assert timing is not None, "Expecting the browser to support Navigation Timing"
+        assert set(timing) >= {'dns', 'connect', 'ttfb', 'dom_content_loaded', 'load'}
+        assert 0 <= timing['ttfb'] <= timing['dom_content_loaded']
+        assert timing['harness'] <= self.driver.page_load_duration_time
+
+    def test_record_resource_timing(self, tmpdir):
+        page = testingwebpages.ZeroValidatedElementsPage(self.driver, "https://en.wikipedia.org/wiki/Selenium")
+        page.open().wait_for_page_load(resource_timing=True)
+        summary = self.driver.page_load_resource_timing
+        assert summary is not None, "Expecting the browser to support Resource Timing"
+        assert summary['count'] == sum(stats['count'] for stats in summary['by_domain'].values())
+        page.record_resource_timing(waterfall=True, screenshot_dir=str(tmpdir), waterfall_name="waterfall")
+        assert tmpdir.join("waterfall.json").check()
+
+    def test_validate_command_budget(self):
+        page = testingwebpages.ZeroValidatedElementsPage(self.driver, "https://en.wikipedia.org/wiki/Selenium")
+        page.open()
+        with command_budget(max_commands=0, driver=self.driver):
+            page.validate()
+        page = testingwebpages.MyComplexPage(self.driver, "https://en.wikipedia.org/wiki/Selenium")
+        with command_budget(max_commands=1, driver=self.driver):
+            page.validate(batch_validation=True)
@@ -7,6 +7,7 @@ import seleniumpm.config as seleniumconfig
 from seleniumpm.webelements.element import Element
 from seleniumpm.locator import Locator
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
 
 class TestElement(UiTestWrapper):
     google_url = 'https://www.google.com'
@@ -149,10 +150,138 @@ class TestElement(UiTestWrapper):
         finally:
             seleniumconfig.disable_check_for_selenium_webdriver = False
 
+    def test_wait_for_present_and_visible_with_observer_backend(self):
+        self.driver.get(self.google_url)
+        element = Element(self.driver, Locator.by_name('q'))
+        try:
+            seleniumconfig.wait_backend = "observer"
+            assert element.wait_for_present(5) is element
+            assert element.wait_for_visible(5) is element
+        finally:
+            seleniumconfig.wait_backend = "webdriver"
+
+    def test_wait_for_present_timeout_with_observer_backend(self):
+        self.driver.get(self.google_url)
+        element = Element(self.driver, Locator.by_xpath("//foo"))
+        try:
+            seleniumconfig.wait_backend = "observer"
+            element.wait_for_present(1)
+            assert False, "Expecting a TimeoutException for a non-existent element"
+        except TimeoutException as e:
+            assert e.msg.startswith("TimeoutException waiting for present xpath=//foo with timeout=1s")
+        finally:
+            seleniumconfig.wait_backend = "webdriver"
+
+    def test_webelement_cache(self):
+        page = GooglePage(self.driver, self.google_url)
+        element = Element(self.driver, Locator.by_name('q'))
+        try:
+            seleniumconfig.cache_webelements = True
+            page.open()
+            webelement = element.get_webelement()
+            assert element.get_webelement() is webelement, "Expecting the cached WebElement"
+            page.refresh()
+            assert element.get_webelement() is not webelement, "Expecting a refresh to clear the cache"
+        finally:
+            seleniumconfig.cache_webelements = False
+
+    def test_webelement_cache_retries_stale_webelement(self):
+        element = Element(self.driver, Locator.by_name('q'))
+        try:
+            seleniumconfig.cache_webelements = True
+            self.driver.get(self.google_url)
+            webelement = element.get_webelement()
+            # Navigating without going through a Webpage leaves a stale WebElement in the cache
+            self.driver.refresh()
+            assert element.get_attribute("name") == "q"
+            assert element.get_webelement() is not webelement
+        finally:
+            seleniumconfig.cache_webelements = False
+
+    def test_get_texts_bulk(self):
+        self.driver.get(self.google_url)
+        element = Element(self.driver, Locator.by_xpath("//a"))
+        texts = element.get_texts(bulk=False)
+        assert len(texts) > 0, "Expecting links on the google page"
+        assert element.get_texts(bulk=True) == texts
+        assert element.get_numbers(bulk=True) == element.get_numbers(bulk=False)
+
+    def test_get_texts_bulk_matches_webelement_text(self):
+        self.driver.get(self.google_url)
+        self.driver.execute_script("""
+            var fixture = document.createElement('div');
+            fixture.innerHTML =
+                '<div class="seleniumpm-text">  many   spaces\\tand&nbsp;nbsp  </div>' +
+                '<div class="seleniumpm-text">first line<br>second line<br><br>third line</div>' +
+                '<div class="seleniumpm-text">shown <span style="display:none">display none</span>' +
+                '<span style="visibility:hidden">visibility hidden</span>text</div>' +
+                '<div class="seleniumpm-text"><span>nested</span> <b>inline</b> <div>block</div></div>' +
+                '<div class="seleniumpm-text" style="display:none">hidden element</div>';
+            document.body.insertBefore(fixture, document.body.firstChild);
+        """)
+        element = Element(self.driver, Locator.by_css_selector(".seleniumpm-text"))
+        texts = element.get_texts(bulk=False)
+        assert len(texts) == 5
+        assert element.get_texts(bulk=True) == texts
+
+    def test_get_index_of_text(self):
+        self.driver.get(self.google_url)
+        element = Element(self.driver, Locator.by_xpath("//a"))
+        texts = element.get_texts()
+        assert element.get_index_of_text(texts[-1]) == texts.index(texts[-1])
+        assert element.get_index_of_text("text that is not a link on the page") == -1
+
 
 class MyDriver(object):
     def __init__(self, driver):
         self.driver = driver
 
     def __getattr__(self, item):
-        return self.driver.__getattribute__(item)
\ No newline at end of file
+        return self.driver.__getattribute__(item)
+
+class FakeObserverDriver(object):
+    def __init__(self, found=True):
+        self.found = found
+        self.script_timeouts = []
+
+    def set_script_timeout(self, time_to_wait):
+        self.script_timeouts.append(time_to_wait)
+
+    def execute_async_script(self, script, *args):
+        return self.found
+
+
+class TestWaitInBrowser(object):
+    @pytest.fixture(autouse=True)
+    def fake_driver_config(self):
+        seleniumconfig.disable_check_for_selenium_webdriver = True
+        yield
+        seleniumconfig.disable_check_for_selenium_webdriver = False
+
+    def test_script_timeout_is_restored(self):
+        driver = FakeObserverDriver()
+        Element(driver, Locator.by_id("first")).wait_in_browser("present", 60)
+        assert driver.script_timeouts == [65, seleniumconfig.script_timeout_in_sec]
+        assert driver.seleniumpm_script_timeouts == []
+
+    def test_script_timeout_is_restored_after_a_timeout(self):
+        driver = FakeObserverDriver(found=False)
+        with pytest.raises(TimeoutException):
+            Element(driver, Locator.by_id("first")).wait_in_browser("present", 60)
+        assert driver.script_timeouts == [65, seleniumconfig.script_timeout_in_sec]
+
+    def test_short_wait_keeps_the_script_timeout(self):
+        driver = FakeObserverDriver()
+        Element(driver, Locator.by_id("first")).wait_in_browser("present", 10)
+        assert driver.script_timeouts == []
+
+    def test_overlapping_waits_share_the_highest_script_timeout(self):
+        driver = FakeObserverDriver()
+        first = Element(driver, Locator.by_id("first"))
+        second = Element(driver, Locator.by_id("second"))
+        first.raise_script_timeout(65)
+        second.raise_script_timeout(125)
+        first.restore_script_timeout(65)
+        assert driver.script_timeouts == [65, 125], "Expecting the second wait to keep its script timeout"
+        second.restore_script_timeout(125)
+        assert driver.script_timeouts == [65, 125, seleniumconfig.script_timeout_in_sec]
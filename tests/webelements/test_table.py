@@ -1,5 +1,13 @@
+import re
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+import seleniumpm.config as seleniumconfig
 from tests.uitestwrapper import UiTestWrapper
-from seleniumpm.webelements.table import Table
+from seleniumpm.scripts import GET_TEXTS_JS, TABLE_COLUMN_JS, TABLE_VERSION_JS
+from seleniumpm.webelements.table import Table, TableIndex, TableSnapshot
+from seleniumpm.webelements.widget import Widget
 from seleniumpm.locator import Locator
 from selenium.webdriver.common.by import By
 
@@ -56,3 +64,229 @@ class TestTable(UiTestWrapper):
             assert False, "Expected there to be an AttributeError"
         except AttributeError:
             pass
+
+    def test_snapshot_of_missing_table(self):
+        table = Table(self.driver, Locator(By.XPATH, "//table[@id='does-not-exist']"))
+        with pytest.raises(NoSuchElementException):
+            table.snapshot()
+        assert table.get_snapshot() is None
+
+    def test_iter_rows_of_missing_table(self):
+        table = Table(self.driver, Locator(By.XPATH, "//table[@id='does-not-exist']"))
+        rows = table.iter_rows(window_size=10)
+        with pytest.raises(NoSuchElementException):
+            next(rows)
+
+    def test_to_csv_of_missing_table(self, tmpdir):
+        table = Table(self.driver, Locator(By.XPATH, "//table[@id='does-not-exist']"))
+        with pytest.raises(NoSuchElementException):
+            table.to_csv(str(tmpdir.join("table.csv")))
+
+    def test_to_numpy_of_missing_table(self):
+        pytest.importorskip("numpy")
+        table = Table(self.driver, Locator(By.XPATH, "//table[@id='does-not-exist']"))
+        with pytest.raises(NoSuchElementException):
+            table.to_numpy()
+
+    def test_query_missing_table(self):
+        table = Table(self.driver, Locator(By.XPATH, "//table[@id='does-not-exist']"))
+        with pytest.raises(NoSuchElementException):
+            table.query_row_indexes([(1, "==", "12345")])
+
+
+class TestTableSnapshot(object):
+    def get_snapshot(self):
+        return TableSnapshot(["ID", "Name", "Total"],
+                             [["100", "Foo", "1.5"],
+                              ["101", "Bar"],
+                              ["102", "foobar", "-3"]])
+
+    def test_get_column_names(self):
+        snapshot = self.get_snapshot()
+        assert snapshot.get_column_names() == ["ID", "Name", "Total"]
+        assert snapshot.count_rows() == 3
+
+    def test_get_row_index(self):
+        snapshot = self.get_snapshot()
+        assert snapshot.get_row_index(1, "101") == 1
+        assert snapshot.get_row_index(2, "^foo", re.IGNORECASE) == 0
+        assert snapshot.get_row_index(2, "^Bar$") == 1
+        assert snapshot.get_row_index(1, "999") == -1
+
+    def test_get_row_index_skips_rows_without_the_column(self):
+        # Like the td[3] xpath, the second row has no 3rd cell and is not counted
+        snapshot = self.get_snapshot()
+        assert snapshot.get_row_index(3, "-3") == 1
+
+    def test_get_text(self):
+        snapshot = self.get_snapshot()
+        assert snapshot.get_text(1, 1) == "100"
+        assert snapshot.get_text(3, 2) == "foobar"
+        with pytest.raises(IndexError):
+            snapshot.get_text(0, 1)
+        with pytest.raises(IndexError):
+            snapshot.get_text(2, 3)
+
+
+class TestTableIndex(object):
+    def get_index(self):
+        return TableIndex(1, ["100", "101", None, "1010", "101", "200"], version="1:0")
+
+    def test_exact_lookup(self):
+        index = self.get_index()
+        assert index.get_row_index("100") == 0
+        # The first matching row wins, and rows without the cell are not counted
+        assert index.get_row_index("101") == 1
+        assert index.get_row_index("200") == 4
+        assert index.get_row_index("10") == -1
+        assert len(index) == 5
+
+    def test_prefix_lookup(self):
+        index = self.get_index()
+        assert index.get_row_index("10", prefix=True) == 0
+        assert index.get_row_index("1010", prefix=True) == 2
+        assert index.get_row_index("2", prefix=True) == 4
+        assert index.get_row_index("3", prefix=True) == -1
+        assert index.get_row_index("", prefix=True) == 0
+
+
+class FakeDriver(object):
+    def __init__(self):
+        self.scripts = []
+        self.version = "1:0"
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        if script == TABLE_VERSION_JS:
+            return self.version
+        return {'cells': ["100", "101"], 'version': self.version}
+
+
+class TestTableIndexCache(object):
+    @pytest.fixture(autouse=True)
+    def fake_driver_config(self):
+        seleniumconfig.disable_check_for_selenium_webdriver = True
+        yield
+        seleniumconfig.disable_check_for_selenium_webdriver = False
+
+    def test_index_is_built_once(self):
+        driver = FakeDriver()
+        table = Table(driver, Locator(By.XPATH, "//table"))
+        assert [table.find_row_index(1, key) for key in ("100", "101", "102")] == [0, 1, -1]
+        assert driver.scripts == [TABLE_COLUMN_JS], "Expecting a single round trip for every lookup"
+
+    def test_revalidate(self):
+        driver = FakeDriver()
+        table = Table(driver, Locator(By.XPATH, "//table"))
+        index = table.get_index(1)
+        assert table.get_index(1, revalidate=True) is index
+        driver.version = "2:0"
+        assert table.get_index(1) is index
+        assert table.get_index(1, revalidate=True) is not index
+        assert driver.scripts == [TABLE_COLUMN_JS, TABLE_VERSION_JS, TABLE_VERSION_JS, TABLE_COLUMN_JS]
+
+    def test_invalidate_index(self):
+        driver = FakeDriver()
+        table = Table(driver, Locator(By.XPATH, "//table"))
+        index = table.get_index(1)
+        assert table.invalidate_index(1).get_index(1) is not index
+
+
+class FakeCsvDriver(object):
+    def __init__(self, column_names):
+        self.column_names = column_names
+
+    def execute_script(self, script, *args):
+        if script == GET_TEXTS_JS:
+            return self.column_names
+        return [[u"12345", u"Pass"], [u"12346", u"Fail"]]
+
+
+class TestTableToCsv(object):
+    @pytest.fixture(autouse=True)
+    def fake_driver_config(self):
+        seleniumconfig.disable_check_for_selenium_webdriver = True
+        yield
+        seleniumconfig.disable_check_for_selenium_webdriver = False
+
+    @pytest.mark.parametrize("column_names", [[], None])
+    def test_table_without_thead(self, tmpdir, column_names):
+        table = Table(FakeCsvDriver(column_names), Locator(By.XPATH, "//table"))
+        csv_file = tmpdir.join("table.csv")
+        assert table.to_csv(str(csv_file)) == 2
+        assert csv_file.read().splitlines() == ["12345,Pass", "12346,Fail"]
+
+    def test_table_with_thead(self, tmpdir):
+        table = Table(FakeCsvDriver([u"ID", u"Status"]), Locator(By.XPATH, "//table"))
+        csv_file = tmpdir.join("table.csv")
+        assert table.to_csv(str(csv_file)) == 2
+        assert csv_file.read().splitlines() == ["ID,Status", "12345,Pass", "12346,Fail"]
+
+
+class FakeWebElement(object):
+    def __init__(self, text=u""):
+        self.text = text
+        self.lookups = []
+
+    def find_element(self, by, value):
+        self.lookups.append((by, value))
+        return FakeWebElement(u"12346")
+
+    def find_elements(self, by, value):
+        self.lookups.append((by, value))
+        return [FakeWebElement(u"12345"), FakeWebElement(u"12346")]
+
+
+class FakeScopedDriver(object):
+    def __init__(self):
+        self.root = FakeWebElement()
+
+    def find_element(self, by, value):
+        assert (by, value) == (By.XPATH, "//div[@id='results']"), "Expecting only the root to be found"
+        return self.root
+
+    def find_elements(self, by, value):
+        assert False, "Expecting the table to be searched from the root of its scoped widget"
+
+
+class ResultsWidget(Widget):
+    def __init__(self, driver, locator=None):
+        super(ResultsWidget, self).__init__(driver, locator)
+        self.table = Table(driver, Locator(By.XPATH, "//table"))
+
+
+class TestScopedTable(object):
+    @pytest.fixture(autouse=True)
+    def fake_driver_config(self):
+        seleniumconfig.disable_check_for_selenium_webdriver = True
+        yield
+        seleniumconfig.disable_check_for_selenium_webdriver = False
+
+    def test_lookups_are_scoped(self):
+        driver = FakeScopedDriver()
+        widget = ResultsWidget(driver, Locator(By.XPATH, "//div[@id='results']")).mark_scoped()
+        table = widget.table
+        assert table.get_row_index(1, "12346") == 1
+        assert table.get_column_names() == [u"12345", u"12346"]
+        assert table.get_element(2, 1).text == u"12346"
+        assert table.count_rows() == 2
+        assert driver.root.lookups == [(By.XPATH, ".//table/tbody/tr/td[1]"), (By.XPATH, ".//table/thead/tr/th"),
+                                       (By.XPATH, ".//table/tbody/tr[2]/td[1]"), (By.XPATH, ".//table/tbody/tr")]
+
+
+class TestTableQuery(object):
+    def test_compile_predicates(self):
+        predicates = Table.compile_predicates([(1, "==", "Foo"), (3, "~=", "^ba"), (5, ">=", 100)], re.IGNORECASE)
+        assert predicates == [[1, "==", "Foo", "i"], [3, "~=", "^ba", "i"], [5, ">=", 100, "i"]]
+
+    def test_compile_predicates_with_invalid_operator(self):
+        with pytest.raises(AttributeError):
+            Table.compile_predicates([(1, "=~", "Foo")])
+
+    def test_compile_predicates_with_non_numeric_value(self):
+        with pytest.raises(AttributeError):
+            Table.compile_predicates([(1, ">", "100")])
+
+    def test_compile_predicates_with_unsupported_regex_flag(self):
+        with pytest.raises(AttributeError):
+            Table.compile_predicates([(1, "~=", "Foo")], re.VERBOSE)
@@ -300,3 +300,40 @@ class TestWidget(UiTestWrapper):
             assert False, "Expecting widget.foobar to throw an AttributeError!"
         except AttributeError:
             pass
+
+    def test_scoped_widget_children_use_relative_xpath(self):
+        widget = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget"))
+        assert not widget.scoped
+        assert widget.regular_element_on_widget.get_scoped_container() is None
+        assert widget.regular_element_on_widget.get_search_context() is self.driver
+        assert widget.regular_element_on_widget.get_scoped_locator() == \
+            widget.regular_element_on_widget.locator.get_tuple()
+
+        widget.mark_scoped()
+        element = widget.regular_element_on_widget
+        assert element.get_scoped_container() is widget
+        assert element.get_scoped_locator() == ("xpath", "." + element.locator.value)
+
+    def test_scoped_widget_nested_in_scoped_widget(self):
+        widget = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget")).mark_scoped()
+        widget.visible_widget = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget"))
+        assert widget.visible_widget.get_scoped_container() is widget
+        assert widget.visible_widget.regular_element_on_widget.get_scoped_container() is None
+        widget.visible_widget.mark_scoped()
+        assert widget.visible_widget.regular_element_on_widget.get_scoped_container() is widget.visible_widget
+
+    def test_unscoped_widget(self):
+        widget = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget"))
+        other = testingwebpages.MyComplexWidget(self.driver, Locator.by_xpath("//widget"))
+        assert widget != other.mark_scoped(), "Expecting a scoped widget to not equal an unscoped one"
+        other.mark_unscoped()
+        assert widget == other
+        assert other.regular_element_on_widget.get_search_context() is self.driver
+
+    def test_iframe_cannot_be_scoped(self):
+        iframe = testingwebpages.MyComplexIframe(self.driver, Locator.by_xpath("//iframe"))
+        try:
+            iframe.mark_scoped()
+            assert False, "Expecting iframe.mark_scoped() to throw an AttributeError!"
+        except AttributeError:
+            pass